@@ -110,6 +110,7 @@ DEPS = [
 if PY2:
     DEPS += [
         'enum34',
+        'futures',  # concurrent.futures backport
         'subprocess32',  # TODO: >=3.5.0
     ]
 
@@ -10,4 +10,7 @@ __author__ = 'Greg Leclercq'
 __license__ = "MIT"
 
 logging.config.dictConfig(settings.base.load()['LOGGING'])
+if settings.SIMPLEFLOW_LOG_FORMAT != 'text' or settings.SIMPLEFLOW_LOG_ASYNC:
+    from .log import setup_logging
+    setup_logging(log_format=settings.SIMPLEFLOW_LOG_FORMAT, async_logging=settings.SIMPLEFLOW_LOG_ASYNC)
 logger = logging.getLogger(__name__)
@@ -0,0 +1,291 @@
+"""
+Offline benchmark of the decider hot path.
+
+Synthetic histories are built with :class:`swf.models.history.builder.History`
+for :class:`BenchmarkWorkflow`, a workflow that fans out activities in groups
+and may also start child workflows, record markers, start timers and wait for
+signals. Each history is then replayed by :class:`simpleflow.swf.executor.Executor`
+like a decider would, without calling Amazon SWF.
+
+For each history, the benchmark reports (best of *repeat* runs):
+
+- ``parse_time``: :meth:`simpleflow.history.History.parse`;
+- ``replay_time``: :meth:`simpleflow.swf.executor.Executor.replay`, which
+  includes parsing the history;
+- ``peak_memory``: memory allocated during a replay, in bytes (Python 3 only,
+  with :mod:`tracemalloc`);
+- ``decisions``: number of decisions returned by the replay.
+
+Run it with::
+
+    $ simpleflow benchmark.replay --events 1000,10000,100000 --scenario mixed
+
+Results are printed in JSON, to be compared between revisions.
+"""
+from __future__ import absolute_import, division
+
+import collections
+import gc
+import platform
+import time
+
+import simpleflow
+from simpleflow import activity, futures
+from simpleflow.canvas import Group
+from simpleflow.history import History
+from simpleflow.swf.executor import Executor
+from simpleflow.swf.task import ActivityTask
+from simpleflow.task import TimerTask
+from simpleflow.utils import json_dumps
+from simpleflow.workflow import Workflow
+from swf.models import Domain, WorkflowExecution, WorkflowType
+from swf.models.history import builder
+from swf.responses import Response
+
+try:
+    import tracemalloc
+except ImportError:  # Python 2
+    tracemalloc = None
+
+__all__ = ['BenchmarkWorkflow', 'build_history', 'run', 'SCENARIOS']
+
+WORKFLOW_ID = 'benchmark'
+RUN_ID = 'benchmark-run'
+
+# Number of each kind of task per 100 activities.
+SCENARIOS = {
+    'fanout': {},
+    'mixed': {'children': 2, 'markers': 2, 'timers': 1, 'signals': 1},
+}
+
+# Activities per group, and per decision task in the history.
+GROUP_SIZE = 100
+
+
+@activity.with_attributes(task_list='benchmark', version='1.0')
+def noop(i):
+    return i
+
+
+class BenchmarkChildWorkflow(Workflow):
+    name = 'benchmark_child'
+    version = '1.0'
+    task_list = 'benchmark'
+
+    @classmethod
+    def get_workflow_id(cls, workflow, i):
+        return 'benchmark-child-{}'.format(i)
+
+    def run(self, i):
+        return i
+
+
+class BenchmarkWorkflow(Workflow):
+    name = 'benchmark'
+    version = '1.0'
+    task_list = 'benchmark'
+    decision_tasks_timeout = '300'
+    execution_timeout = '3600'
+
+    def run(self, activities, children=0, markers=0, timers=0, signals=0, group_size=GROUP_SIZE):
+        for i in range(markers):
+            self.submit(self.record_marker('benchmark', {'i': i}))
+        for i in range(signals):
+            futures.wait(self.submit(self.wait_signal('benchmark-{}'.format(i))))
+        for i in range(timers):
+            futures.wait(self.submit(TimerTask('benchmark-{}'.format(i), 0)))
+        fs = [
+            self.submit(Group(*[(noop, j) for j in range(i, min(i + group_size, activities))]))
+            for i in range(0, activities, group_size)
+        ]
+        fs.extend(self.submit(BenchmarkChildWorkflow, i) for i in range(children))
+        futures.wait(*fs)
+        return len(fs)
+
+
+class OfflineConnection(object):
+    """
+    Stands for a boto connection: the benchmark never calls SWF.
+    """
+
+    def __getattr__(self, name):
+        raise RuntimeError('cannot call SWF ({}) in the offline benchmark'.format(name))
+
+
+def make_domain():
+    return Domain('benchmark', connection=OfflineConnection())
+
+
+def workflow_input(events, scenario='fanout'):
+    """
+    Input of :class:`BenchmarkWorkflow` for a history of about *events* events.
+
+    :type events: int
+    :type scenario: str
+    :rtype: dict
+    """
+    counts = SCENARIOS[scenario]
+    # activities: 3 events; children: 3; markers, signals: 1; timers: 2;
+    # decision tasks: 3 every GROUP_SIZE activities.
+    events_per_100 = (300 + 3 * counts.get('children', 0) + counts.get('markers', 0) +
+                      2 * counts.get('timers', 0) + counts.get('signals', 0) + 3)
+    activities = max(int(events * 100 / events_per_100), 1)
+    kwargs = {'activities': activities}
+    for key, count in counts.items():
+        kwargs[key] = activities * count // 100
+    return {'args': [], 'kwargs': kwargs}
+
+
+def build_history(events, scenario='fanout', unscheduled=0.0):
+    """
+    Build the history of a :class:`BenchmarkWorkflow` with about *events*
+    events.
+
+    :param events: approximate number of events.
+    :type events: int
+    :param scenario: key of :data:`SCENARIOS`.
+    :type scenario: str
+    :param unscheduled: ratio of the activities left unscheduled, that a
+                        replay has to schedule.
+    :type unscheduled: float
+    :rtype: swf.models.history.builder.History
+    """
+    input = workflow_input(events, scenario)
+    kwargs = input['kwargs']
+    history = builder.History(BenchmarkWorkflow, input=input)
+    history.add_decision_task_completed()
+
+    for i in range(kwargs.get('markers', 0)):
+        history.add_marker('benchmark', {'i': i})
+    for i in range(kwargs.get('signals', 0)):
+        history.add_signal('benchmark-{}'.format(i))
+    for i in range(kwargs.get('timers', 0)):
+        timer_id = 'benchmark-{}'.format(i)
+        history.add_timer_started(timer_id, 0, decision_id=history.last_id)
+        history.add_timer_fired(timer_id, started_timer_id=history.last_id)
+
+    # Compute activity IDs like the executor does.
+    executor = Executor(make_domain(), BenchmarkWorkflow)
+    activities = kwargs['activities']
+    for i in range(int(activities * (1 - unscheduled))):
+        if i % GROUP_SIZE == 0:
+            history.add_decision_task()
+        activity_id = executor._make_task_id(ActivityTask(noop, i), WORKFLOW_ID, RUN_ID, i)
+        history.add_activity_task(
+            noop,
+            decision_id=history.last_id,
+            activity_id=activity_id,
+            input={'args': [i], 'kwargs': {}},
+            result=i,
+        )
+
+    for i in range(kwargs.get('children', 0)):
+        history.add_child_workflow(
+            BenchmarkChildWorkflow,
+            workflow_id=BenchmarkChildWorkflow.get_workflow_id(BenchmarkChildWorkflow, i),
+            input={'args': [i], 'kwargs': {}},
+            result=json_dumps(i),
+        )
+
+    history.add_decision_task_scheduled()
+    history.add_decision_task_started()
+    return history
+
+
+def replay(history, domain=None):
+    """
+    Replay *history* like a decider.
+
+    :type history: swf.models.history.builder.History
+    :type domain: Optional[swf.models.Domain]
+    :return: decisions
+    :rtype: list[swf.models.decision.base.Decision]
+    """
+    domain = domain or make_domain()
+    executor = Executor(domain, BenchmarkWorkflow)
+    workflow_type = WorkflowType(domain, BenchmarkWorkflow.name, BenchmarkWorkflow.version,
+                                 connection=domain.connection)
+    execution = WorkflowExecution(domain, WORKFLOW_ID, RUN_ID, workflow_type=workflow_type,
+                                  connection=domain.connection)
+    return executor.replay(Response(history=history, execution=execution)).decisions
+
+
+def _best_time(func, repeat):
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.time()
+        result = func()
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def _peak_memory(func):
+    if tracemalloc is None:
+        return None
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def benchmark(events, scenario='fanout', unscheduled=0.0, repeat=3, memory=True):
+    """
+    Benchmark the replay of a synthetic history.
+
+    :type events: int
+    :type scenario: str
+    :type unscheduled: float
+    :type repeat: int
+    :param memory: measure the peak memory (an additional, slower, replay).
+    :type memory: bool
+    :rtype: dict[str, Any]
+    """
+    history = build_history(events, scenario, unscheduled)
+    domain = make_domain()
+
+    def parse():
+        parsed = History(history)
+        parsed.parse()
+        return parsed
+
+    parse_time, _ = _best_time(parse, repeat)
+    replay_time, decisions = _best_time(lambda: replay(history, domain), repeat)
+    if any(d['decisionType'] == 'FailWorkflowExecution' for d in decisions):
+        raise ValueError('invalid synthetic history: {}'.format(decisions))
+    return collections.OrderedDict([
+        ('scenario', scenario),
+        ('events', len(history.events)),
+        ('input', history.events[0].input['kwargs']),
+        ('unscheduled', unscheduled),
+        ('parse_time', round(parse_time, 6)),
+        ('replay_time', round(replay_time, 6)),
+        ('peak_memory', _peak_memory(lambda: replay(history, domain)) if memory else None),
+        ('decisions', len(decisions)),
+        ('decision_types', dict(collections.Counter(d['decisionType'] for d in decisions))),
+    ])
+
+
+def run(events=(1000, 10000, 100000), scenarios=('fanout', 'mixed'), unscheduled=0.0, repeat=3, memory=True):
+    """
+    Run the benchmark suite.
+
+    :type events: Iterable[int]
+    :type scenarios: Iterable[str]
+    :rtype: dict[str, Any]
+    """
+    results = [
+        benchmark(nb_events, scenario, unscheduled, repeat, memory)
+        for scenario in scenarios
+        for nb_events in events
+    ]
+    return collections.OrderedDict([
+        ('simpleflow', simpleflow.__version__),
+        ('python', platform.python_version()),
+        ('repeat', repeat),
+        ('results', results),
+    ])
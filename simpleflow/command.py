@@ -11,7 +11,6 @@ import sys
 import time
 from uuid import uuid4
 
-import boto.connection
 import click
 
 from simpleflow import format
@@ -53,24 +52,6 @@ def get_workflow(clspath):
     return cls
 
 
-def disable_boto_connection_pooling():
-    # boto connection pooling doesn't work very well with multiprocessing, it
-    # provokes some errors like this:
-    #
-    #    [Errno 1] _ssl.c:1429: error:1408F119:SSL routines:SSL3_GET_RECORD:decryption failed or bad record mac
-    # when polling on analysis-testjbb-repair-a61ff96e854344748e308fefc9ddff61
-    #
-    # It's because when forking, file handles are copied and sockets are shared.
-    # Even sockets that handle SSL conections to AWS services, but SSL
-    # connections are stateful! So with multiple workers, it collides.
-    #
-    # To disable boto's connection pooling (which in practice makes boto open a
-    # *NEW* connection for each call), we make make boto believe we run on
-    # Google App Engine, where it disables connection pooling. There's no
-    # "direct" setting, so that's a hack but that works.
-    boto.connection.ON_APP_ENGINE = True
-
-
 def comma_separated_list(value):
     """
     Transforms a comma-separated list into a list of strings.
@@ -149,6 +130,13 @@ def transform_input(wf_input):
 @click.option('--local', default=False, is_flag=True,
               required=False,
               help='Run the workflow locally without calling Amazon SWF.')
+@click.option('--local-workers',
+              type=int,
+              required=False,
+              help='Local mode: execute up to N activities in parallel.')
+@click.option('--local-processes', default=False, is_flag=True,
+              required=False,
+              help='Local mode: execute activities in processes instead of threads.')
 @click.option('--input', '-i',
               required=False,
               help='JSON input of the workflow.')
@@ -186,7 +174,9 @@ def start_workflow(workflow,
                    decision_tasks_timeout,
                    input,
                    input_file,
-                   local):
+                   local,
+                   local_workers=None,
+                   local_processes=False):
     workflow_class = get_workflow(workflow)
 
     wf_input = {}
@@ -196,7 +186,11 @@ def start_workflow(workflow,
     if local:
         from .local import Executor
 
-        Executor(workflow_class).run(wf_input)
+        Executor(
+            workflow_class,
+            max_workers=local_workers,
+            use_processes=local_processes,
+        ).run(wf_input)
 
         return
 
@@ -265,6 +259,13 @@ def with_format(ctx):
     )
 
 
+def with_streamed_format(ctx):
+    return pretty.streamed(
+        with_header=ctx.parent.params['header'],
+        fmt=ctx.parent.params['format'] or pretty.DEFAULT_FORMAT,
+    )
+
+
 @click.argument('run_id', required=False)
 @click.argument('workflow_id')
 @click.argument('domain',
@@ -298,6 +299,33 @@ def profile(ctx, domain, workflow_id, run_id, nb_tasks):
     ))
 
 
+@click.option('--nb-tasks', default=None, type=int,
+              help='Maximum number of tasks to display.')
+@click.option('--nb-workers', default=8, show_default=True, type=int,
+              help='Number of histories fetched concurrently.')
+@click.option('--limit', '-n', default=100, show_default=True, type=int,
+              help='Maximum number of executions to profile.')
+@click.option('--started-since', '-d', default=30, show_default=True, help='Started since N days.')
+@click.option('--workflow-type-version', default=None, help='Workflow Version.')
+@click.argument('workflow_type_name')
+@click.argument('domain',
+                envvar='SWF_DOMAIN',
+                )
+@cli.command('workflow.fleet-profile', help='Profile of the tasks of the closed executions of a workflow type.')
+@click.pass_context
+def fleet_profile(ctx, domain, workflow_type_name, workflow_type_version, started_since, limit, nb_workers,
+                  nb_tasks):
+    print(with_format(ctx)(helpers.show_fleet_profile)(
+        domain,
+        workflow_type_name,
+        workflow_type_version,
+        started_since,
+        limit,
+        nb_workers,
+        nb_tasks,
+    ))
+
+
 @click.option('--nb-tasks', '-n', default=None, type=int,
               help='Maximum number of tasks to display.')
 @click.argument('run_id', required=False)
@@ -323,10 +351,13 @@ def status(ctx, domain, workflow_id, run_id, nb_tasks):
 @click.option('--status', '-s', default='open', show_default=True, type=click.Choice(['open', 'closed']),
               help='Open/Closed')
 @click.option('--started-since', '-d', default=30, show_default=True, help='Started since N days.')
+@click.option('--limit', '-n', default=None, type=int, help='Maximum number of executions to display.')
 @click.pass_context
-def list_workflows(ctx, domain, status, started_since):
-    print(with_format(ctx)(helpers.list_workflow_executions)(domain, status=status.upper(),
-                                                             start_oldest_date=started_since))
+def list_workflows(ctx, domain, status, started_since, limit):
+    for chunk in with_streamed_format(ctx)(helpers.list_workflow_executions)(domain, status=status.upper(),
+                                                                             start_oldest_date=started_since,
+                                                                             limit=limit):
+        print(chunk)
 
 
 @click.argument('domain',
@@ -341,23 +372,26 @@ def list_workflows(ctx, domain, status, started_since):
 @click.option('--workflow-type-name', default=None, help='Workflow Name.')
 @click.option('--workflow-type-version', default=None, help='Workflow Version (name needed).')
 @click.option('--started-since', '-d', default=30, show_default=True, help='Started since N days.')
+@click.option('--limit', '-n', default=None, type=int, help='Maximum number of executions to display.')
 @click.pass_context
 def filter_workflows(ctx, domain, status, tag,
                      workflow_id, workflow_type_name,
-                     workflow_type_version, started_since):
+                     workflow_type_version, started_since, limit):
     status = status.upper()
-    kwargs = {}
+    kwargs = {'limit': limit}
     if status == swf.models.workflow.WorkflowExecution.STATUS_OPEN:
         kwargs['oldest_date'] = started_since
     else:
         kwargs['start_oldest_date'] = started_since
-    print(with_format(ctx)(helpers.filter_workflow_executions)(domain, status=status.upper(),
-                                                               tag=tag,
-                                                               workflow_id=workflow_id,
-                                                               workflow_type_name=workflow_type_name,
-                                                               workflow_type_version=workflow_type_version,
-                                                               **kwargs
-                                                               ))
+    for chunk in with_streamed_format(ctx)(helpers.filter_workflow_executions)(
+            domain,
+            status=status,
+            tag=tag,
+            workflow_id=workflow_id,
+            workflow_type_name=workflow_type_name,
+            workflow_type_version=workflow_type_version,
+            **kwargs):
+        print(chunk)
 
 
 @click.argument('task_id')
@@ -375,6 +409,14 @@ def task_info(ctx, domain, workflow_id, task_id, details):
     print(with_format(ctx)(helpers.get_task)(domain, workflow_id, task_id, details))
 
 
+@click.option('--preload-workflows',
+              type=comma_separated_list,
+              required=False,
+              help='Other workflows to load before polling, e.g. child workflows (comma separated).')
+@click.option('--max-processes', type=int,
+              help='Scale the number of processes with the task list backlog, up to N.')
+@click.option('--min-processes', type=int,
+              help='Minimum number of processes when autoscaling (default: 1).')
 @click.option('--nb-processes', '-N', type=int)
 @click.option('--log-level', '-l')
 @click.option('--task-list')
@@ -384,7 +426,8 @@ def task_info(ctx, domain, workflow_id, task_id, details):
               help='SWF Domain')
 @click.argument('workflows', nargs=-1, required=True)
 @cli.command('decider.start', help='Start a decider process to manage workflow executions.')
-def start_decider(workflows, domain, task_list, log_level, nb_processes):
+def start_decider(workflows, domain, task_list, log_level, nb_processes, min_processes, max_processes,
+                  preload_workflows):
     if log_level:
         logger.warning(
             "Deprecated: --log-level will be removed, use LOG_LEVEL environment variable instead"
@@ -395,9 +438,25 @@ def start_decider(workflows, domain, task_list, log_level, nb_processes):
         task_list,
         None,
         nb_processes,
+        min_processes=min_processes,
+        max_processes=max_processes,
+        preload_workflows=preload_workflows,
     )
 
 
+@click.option('--preload',
+              type=comma_separated_list,
+              required=False,
+              help='Modules to import, and whose activities to resolve, before polling (comma separated).')
+@click.option('--kill-grace-period',
+              type=float,
+              required=False,
+              default=worker.base.KILL_GRACE_PERIOD,
+              help='Seconds between SIGTERM and SIGKILL when stopping a cancelled task.')
+@click.option('--cancel-check-interval',
+              type=int,
+              required=False,
+              help='Check for task cancellation every N seconds (default: heartbeat interval).')
 @click.option('--poll-data',
               help='Provide a base64 encoded json dump of the SWF poll response, instead of polling SWF',
               )
@@ -414,6 +473,10 @@ def start_decider(workflows, domain, task_list, log_level, nb_processes):
               required=False,
               default=60,
               help='Heartbeat interval in seconds (0 to disable heartbeating).')
+@click.option('--max-processes', type=int,
+              help='Scale the number of processes with the task list backlog, up to N.')
+@click.option('--min-processes', type=int,
+              help='Minimum number of processes when autoscaling (default: 1).')
 @click.option('--nb-processes', '-N', type=int)
 @click.option('--log-level', '-l')
 @click.option('--task-list')
@@ -422,7 +485,8 @@ def start_decider(workflows, domain, task_list, log_level, nb_processes):
               required=True,
               help='SWF Domain')
 @cli.command('worker.start', help='Start a worker process to handle activity tasks.')
-def start_worker(domain, task_list, log_level, nb_processes, heartbeat, one_task, process_mode, poll_data):
+def start_worker(domain, task_list, log_level, nb_processes, heartbeat, one_task, process_mode, poll_data,
+                 cancel_check_interval, kill_grace_period, min_processes, max_processes, preload):
     if log_level:
         logger.warning(
             "Deprecated: --log-level will be removed, use LOG_LEVEL environment variable instead"
@@ -444,6 +508,11 @@ def start_worker(domain, task_list, log_level, nb_processes, heartbeat, one_task
         one_task,
         process_mode,
         poll_data,
+        cancel_check_interval=cancel_check_interval,
+        kill_grace_period=kill_grace_period,
+        min_processes=min_processes,
+        max_processes=max_processes,
+        preload=preload,
     )
 
 
@@ -530,8 +599,6 @@ def standalone(context,
     with a single main process.
 
     """
-    disable_boto_connection_pooling()
-
     if force_activities and not repair:
         raise ValueError(
             "You should only use --force-activities with --repair."
@@ -753,3 +820,72 @@ def binaries_download(locations):
 def _download_binary(spec):
     progname, location = spec.split("=", 2)
     download_binaries({progname: location})
+
+
+@click.option('--events',
+              type=comma_separated_list,
+              default='1000,10000,100000',
+              help='Comma-separated sizes of the synthetic histories, in events.')
+@click.option('--scenario',
+              type=click.Choice(['fanout', 'mixed']),
+              multiple=True,
+              help='Kind of history: activities only, or with child workflows, markers, timers and signals. '
+                   'Can be repeated; defaults to all.')
+@click.option('--unscheduled',
+              type=float,
+              default=0.0,
+              help='Ratio of activities left for the replay to schedule.')
+@click.option('--repeat',
+              type=int,
+              default=3,
+              help='Number of runs; the best time is reported.')
+@click.option('--no-memory', default=False, is_flag=True,
+              help='Skip the peak memory measurement.')
+@cli.command('benchmark.replay', help='Benchmark the replay of synthetic histories by the decider, offline.')
+def benchmark_replay(events, scenario, unscheduled, repeat, no_memory):
+    from simpleflow import benchmark
+
+    logging.getLogger('simpleflow').setLevel(logging.WARNING)
+    results = benchmark.run(
+        events=[int(nb_events) for nb_events in events],
+        scenarios=scenario or sorted(benchmark.SCENARIOS),
+        unscheduled=unscheduled,
+        repeat=repeat,
+        memory=not no_memory,
+    )
+    print(json_dumps(results, pretty=True))
+
+
+@click.option('--host', default='127.0.0.1', help='Address to listen on.')
+@click.option('--port', type=int, default=8080, help='Port to listen on.')
+@click.option('--domain', multiple=True, help='Domain to register; can be repeated.')
+@click.option('--poll-timeout', type=float, default=60, help='Long polling duration, in seconds.')
+@cli.command('emulator.start', help='Serve an in-memory SWF emulator, e.g. for offline throughput tests. '
+                                    'Point deciders and workers at it with SWF_ENDPOINT_URL=http://host:port.')
+def start_emulator(host, port, domain, poll_timeout):
+    from swf import emulator
+
+    emulator.serve(host, port, service=emulator.Service(poll_timeout=poll_timeout), domains=domain)
+
+
+@click.option('--output', '-o', default=None,
+              help='File to write the metrics to, atomically; defaults to stdout.')
+@cli.command('metrics.export', help='Print the metrics of the deciders and workers of this host, '
+                                    'in the Prometheus text format. See SIMPLEFLOW_METRICS_DIRECTORY.')
+def export_metrics(output):
+    from simpleflow import metrics
+
+    if output:
+        metrics.write_textfile(output)
+    else:
+        sys.stdout.write(metrics.render())
+
+
+@click.option('--host', default='127.0.0.1', help='Address to listen on.')
+@click.option('--port', type=int, default=9090, help='Port to listen on.')
+@cli.command('metrics.serve', help='Serve the metrics of the deciders and workers of this host '
+                                   'on http://host:port/metrics. See SIMPLEFLOW_METRICS_DIRECTORY.')
+def serve_metrics(host, port):
+    from simpleflow import metrics
+
+    metrics.serve(host, port)
@@ -2,10 +2,16 @@
 import importlib
 
 from simpleflow.activity import Activity
+from simpleflow.registry import registry
 
 from .exceptions import DispatchError
 
 
+# Activities already dispatched in this process, by name. Workers fill it
+# with preload() before forking task processes, which then inherit it.
+_activities = {}
+
+
 class Dispatcher(object):
     """
     Dispatch by name, like simpleflow.swf.process.worker.dispatch.by_module.ModuleDispatcher
@@ -21,19 +27,46 @@ class Dispatcher(object):
         :rtype: Activity
         :raise DispatchError: if doesn't exist or not an activity
         """
-        module_name, activity_name = name.rsplit('.', 1)
-        module = importlib.import_module(module_name)
-        activity = getattr(module, activity_name, None)
-        if not activity:
-            # We were not able to import a function at all.
-            raise DispatchError("unable to import '{}'".format(name))
-        if not isinstance(activity, Activity):
-            # We managed to import a function (or callable) but it's not an
-            # "Activity". We will transform it into an Activity now. That way
-            # we can accept functions that are *not* decorated with
-            # "@activity.with_attributes()" or equivalent. This dispatcher is
-            # used in the context of an activity worker, so we don't actually
-            # care if the task is decorated or not. We only need the decorated
-            # function for the decider (options to schedule, retry, fail, etc.).
-            activity = Activity(activity, activity_name)
+        activity = _activities.get(name)
+        if activity is None:
+            activity = _activities[name] = _import_activity(name)
         return activity
+
+
+def _import_activity(name):
+    module_name, activity_name = name.rsplit('.', 1)
+    module = importlib.import_module(module_name)
+    activity = getattr(module, activity_name, None)
+    if not activity:
+        # We were not able to import a function at all.
+        raise DispatchError("unable to import '{}'".format(name))
+    if not isinstance(activity, Activity):
+        # We managed to import a function (or callable) but it's not an
+        # "Activity". We will transform it into an Activity now. That way
+        # we can accept functions that are *not* decorated with
+        # "@activity.with_attributes()" or equivalent. This dispatcher is
+        # used in the context of an activity worker, so we don't actually
+        # care if the task is decorated or not. We only need the decorated
+        # function for the decider (options to schedule, retry, fail, etc.).
+        activity = Activity(activity, activity_name)
+    return activity
+
+
+def preload(module_names):
+    """
+    Import modules and resolve the activities registered so far, so that
+    dispatching them later is a dict lookup. Activities are found in
+    `simpleflow.registry`, so those registered under a custom name are
+    resolved too.
+
+    :param module_names: modules to import.
+    :type module_names: list[str]
+    :return: number of activities resolved.
+    :rtype: int
+    :raise ImportError: if a module cannot be imported.
+    """
+    for module_name in module_names:
+        importlib.import_module(module_name)
+    for activity in registry:
+        _activities.setdefault(activity.name, activity)
+    return len(_activities)
@@ -3,15 +3,29 @@ import functools
 import hashlib
 import logging
 import os
+import time
+from multiprocessing.pool import ThreadPool
 
-from lockfile import FileLock
+from lockfile import FileLock, LockError
 
+from simpleflow import settings
 from simpleflow.settings import SIMPLEFLOW_BINARIES_DIRECTORY
 from simpleflow.storage import pull
 
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of binaries downloaded at the same time
+MAX_PARALLEL_DOWNLOADS = 4
+
+DEFAULT_CHECKSUM_ALGORITHM = "sha256"
+
+
+class ChecksumError(Exception):
+    """
+    The checksum of a downloaded binary doesn't match the expected one.
+    """
+
 
 class RemoteBinary(object):
     """
@@ -20,27 +34,45 @@ class RemoteBinary(object):
     put it in a dedicated folder so it can be used. It will also prepend this
     folder to $PATH before forking to the real activity worker.
     """
-    def __init__(self, name, remote_location):
+    def __init__(self, name, remote_location, checksum=None):
         """
         :param name: name of the binary to be downloaded
         :type  name: str
         :param remote_location: remote location where to download the binary from (only S3 for now)
         :type  remote_location: str
+        :param checksum: expected checksum, e.g. "sha256:<hex digest>" (sha256 if no algorithm)
+        :type  checksum: Optional[str]
         """
         self.name = name
 
         # limit ourselves to S3 for now
         assert remote_location.startswith("s3://")
         self.remote_location = remote_location
+        self.checksum_algorithm, self.checksum = self._parse_checksum(checksum)
         self.local_directory = self._compute_local_directory()
         self.local_location = self._compute_local_location()
         self.lock_location = self._compute_lock_location()
+        self.checksum_location = self._compute_checksum_location()
+
+    @classmethod
+    def from_binaries_map_item(cls, name, value):
+        """
+        :param name: name of the binary
+        :type  name: str
+        :param value: remote location, or dict with a "location" and an optional "checksum"
+        :type  value: str | dict
+        :rtype: RemoteBinary
+        """
+        if isinstance(value, dict):
+            return cls(name, value["location"], checksum=value.get("checksum"))
+        return cls(name, value)
 
     def download(self):
         self._mkdir_p(self.local_directory)
         with FileLock(self.lock_location):
             if not self._check_binary_present():
                 self._download_binary()
+        self._touch()
 
     def _mkdir_p(self, path):
         try:
@@ -51,6 +83,17 @@ class RemoteBinary(object):
             else:
                 raise
 
+    @staticmethod
+    def _parse_checksum(checksum):
+        if not checksum:
+            return DEFAULT_CHECKSUM_ALGORITHM, None
+        if ":" in checksum:
+            algorithm, checksum = checksum.split(":", 1)
+        else:
+            algorithm = DEFAULT_CHECKSUM_ALGORITHM
+        hashlib.new(algorithm)  # raises ValueError if unsupported
+        return algorithm, checksum.lower()
+
     def _compute_local_directory(self):
         suffix = hashlib.md5(self.remote_location.encode("utf-8")).hexdigest()
         return os.path.join(SIMPLEFLOW_BINARIES_DIRECTORY, "{}-{}".format(self.name, suffix))
@@ -61,24 +104,184 @@ class RemoteBinary(object):
     def _compute_lock_location(self):
         return os.path.join(self.local_directory, ".{}.lock".format(self.name))
 
+    def _compute_checksum_location(self):
+        return os.path.join(self.local_directory, ".{}.{}".format(self.name, self.checksum_algorithm))
+
     def _check_binary_present(self):
-        return os.access(self.local_location, os.X_OK)
+        if not os.access(self.local_location, os.X_OK):
+            return False
+        if self.checksum and self._read_checksum() != self.checksum:
+            logger.warning("Checksum of binary {} not recorded or different, downloading it again".format(
+                self.local_location))
+            return False
+        return True
+
+    def _read_checksum(self):
+        try:
+            with open(self.checksum_location) as f:
+                return f.read().strip()
+        except IOError:
+            return None
+
+    def _compute_checksum(self, path):
+        digest = hashlib.new(self.checksum_algorithm)
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
 
     def _download_binary(self):
+        """
+        Download the binary to a temporary file, verify it, record its
+        checksum, then move it into place: processes never see a partial
+        binary.
+        """
         logger.info("Downloading binary: {} -> {}".format(self.remote_location, self.local_location))
         bucket, path = self.remote_location.replace("s3://", "", 1).split("/", 1)
-        # with FileLock(dest):
-        pull(bucket, path, self.local_location)
-        os.chmod(self.local_location, 0o755)
+        tmp_location = "{}.tmp-{}".format(self.local_location, os.getpid())
+        try:
+            pull(bucket, path, tmp_location)
+            checksum = self._compute_checksum(tmp_location)
+            if self.checksum and checksum != self.checksum:
+                raise ChecksumError("{}: expected {} {}, got {}".format(
+                    self.remote_location, self.checksum_algorithm, self.checksum, checksum))
+            os.chmod(tmp_location, 0o755)
+            with open(self.checksum_location, "w") as f:
+                f.write(checksum)
+            os.rename(tmp_location, self.local_location)
+        finally:
+            if os.path.exists(tmp_location):
+                os.remove(tmp_location)
+
+    def _touch(self):
+        # the modification time of the directory tells when the binary was last used
+        try:
+            os.utime(self.local_directory, None)
+        except OSError:
+            pass
+
+
+def get_directory_size(path):
+    """
+    :type path: str
+    :return: size of the files in *path*, in bytes.
+    :rtype: int
+    """
+    size = 0
+    for root, _, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                size += os.path.getsize(os.path.join(root, filename))
+            except OSError:
+                pass
+    return size
+
+
+def _is_binary_file(filename, binary_name):
+    """
+    Tell whether a file of a binary directory is the binary, its checksum or
+    a leftover download; lock files, including the ones of the processes
+    waiting for the lock, are not.
+    """
+    if ".lock" in filename:
+        return False
+    return (filename == binary_name or
+            filename.startswith(binary_name + ".tmp-") or
+            filename.startswith(".{}.".format(binary_name)))
+
+
+def evict_binaries(max_size, keep=(), min_idle_time=None):
+    """
+    Remove the least recently used binaries until the binaries directory
+    is smaller than *max_size* bytes. Binaries being downloaded, and the ones
+    used recently, which running tasks may still execute, are skipped.
+
+    :param max_size: maximum size, in bytes.
+    :type  max_size: int
+    :param keep: local directories not to remove.
+    :type  keep: Iterable[str]
+    :param min_idle_time: only remove binaries unused for this long, in
+        seconds; defaults to SIMPLEFLOW_BINARIES_EVICTION_MIN_IDLE_TIME.
+    :type  min_idle_time: Optional[float]
+    :return: number of removed binaries.
+    :rtype: int
+    """
+    if min_idle_time is None:
+        min_idle_time = settings.SIMPLEFLOW_BINARIES_EVICTION_MIN_IDLE_TIME
+    last_use_limit = time.time() - min_idle_time
+    keep = set(keep)
+    entries = []
+    total_size = 0
+    try:
+        names = os.listdir(SIMPLEFLOW_BINARIES_DIRECTORY)
+    except OSError:
+        return 0
+    for name in names:
+        directory = os.path.join(SIMPLEFLOW_BINARIES_DIRECTORY, name)
+        if not os.path.isdir(directory):
+            continue
+        size = get_directory_size(directory)
+        total_size += size
+        last_use = os.path.getmtime(directory)
+        if size and directory not in keep and last_use <= last_use_limit:
+            entries.append((last_use, directory, size))
+
+    nb_removed = 0
+    for _, directory, size in sorted(entries):
+        if total_size <= max_size:
+            break
+        binary_name = os.path.basename(directory).rsplit("-", 1)[0]
+        lock = FileLock(os.path.join(directory, ".{}.lock".format(binary_name)))
+        try:
+            lock.acquire(timeout=0)
+        except LockError:
+            continue
+        # NB: the directory and the lock files stay, so that processes waiting
+        # for the lock can still download the binary again.
+        try:
+            logger.info("Removing least recently used binary: {}".format(directory))
+            for filename in os.listdir(directory):
+                if _is_binary_file(filename, binary_name):
+                    os.remove(os.path.join(directory, filename))
+        finally:
+            lock.release()
+        total_size -= size
+        nb_removed += 1
+    return nb_removed
 
 
 # convenience helpers
 def download_binaries(binaries_map):
-    for binary, remote_location in binaries_map.items():
-        binary = RemoteBinary(binary, remote_location)
-        binary.download()
+    """
+    Download the missing binaries, in parallel, and add their directories
+    to $PATH.
+
+    :param binaries_map: binary name -> remote location, or dict with a
+        "location" and an optional "checksum".
+    :type  binaries_map: dict[str, str | dict]
+    """
+    binaries = [
+        RemoteBinary.from_binaries_map_item(name, value)
+        for name, value in sorted(binaries_map.items())
+    ]
+    if len(binaries) > 1:
+        pool = ThreadPool(min(len(binaries), MAX_PARALLEL_DOWNLOADS))
+        try:
+            pool.map(lambda binary: binary.download(), binaries)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        for binary in binaries:
+            binary.download()
+
+    for binary in binaries:
         os.environ["PATH"] = binary.local_directory + ":" + os.environ["PATH"]
 
+    max_size = settings.SIMPLEFLOW_BINARIES_DIRECTORY_MAX_SIZE
+    if binaries and max_size:
+        evict_binaries(max_size, keep=[binary.local_directory for binary in binaries])
+
 
 def with_binaries(binaries_map):
     def decorator(func):
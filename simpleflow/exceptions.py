@@ -2,6 +2,16 @@ class ExecutionBlocked(Exception):
     pass
 
 
+class ContinueAsNew(Exception):
+    """
+    Raised to close the workflow execution and start a new one, with the
+    same workflow ID, from the given input.
+    """
+    def __init__(self, *args, **kwargs):
+        super(ContinueAsNew, self).__init__('workflow execution continued as new')
+        self.input = {'args': args, 'kwargs': kwargs}
+
+
 class TaskException(Exception):
     """
     Wrap an exception raised by a task.
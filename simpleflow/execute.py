@@ -8,8 +8,6 @@ import json
 import time
 from typing import TYPE_CHECKING
 
-import psutil
-
 MAX_ARGUMENTS_JSON_LENGTH = 65536
 
 try:
@@ -26,8 +24,9 @@ from builtins import map
 
 from future.utils import iteritems
 
-from simpleflow import compat, format
+from simpleflow import compat, constants, format, settings
 from simpleflow.exceptions import ExecutionError, ExecutionTimeoutError
+from simpleflow.progress import CONTEXT_KEY as PROGRESS_CONTEXT_KEY
 from simpleflow.utils import json_dumps
 
 if TYPE_CHECKING:
@@ -156,6 +155,84 @@ def get_name(func):
     return '.'.join([prefix, name])
 
 
+def kill_child_processes(pid=None, timeout=0.3, include_parent=False):
+    """
+    Terminate (SIGTERM) the descendants of a process, then kill (SIGKILL) the
+    ones still alive after *timeout* seconds.
+
+    :param pid: process whose descendants to stop; default: current process.
+    :type pid: Optional[int]
+    :param timeout: grace period between SIGTERM and SIGKILL, in seconds.
+    :type timeout: float
+    :param include_parent: also stop the process *pid* itself.
+    :type include_parent: bool
+    :return: processes still alive after SIGKILL, if any.
+    :rtype: list[psutil.Process]
+    """
+    import psutil
+
+    try:
+        process = psutil.Process(pid or os.getpid())
+        children = process.children(recursive=True)
+    except psutil.NoSuchProcess:
+        return []
+    if include_parent:
+        children.append(process)
+
+    for child in children:
+        try:
+            child.terminate()
+        except psutil.NoSuchProcess:
+            pass
+    _, still_alive = psutil.wait_procs(children, timeout=timeout)
+    for child in still_alive:
+        try:
+            child.kill()
+        except psutil.NoSuchProcess:
+            pass
+    if not still_alive:
+        return []
+    _, still_alive = psutil.wait_procs(still_alive, timeout=timeout)
+    return still_alive
+
+
+# memfd_create() is only exposed in the os module from Python 3.8.
+try:
+    import ctypes
+    _libc_memfd_create = ctypes.CDLL(None, use_errno=True).memfd_create
+    _libc_memfd_create.argtypes = [ctypes.c_char_p, ctypes.c_uint]
+    _libc_memfd_create.restype = ctypes.c_int
+except (ImportError, OSError, AttributeError):
+    _libc_memfd_create = None
+
+MFD_CLOEXEC = 1
+
+
+def anonymous_file(name):
+    """
+    Return a temporary file that exists only in memory when possible
+    (memfd_create), instead of a file on the disk of the temporary directory.
+    Arguments and results of executed callables go through such files.
+
+    :param name: name of the file, for debugging only (/proc/<pid>/fd).
+    :type name: str
+    :rtype: file
+    """
+    fd = None
+    try:
+        if hasattr(os, 'memfd_create'):
+            fd = os.memfd_create(name)
+        elif _libc_memfd_create is not None:
+            fd = _libc_memfd_create(name.encode('utf-8'), MFD_CLOEXEC)
+            if fd < 0:
+                fd = None
+    except OSError:
+        fd = None
+    if fd is None:
+        return tempfile.TemporaryFile()
+    return os.fdopen(fd, 'w+b')
+
+
 def wait_subprocess(process, timeout=None, command_info=None):
     """
     Wait for a process, raise if timeout.
@@ -187,7 +264,7 @@ def wait_subprocess(process, timeout=None, command_info=None):
     return process.wait()
 
 
-def python(interpreter='python', logger_name=__name__, timeout=None, kill_children=False):
+def python(interpreter='python', logger_name=__name__, timeout=None, kill_children=False, zygote=None):
     """
     Execute a callable as an external Python program.
 
@@ -196,6 +273,10 @@ def python(interpreter='python', logger_name=__name__, timeout=None, kill_childr
 
     Arguments of the decorated callable must be serializable in JSON.
 
+    With *zygote*, the callable runs in a process forked from a long-lived
+    interpreter (see :mod:`simpleflow.zygote`) instead of a new one. It
+    defaults to the ``SIMPLEFLOW_EXECUTE_ZYGOTE`` setting.
+
     """
 
     def wrap_callable(func):
@@ -205,12 +286,32 @@ def python(interpreter='python', logger_name=__name__, timeout=None, kill_childr
             command = 'simpleflow.execute'  # name of a module.
             sys.stdout.flush()
             sys.stderr.flush()
-            result_str = None  # useless
             context = kwargs.pop('context', {})
-            with tempfile.TemporaryFile() as result_fd, tempfile.TemporaryFile() as error_fd:
+            use_zygote = zygote if zygote is not None else settings.SIMPLEFLOW_EXECUTE_ZYGOTE
+            if use_zygote:
+                from simpleflow import zygote as zygote_module
+                if not zygote_module.is_supported():
+                    use_zygote = False
+            with anonymous_file('result') as result_fd, anonymous_file('error') as error_fd:
                 dup_result_fd = os.dup(result_fd.fileno())  # remove FD_CLOEXEC
                 dup_error_fd = os.dup(error_fd.fileno())  # remove FD_CLOEXEC
                 arguments_json = format_arguments_json(*args, **kwargs)
+                if use_zygote:
+                    try:
+                        rc = zygote_module.get_zygote(interpreter).run(
+                            get_name(func),
+                            arguments_json,
+                            context=context,
+                            logger_name=logger_name,
+                            kill_children=kill_children,
+                            result_fd=dup_result_fd,
+                            error_fd=dup_error_fd,
+                            timeout=timeout,
+                        )
+                    finally:
+                        os.close(dup_result_fd)
+                        os.close(dup_error_fd)
+                    return _read_result(logger, rc, result_fd, error_fd)
                 full_command = [
                     interpreter, '-m', command,  # execute module a script.
                     get_name(func),
@@ -224,7 +325,7 @@ def python(interpreter='python', logger_name=__name__, timeout=None, kill_childr
                     arg_file = None
                     arg_fd = None
                 else:
-                    arg_file = tempfile.TemporaryFile()
+                    arg_file = anonymous_file('arguments')
                     arg_file.write(arguments_json.encode('utf-8'))
                     arg_file.flush()
                     arg_file.seek(0)
@@ -241,6 +342,10 @@ def python(interpreter='python', logger_name=__name__, timeout=None, kill_childr
                     pass_fds = [dup_result_fd, dup_error_fd]
                     if arg_file:
                         pass_fds.append(arg_fd)
+                    progress_fd = (context or {}).get(PROGRESS_CONTEXT_KEY)
+                    if progress_fd is not None:
+                        # let the program report its progress to the worker
+                        pass_fds.append(progress_fd)
                 process = subprocess.Popen(
                     full_command,
                     bufsize=-1,
@@ -252,27 +357,7 @@ def python(interpreter='python', logger_name=__name__, timeout=None, kill_childr
                 os.close(dup_error_fd)
                 if arg_file:
                     arg_file.close()
-                if rc:
-                    error_fd.seek(0)
-                    err_output = error_fd.read()
-                    if err_output:
-                        if not compat.PY2:
-                            err_output = err_output.decode('utf-8', errors='replace')
-                    raise ExecutionError(err_output)
-
-                result_fd.seek(0)
-                result_str = result_fd.read()
-
-            if not result_str:
-                return None
-            try:
-                if not compat.PY2:
-                    result_str = result_str.decode('utf-8', errors='replace')
-                result = format.decode(result_str)
-                return result
-            except BaseException as ex:
-                logger.exception('Exception in python.execute: {} {}'.format(ex.__class__.__name__, ex))
-                logger.warning('%r', result_str)
+                return _read_result(logger, rc, result_fd, error_fd)
 
         # Not automatically assigned in python < 3.2.
         execute.__wrapped__ = func
@@ -282,6 +367,32 @@ def python(interpreter='python', logger_name=__name__, timeout=None, kill_childr
     return wrap_callable
 
 
+def _read_result(logger, rc, result_fd, error_fd):
+    """
+    Decode the result of an executed callable, or raise its error.
+    """
+    if rc:
+        error_fd.seek(0)
+        err_output = error_fd.read()
+        if err_output:
+            if not compat.PY2:
+                err_output = err_output.decode('utf-8', errors='replace')
+        raise ExecutionError(err_output)
+
+    result_fd.seek(0)
+    result_str = result_fd.read()
+    if not result_str:
+        return None
+    try:
+        if not compat.PY2:
+            result_str = result_str.decode('utf-8', errors='replace')
+        result = format.decode(result_str)
+        return result
+    except BaseException as ex:
+        logger.exception('Exception in python.execute: {} {}'.format(ex.__class__.__name__, ex))
+        logger.warning('%r', result_str)
+
+
 def program(path=None, argument_format=format_arguments):
     r"""
     Decorate a callable to execute it as an external program.
@@ -383,6 +494,24 @@ def make_callable(funcname):
     return callable_
 
 
+def _store_large_result(result, logger):
+    """
+    Store a result too long for SWF as a jumbo field from the process that
+    computed it, and return its signature. The worker then forwards the
+    signature to SWF without loading nor uploading the result itself.
+    """
+    if len(result) <= constants.MAX_RESULT_LENGTH or len(result) > constants.JUMBO_FIELDS_MAX_SIZE:
+        return result
+    if not format._jumbo_fields_bucket():
+        return result
+    try:
+        return format.encode(result, constants.MAX_RESULT_LENGTH)
+    except Exception as err:
+        # the worker will try again
+        logger.warning('cannot store result as a jumbo field: {}'.format(err))
+        return result
+
+
 def main():
     """
     When executed as a script, this module expects the name of a callable as
@@ -467,23 +596,6 @@ def main():
     )
     cmd_arguments = parser.parse_args()
 
-    def kill_child_processes():
-        process = psutil.Process(os.getpid())
-        children = process.children(recursive=True)
-
-        for child in children:
-            try:
-                child.terminate()
-            except psutil.NoSuchProcess:
-                pass
-        _, still_alive = psutil.wait_procs(children, timeout=0.3)
-        for child in still_alive:
-            try:
-                child.kill()
-            except psutil.NoSuchProcess:
-                pass
-
-    funcname = cmd_arguments.funcname
     if cmd_arguments.arguments_json_fd is None:
         content = cmd_arguments.funcargs
         if content is None:
@@ -491,13 +603,50 @@ def main():
     else:
         with os.fdopen(cmd_arguments.arguments_json_fd) as arguments_json_file:
             content = arguments_json_file.read()
+    context = json.loads(cmd_arguments.context) if cmd_arguments.context is not None else None
+    rc = run_callable(
+        cmd_arguments.funcname,
+        content,
+        context=context,
+        logger_name=cmd_arguments.logger_name,
+        result_fd=cmd_arguments.result_fd,
+        error_fd=cmd_arguments.error_fd,
+        kill_children=cmd_arguments.kill_children,
+    )
+    if rc:
+        sys.exit(rc)
+
+
+def run_callable(funcname, content, context=None, logger_name=None,
+                 result_fd=1, error_fd=2, kill_children=False):
+    """
+    Run the callable *funcname* with the arguments encoded in *content*, and
+    write its result in JSON to *result_fd*, or its error to *error_fd*.
+
+    :param funcname: name of the callable.
+    :type funcname: str
+    :param content: arguments of the callable, as `format_arguments_json` encodes them.
+    :type content: str
+    :param context: activity context.
+    :type context: Optional[dict]
+    :param logger_name:
+    :type logger_name: Optional[str]
+    :param result_fd:
+    :type result_fd: int
+    :param error_fd:
+    :type error_fd: int
+    :param kill_children: kill child processes on exit.
+    :type kill_children: bool
+    :return: exit code: 0 on success, 1 on error.
+    :rtype: int
+    """
     try:
         arguments = format.decode(content)
     except Exception:
         raise ValueError('cannot load arguments from {}'.format(
             content))
-    if cmd_arguments.logger_name:
-        logger = logging.getLogger(cmd_arguments.logger_name)
+    if logger_name:
+        logger = logging.getLogger(logger_name)
     else:
         logger = logging.getLogger(__name__)
     callable_ = make_callable(funcname)
@@ -505,7 +654,6 @@ def main():
         callable_ = callable_.__wrapped__
     args = arguments.get('args', ())
     kwargs = arguments.get('kwargs', {})
-    context = json.loads(cmd_arguments.context) if cmd_arguments.context is not None else None
     try:
         if hasattr(callable_, 'execute'):
             inst = callable_(*args, **kwargs)
@@ -530,24 +678,27 @@ def main():
             },
             default=repr,
         )
-        if cmd_arguments.error_fd == 2:
+        if error_fd == 2:
             sys.stderr.flush()
         if not compat.PY2:
             details = details.encode('utf-8')
-        os.write(cmd_arguments.error_fd, details)
-        if cmd_arguments.kill_children:
+        os.write(error_fd, details)
+        if kill_children:
             kill_child_processes()
-        sys.exit(1)
+        return 1
 
-    if cmd_arguments.result_fd == 1:  # stdout (legacy)
+    if result_fd == 1:  # stdout (legacy)
         sys.stdout.flush()  # may have print's in flight
-        os.write(cmd_arguments.result_fd, b'\n')
+        os.write(result_fd, b'\n')
     result = json_dumps(result)
+    if result_fd != 1:
+        result = _store_large_result(result, logger)
     if not compat.PY2:
         result = result.encode('utf-8')
-    os.write(cmd_arguments.result_fd, result)
-    if cmd_arguments.kill_children:
+    os.write(result_fd, result)
+    if kill_children:
         kill_child_processes()
+    return 0
 
 
 if __name__ == '__main__':
@@ -1,7 +1,9 @@
 import abc
 import logging
 
+from . import exceptions
 from ._decorators import deprecated
+from .marker import CHECKPOINT_MARKER_PREFIX, Marker
 
 if False:
     from typing import Type
@@ -135,6 +137,28 @@ class Executor(object):
         """
         pass
 
+    def continue_as_new(self, *args, **kwargs):
+        """
+        Close the workflow execution and start a new one with *args* and
+        *kwargs* as input.
+
+        :raises: exceptions.ContinueAsNew
+        """
+        raise exceptions.ContinueAsNew(*args, **kwargs)
+
+    def should_continue_as_new(self):
+        """
+        Whether the history of the execution reached the
+        ``max_history_events`` of the workflow.
+
+        :rtype: bool
+        """
+        max_history_events = getattr(self._workflow_class, 'max_history_events', None)
+        history = getattr(self, '_history', None)
+        if not max_history_events or history is None:
+            return False
+        return len(history.events) >= max_history_events
+
     def before_replay(self):
         pass
 
@@ -181,6 +205,65 @@ class Executor(object):
     def list_markers(self, all=False):
         raise NotImplementedError
 
+    def record_checkpoint(self, name, state=None):
+        """
+        Marker recording a checkpoint: its state, and the counters numbering
+        the tasks submitted so far, so that the tasks submitted after the
+        checkpoint keep their IDs once the phase is skipped.
+
+        :type name: str
+        :param state: JSON-serializable state.
+        :type state: Any
+        """
+        return self.record_marker(CHECKPOINT_MARKER_PREFIX + name, {
+            'state': state,
+            'task_counters': self.get_task_counters(),
+        })
+
+    def get_checkpoint(self, name):
+        """
+        Get the last checkpoint recorded with this name.
+
+        :type name: str
+        :return: checkpoint, its details being the recorded state.
+        :rtype: Optional[Marker]
+        """
+        marker_name = CHECKPOINT_MARKER_PREFIX + name
+        for marker in self.list_markers():
+            if marker.name == marker_name:
+                return self._resume_from_checkpoint(name, marker.details)
+        return None
+
+    def _resume_from_checkpoint(self, name, details):
+        """
+        Restore the task counters recorded by a checkpoint.
+
+        :type name: str
+        :param details: details of the checkpoint marker.
+        :type details: Any
+        :rtype: Marker
+        """
+        if isinstance(details, dict) and set(details) == {'state', 'task_counters'}:
+            self.restore_task_counters(details['task_counters'])
+            details = details['state']
+        return Marker(name, details)
+
+    def get_task_counters(self):
+        """
+        Number of tasks submitted so far, by name, used to build task IDs.
+
+        :rtype: dict[str, int]
+        """
+        return {}
+
+    def restore_task_counters(self, counters):
+        """
+        Resume the numbering of the tasks after a skipped phase.
+
+        :param counters: see get_task_counters().
+        :type counters: dict[str, int]
+        """
+
     @abc.abstractmethod
     def get_event_details(self, event_type, event_name):
         raise NotImplementedError
@@ -1,11 +1,9 @@
 import os
 from uuid import uuid4
 
-from diskcache import Cache
 import lazy_object_proxy
-from sqlite3 import OperationalError
 
-from simpleflow import constants, logger, storage
+from simpleflow import constants, logger
 from simpleflow.settings import SIMPLEFLOW_ENABLE_DISK_CACHE
 from simpleflow.utils import json_dumps, json_loads_or_raw
 
@@ -40,6 +38,10 @@ def decode(content, parse_json=True, use_proxy=True):
                 return json_loads_or_raw(value)
             return value
 
+        # allows to re-encode the value without pulling it, see jumbo_signature()
+        unwrap.jumbo_signature = content
+        unwrap.parse_json = parse_json
+
         if use_proxy:
             return lazy_object_proxy.Proxy(unwrap)
         return unwrap()
@@ -76,6 +78,24 @@ def encode(message, max_length, allow_jumbo_fields=True):
     return message
 
 
+def jumbo_signature(value):
+    """
+    Return the jumbo field signature of a value decoded lazily from a jumbo
+    field with `decode()`, without pulling its content; or None.
+
+    This lets a result stored as a jumbo field by the process that computed it
+    (see `simpleflow.execute`) be sent to SWF as is.
+
+    Once pulled, the value may have been modified: it is then encoded again.
+    """
+    if type(value) is not lazy_object_proxy.Proxy or value.__resolved__:
+        return None
+    factory = value.__factory__
+    if not getattr(factory, 'parse_json', False):
+        return None
+    return getattr(factory, 'jumbo_signature', None)
+
+
 def _get_cached(path):
     # 1/ memory cache
     if path in JUMBO_FIELDS_MEMORY_CACHE:
@@ -83,6 +103,9 @@ def _get_cached(path):
 
     # 2/ disk cache
     if SIMPLEFLOW_ENABLE_DISK_CACHE:
+        from diskcache import Cache
+        from sqlite3 import OperationalError
+
         try:
             # NB: this cache may also be triggered on activity workers, where it's not that
             # useful. The performance hit should be minimal. To be improved later.
@@ -108,6 +131,9 @@ def _set_cached(path, content):
 
     # 2/ disk cache
     if SIMPLEFLOW_ENABLE_DISK_CACHE:
+        from diskcache import Cache
+        from sqlite3 import OperationalError
+
         try:
             cache = Cache(constants.CACHE_DIR)
             cache_key = "jumbo_fields/" + path.split("/")[-1]
@@ -118,6 +144,8 @@ def _set_cached(path, content):
 
 
 def _push_jumbo_field(message):
+    from simpleflow import storage  # imports boto
+
     size = len(message)
     uuid = str(uuid4())
     bucket_with_dir = _jumbo_fields_bucket()
@@ -135,6 +163,8 @@ def _push_jumbo_field(message):
 
 
 def _pull_jumbo_field(location):
+    from simpleflow import storage  # imports boto
+
     bucket, path = location.replace(constants.JUMBO_FIELDS_PREFIX, "").split("/", 1)
 
     cached_value = _get_cached(path)
@@ -183,6 +213,12 @@ def reason(message):
 
 
 def result(message):
+    if type(message) is lazy_object_proxy.Proxy:
+        signature = jumbo_signature(message)
+        if signature and len(signature) <= constants.MAX_RESULT_LENGTH:
+            return signature
+        # json_dumps() would serialize the proxy as a string
+        message = message.__wrapped__
     return encode(json_dumps(message), constants.MAX_RESULT_LENGTH)
 
 
@@ -1 +1 @@
-from .k8s import KubernetesJob  # noqa
+from .k8s import JobSubmitter, KubernetesJob  # noqa
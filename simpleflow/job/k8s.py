@@ -1,14 +1,85 @@
 from base64 import b64encode
-import jinja2
 import json
+import logging
 import os
-import yaml
+import threading
 
-import kubernetes.config
-import kubernetes.client
+try:
+    import queue
+except ImportError:  # Python 2
+    import Queue as queue
 
 from simpleflow.utils import json_dumps
 
+# NB: kubernetes, jinja2 and yaml are slow to import and only needed by workers
+# in the "kubernetes" process mode, so they are imported when used.
+
+logger = logging.getLogger(__name__)
+
+# Per-process caches: the Kubernetes API client and the jinja2 environments,
+# which keep the compiled job templates.
+_api = None
+_api_pid = None
+_api_lock = threading.Lock()
+_environments = {}
+_environments_lock = threading.Lock()
+
+
+def get_batch_api():
+    """
+    Get the Kubernetes batch API client of the current process, loading the
+    cluster config the first time.
+
+    :rtype: kubernetes.client.BatchV1Api
+    """
+    global _api, _api_pid
+
+    with _api_lock:
+        if _api is None or _api_pid != os.getpid():
+            import kubernetes.client
+
+            load_config()
+            _api = kubernetes.client.BatchV1Api()
+            _api_pid = os.getpid()
+        return _api
+
+
+def load_config():
+    """
+    Load config in the current Kubernetes cluster, either via in cluster config
+    or via the local kube config if on a development machine.
+    """
+    import kubernetes.config
+
+    try:
+        kubernetes.config.load_incluster_config()
+    except kubernetes.config.ConfigException:
+        kubernetes.config.load_kube_config()
+
+
+def get_template(job_template):
+    """
+    Get a job template. Templates are compiled once per process, and reloaded
+    if their file changes.
+
+    :param job_template: path of the template.
+    :type job_template: str
+    :rtype: jinja2.Template
+    """
+    import jinja2
+
+    path, filename = os.path.split(job_template)
+    path = path or './'
+    with _environments_lock:
+        env = _environments.get(path)
+        if env is None:
+            env = jinja2.Environment(
+                loader=jinja2.FileSystemLoader(path),
+                undefined=jinja2.StrictUndefined,
+            )
+            _environments[path] = env
+        return env.get_template(filename)
+
 
 class KubernetesJob(object):
     def __init__(self, job_name, domain, response):
@@ -21,10 +92,7 @@ class KubernetesJob(object):
         Load config in the current Kubernetes cluster, either via in cluster config
         or via the local kube config if on a development machine.
         """
-        try:
-            kubernetes.config.load_incluster_config()
-        except kubernetes.config.ConfigException:
-            kubernetes.config.load_kube_config()
+        load_config()
 
     def compute_job_definition(self):
         """
@@ -41,20 +109,17 @@ class KubernetesJob(object):
 
         # setup variables that will be interpolated in the template
         variables = dict(os.environ)
-        for key, value in meta.get("k8s_job_data", {}):
+        for key, value in meta.get("k8s_job_data", {}).items():
             variables[key] = value
         variables["JOB_NAME"] = self.job_name
-        variables["PAYLOAD"] = b64encode(json_dumps(self.response))
+        variables["PAYLOAD"] = b64encode(json_dumps(self.response).encode('utf-8')).decode('ascii')
 
         # render the job template with those context variables
-        path, filename = os.path.split(job_template)
-        env = jinja2.Environment(
-            loader=jinja2.FileSystemLoader(path or './'),
-            undefined=jinja2.StrictUndefined,
-        )
-        rendered = env.get_template(filename).render(variables)
+        import yaml
 
-        return yaml.load(rendered)
+        rendered = get_template(job_template).render(variables)
+
+        return yaml.safe_load(rendered)
 
     def schedule(self):
         """
@@ -64,10 +129,70 @@ class KubernetesJob(object):
         # build job definition
         job_definition = self.compute_job_definition()
 
-        # load cluster config
-        self.load_config()
-
         # schedule job
-        api = kubernetes.client.BatchV1Api()
+        api = get_batch_api()
         namespace = os.getenv("K8S_NAMESPACE", "default")
         api.create_namespaced_job(body=job_definition, namespace=namespace)
+
+
+class JobSubmitter(object):
+    """
+    Schedule Kubernetes jobs in background threads, so that the poller can
+    go back to polling while jobs are created.
+
+    At most *concurrency* jobs are scheduled at the same time, and at most
+    *max_pending* wait for a thread: submitting more blocks the caller.
+
+    :ivar concurrency: number of threads.
+    :type concurrency: int
+    """
+    def __init__(self, concurrency, max_pending=None):
+        self.concurrency = concurrency
+        self._queue = queue.Queue(maxsize=max_pending or 2 * concurrency)
+        self._threads = []
+        self._threads_pid = None
+
+    def _start_threads(self):
+        # Threads don't survive forks: start them in the process submitting jobs.
+        if self._threads_pid == os.getpid():
+            return
+        self._threads = []
+        for _ in range(self.concurrency):
+            thread = threading.Thread(target=self._run)
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+        self._threads_pid = os.getpid()
+
+    def submit(self, job, on_error=None):
+        """
+        Schedule a job in the background.
+
+        :param job:
+        :type job: KubernetesJob
+        :param on_error: called with the exception if the job cannot be scheduled.
+        :type on_error: Optional[Callable[[Exception], None]]
+        """
+        self._start_threads()
+        self._queue.put((job, on_error))
+
+    def _run(self):
+        while True:
+            job, on_error = self._queue.get()
+            try:
+                job.schedule()
+            except Exception as err:
+                logger.exception('cannot schedule kubernetes job {}'.format(job.job_name))
+                if on_error:
+                    try:
+                        on_error(err)
+                    except Exception:
+                        logger.exception('error handler of kubernetes job {} failed'.format(job.job_name))
+            finally:
+                self._queue.task_done()
+
+    def join(self):
+        """
+        Wait for the submitted jobs to be scheduled.
+        """
+        self._queue.join()
@@ -9,6 +9,7 @@ from simpleflow import (
     futures,
 )
 from simpleflow.base import Submittable
+from simpleflow.dispatch import dynamic_dispatcher
 from simpleflow.marker import Marker
 from simpleflow.signal import WaitForSignal
 from simpleflow.task import ActivityTask, WorkflowTask, SignalTask, MarkerTask
@@ -22,18 +23,49 @@ from simpleflow.history import History
 logger = logging.getLogger(__name__)
 
 
+def _execute_activity(name, args, kwargs, context):
+    """
+    Execute the activity *name* in a process of the pool: activities are
+    dispatched by name, like in activity workers, as they cannot be pickled.
+    """
+    activity = dynamic_dispatcher.Dispatcher().dispatch_activity(name)
+    return ActivityTask(activity, *args, context=context, **kwargs).execute()
+
+
 class Executor(executor.Executor):
     """
-    Executes all tasks synchronously in a single local process.
+    Executes the tasks of a workflow in a single local process.
+
+    By default, tasks are executed synchronously, in order. With
+    *max_workers*, activities are executed in parallel in a
+    :mod:`concurrent.futures` pool of threads (or processes with
+    *use_processes*): submissions return pending futures and the workflow is
+    replayed each time an activity finishes, until it stops blocking, like with
+    Amazon SWF. Tasks are identified by their name and their number of
+    occurrences in a replay. Other tasks (child workflows, signals, markers,
+    timers) are still executed synchronously.
+
+    Function-based activities set their context on the function itself: use
+    processes rather than threads if they use it.
 
+    :ivar max_workers: size of the pool; None to execute tasks synchronously.
+    :type max_workers: Optional[int]
+    :ivar use_processes: use a process pool instead of a thread pool.
+    :type use_processes: bool
     """
 
-    def __init__(self, workflow_class):
+    def __init__(self, workflow_class, max_workers=None, use_processes=False):
         super(Executor, self).__init__(workflow_class)
         self.update_workflow_class()
         self.nb_activities = 0
         self.signals_sent = set()
         self._markers = collections.OrderedDict()
+        self.max_workers = max_workers
+        self.use_processes = use_processes
+        self._pool = None
+        self._tasks = collections.Counter()  # task name -> occurrences in the current replay
+        self._submitted = {}  # task id -> (activity id, concurrent future) for activities in the pool
+        self._finished = {}  # task id -> finished simpleflow future
 
     def update_workflow_class(self):
         """
@@ -53,16 +85,30 @@ class Executor(executor.Executor):
             self._workflow_class,
             input=input)
 
+    @property
+    def parallel(self):
+        return bool(self.max_workers)
+
     def submit(self, func, *args, **kwargs):
+        if self.parallel:
+            return self._submit_parallel(func, *args, **kwargs)
+
         logger.info('executing task {}(args={}, kwargs={})'.format(
             func, args, kwargs))
 
-        future = futures.Future()
-
         context = self.get_run_context()
         context["activity_id"] = str(self.nb_activities)
         self.nb_activities += 1
+        task, func = self._make_task(context, func, *args, **kwargs)
+        return self._execute(task, func, context, args, kwargs)
+
+    def _make_task(self, context, func, *args, **kwargs):
+        """
+        Build the task to execute.
 
+        :return: task and the activity or workflow it runs, if any.
+        :rtype: (simpleflow.base.Submittable, Optional[Activity | type])
+        """
         # Ensure signals ordering
         if isinstance(func, SignalTask):
             self.signals_sent.add(func.name)
@@ -72,8 +118,6 @@ class Executor(executor.Executor):
                 raise NotImplementedError(
                     'wait_signal({}) before signal was sent: unsupported by the local executor'.format(signal_name)
                 )
-        elif isinstance(func, MarkerTask):
-            self._markers.setdefault(func.name, []).append(Marker(func.name, func.details))
 
         if isinstance(func, Submittable):
             task = func  # *args, **kwargs already resolved.
@@ -86,22 +130,39 @@ class Executor(executor.Executor):
         else:
             raise TypeError('invalid type {} for {}'.format(
                 type(func), func))
+        return task, func
 
+    def _execute(self, task, func, context, args, kwargs):
+        future = futures.Future()
+        if isinstance(task, MarkerTask):
+            self._markers.setdefault(task.name, []).append(Marker(task.name, task.details))
         try:
             future._result = task.execute()
             if hasattr(task, 'post_execute'):
                 task.post_execute()
-            state = 'completed'
+        except exceptions.ExecutionBlocked:
+            # child workflow waiting for activities in parallel mode
+            raise
         except Exception:
-            exc_type, exc_value, exc_traceback = sys.exc_info()
-            future._exception = exc_value
-            logger.exception('rescuing exception: {}'.format(exc_value))
+            future._exception = sys.exc_info()[1]
+            logger.exception('rescuing exception: {}'.format(future._exception))
+        future._state = futures.FINISHED
+        self._record(future, func, context["activity_id"], args, kwargs)
+        return future
+
+    def _record(self, future, func, activity_id, args, kwargs):
+        """
+        Add a finished task to the history. Raise TaskFailed if it failed
+        and *func* raises on failure.
+        """
+        exc_value = future._exception
+        if exc_value is not None:
             if (isinstance(func, Activity) or issubclass_(func, Workflow)) and getattr(func, 'raises_on_failure', None):
-                tb = traceback.format_tb(exc_traceback)
+                tb = traceback.format_tb(getattr(exc_value, '__traceback__', None) or sys.exc_info()[2])
                 message = format_exc(exc_value)
                 details = json_dumps(
                     {
-                        'error': exc_type.__name__,
+                        'error': type(exc_value).__name__,
                         'message': str(exc_value),
                         'traceback': tb,
                     },
@@ -113,19 +174,101 @@ class Executor(executor.Executor):
                     details,
                 )
             state = 'failed'
-        finally:
-            future._state = futures.FINISHED
+        else:
+            state = 'completed'
 
         if func:
             self._history.add_activity_task(
                 func,
                 decision_id=None,
                 last_state=state,
-                activity_id=context["activity_id"],
+                activity_id=activity_id,
                 input={'args': args, 'kwargs': kwargs},
                 result=future.result)
+
+    def _submit_parallel(self, func, *args, **kwargs):
+        context = self.get_run_context()
+        task, func = self._make_task(context, func, *args, **kwargs)
+        name = getattr(task, 'name', None) or getattr(task, 'signal_name', type(task).__name__)
+        self._tasks[name] += 1
+        task_id = '{}-{}'.format(name, self._tasks[name])
+        future = self._finished.get(task_id)
+        if future is not None:
+            return future
+
+        if not isinstance(task, ActivityTask):
+            context["activity_id"] = str(self.nb_activities)
+            self.nb_activities += 1
+            future = self._execute(task, func, context, args, kwargs)
+            self._finished[task_id] = future
+            return future
+
+        if task_id not in self._submitted:
+            logger.info('submitting task {}(args={}, kwargs={})'.format(
+                func, args, kwargs))
+            context["activity_id"] = str(self.nb_activities)
+            self.nb_activities += 1
+            if self.use_processes:
+                pool_future = self._get_pool().submit(
+                    _execute_activity, task.activity.name, task.args, task.kwargs, context)
+            else:
+                pool_future = self._get_pool().submit(task.execute)
+            self._submitted[task_id] = (context["activity_id"], pool_future)
+
+        activity_id, pool_future = self._submitted[task_id]
+        future = futures.Future()
+        if not pool_future.done():
+            future._state = futures.RUNNING if pool_future.running() else futures.PENDING
+            return future
+
+        del self._submitted[task_id]
+        self._finished[task_id] = future
+        future._state = futures.FINISHED
+        future._exception = pool_future.exception()
+        if future._exception is None:
+            future._result = pool_future.result()
+        else:
+            logger.error('rescuing exception: {}'.format(future._exception))
+        self._record(future, func, activity_id, args, kwargs)
         return future
 
+    def _get_pool(self):
+        if self._pool is None:
+            import concurrent.futures
+            if self.use_processes:
+                self._pool = concurrent.futures.ProcessPoolExecutor(self.max_workers)
+            else:
+                self._pool = concurrent.futures.ThreadPoolExecutor(self.max_workers)
+        return self._pool
+
+    def _wait_for_activities(self):
+        """
+        Wait until an activity of the pool finishes.
+
+        :return: False if no activity is running.
+        :rtype: bool
+        """
+        import concurrent.futures
+        pool_futures = [pool_future for _, pool_future in self._submitted.values()]
+        if not pool_futures:
+            return False
+        concurrent.futures.wait(pool_futures, return_when=concurrent.futures.FIRST_COMPLETED)
+        return True
+
+    def _replay(self, *args, **kwargs):
+        """
+        Run the workflow until it completes, replaying it each time it is
+        blocked by activities of the pool.
+        """
+        while True:
+            self._tasks.clear()
+            self.before_replay()
+            try:
+                return self.run_workflow(*args, **kwargs)
+            except exceptions.ExecutionBlocked:
+                if not self._wait_for_activities():
+                    raise
+
     def run(self, input=None):
         if input is None:
             input = {}
@@ -133,10 +276,17 @@ class Executor(executor.Executor):
         kwargs = input.get('kwargs', {})
         self.create_workflow()
 
-        self.initialize_history(input)
-
-        self.before_replay()
-        result = self.run_workflow(*args, **kwargs)
+        while True:
+            self.initialize_history(input)
+            try:
+                result = self._run(*args, **kwargs)
+                break
+            except exceptions.ContinueAsNew as err:
+                logger.info('continuing as new')
+                input = err.input
+                args = input['args']
+                kwargs = input['kwargs']
+                self._reset()
 
         # Hack: self._history must be available to the callback as a
         # simpleflow.history.History, not a swf.models.history.builder.History
@@ -147,6 +297,28 @@ class Executor(executor.Executor):
         self.after_closed()
         return result
 
+    def _run(self, *args, **kwargs):
+        if not self.parallel:
+            self.before_replay()
+            return self.run_workflow(*args, **kwargs)
+        try:
+            return self._replay(*args, **kwargs)
+        finally:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._pool = None
+
+    def _reset(self):
+        """
+        Forget the tasks of the previous execution, after continuing as new.
+        """
+        self.nb_activities = 0
+        self.signals_sent.clear()
+        self._markers.clear()
+        self._tasks.clear()
+        self._submitted.clear()
+        self._finished.clear()
+
     def after_closed(self):
         return self._workflow.after_closed(self._history)
 
@@ -173,5 +345,13 @@ class Executor(executor.Executor):
             return [m for ml in self._markers.values() for m in ml]
         return [m[-1] for m in self._markers.values()]
 
+    def get_task_counters(self):
+        return dict(self._tasks)
+
+    def restore_task_counters(self, counters):
+        for name, count in counters.items():
+            if self._tasks[name] < count:
+                self._tasks[name] = count
+
     def get_event_details(self, event_type, event_name):
         return None  # To be implemented if needed
@@ -1,6 +1,11 @@
 from datetime import datetime
+import json
 import logging
+import logging.handlers
+import os
 import sys
+import threading
+import weakref
 
 RED = '\033[91m'
 GREEN = '\033[92m'
@@ -71,7 +76,7 @@ class SimpleflowFormatter(logging.Formatter):
         # NB: we strip microseconds out so things are readable
         date = datetime.fromtimestamp(record.created).replace(microsecond=0)
         record.isodate = date.isoformat()
-        record.message = record.msg % record.args
+        record.message = record.getMessage()
         record.coloredlevel = colorize(record.levelname, record.levelname)
         s = "%(isodate)s %(coloredlevel)s [process=%(processName)s, pid=%(process)s]: %(message)s" % record.__dict__
 
@@ -97,3 +102,173 @@ class SimpleflowFormatter(logging.Formatter):
                                                'replace')
 
         return s
+
+
+# Context of the current process, added to structured logs: workflow_id,
+# run_id, activity_id...
+_log_context = {}
+
+
+def set_log_context(**values):
+    """
+    Add values to the context of the log records of the current process;
+    None values are removed.
+    """
+    for key, value in values.items():
+        if value is None:
+            _log_context.pop(key, None)
+        else:
+            _log_context[key] = value
+
+
+def clear_log_context():
+    _log_context.clear()
+
+
+def get_log_context():
+    """
+    :rtype: dict[str, Any]
+    """
+    return dict(_log_context)
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Format records as JSON lines, with the log context of the process that
+    emitted them.
+    """
+    def format(self, record):
+        data = {
+            'time': datetime.fromtimestamp(record.created).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'process': record.processName,
+            'pid': record.process,
+            'message': record.getMessage(),
+        }
+        context = getattr(record, 'log_context', None)
+        if context is None:
+            context = _log_context
+        data.update(context)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data['exception'] = record.exc_text
+        return json.dumps(data, default=repr)
+
+
+# Asynchronous handlers, see flush_async_logs()
+_async_handlers = weakref.WeakSet()
+
+
+if hasattr(logging.handlers, 'QueueHandler'):
+    class AsyncHandler(logging.handlers.QueueHandler):
+        """
+        Put records in a queue, emitted by a listener thread to the actual
+        handlers, so that writing logs never blocks the caller.
+
+        Threads don't survive forks: each process starts its own listener when
+        it first logs, and stops it when exiting.
+        """
+        def __init__(self, handlers):
+            super(AsyncHandler, self).__init__(None)
+            self.handlers = handlers
+            self._listener = None
+            self._pid = None
+            self._lock = threading.Lock()
+            _async_handlers.add(self)
+
+        def _start_listener(self):
+            import multiprocessing.util
+            try:
+                import queue
+            except ImportError:  # Python 2
+                import Queue as queue
+
+            self.queue = queue.Queue()
+            self._listener = logging.handlers.QueueListener(
+                self.queue, *self.handlers, respect_handler_level=True)
+            self._listener.start()
+            self._pid = os.getpid()
+            # Run by multiprocessing at the exit of the main and child processes.
+            multiprocessing.util.Finalize(self, self._stop_listener, exitpriority=-100)
+
+        def _is_listening(self):
+            return (self._listener is not None and self._pid == os.getpid() and
+                    self._listener._thread is not None)
+
+        def _stop_listener(self):
+            if self._is_listening():
+                self._listener.stop()
+
+        def prepare(self, record):
+            # Called in the logging thread: format the message and the
+            # exception now, and keep the current log context.
+            record.message = record.getMessage()
+            record.msg = record.message
+            record.args = None
+            if record.exc_info:
+                if not record.exc_text:
+                    record.exc_text = logging.Formatter().formatException(record.exc_info)
+                record.exc_info = None
+            record.log_context = get_log_context()
+            return record
+
+        def enqueue(self, record):
+            if self._pid != os.getpid():
+                with self._lock:
+                    if self._pid != os.getpid():
+                        self._start_listener()
+            self.queue.put_nowait(record)
+
+        def flush(self):
+            """
+            Wait for the queued records to be emitted.
+            """
+            if self._is_listening():
+                self._listener.stop()
+                self._listener.start()
+
+        def close(self):
+            self._stop_listener()
+            super(AsyncHandler, self).close()
+else:  # Python 2
+    AsyncHandler = None
+
+
+def flush_async_logs():
+    """
+    Emit the records queued by the asynchronous handlers of the current
+    process, and stop their listeners.
+
+    To call before leaving a process with ``os._exit()``, which skips the
+    exit handlers stopping them.
+    """
+    for handler in list(_async_handlers):
+        handler._stop_listener()
+
+
+def setup_logging(logger_name='simpleflow', log_format=None, async_logging=False):
+    """
+    Switch the handlers of a logger to JSON lines and/or asynchronous
+    writing.
+
+    :param logger_name: logger to configure.
+    :type logger_name: str
+    :param log_format: "json" for structured logs, else unchanged.
+    :type log_format: Optional[str]
+    :param async_logging: write logs from a background thread (Python 3).
+    :type async_logging: bool
+    """
+    logger = logging.getLogger(logger_name)
+    handlers = list(logger.handlers)
+    if log_format == 'json':
+        for handler in handlers:
+            handler.setFormatter(JsonFormatter())
+    if async_logging and handlers:
+        if AsyncHandler is None:
+            logger.warning('asynchronous logging needs Python 3, logs are written synchronously')
+            return
+        for handler in handlers:
+            logger.removeHandler(handler)
+        logger.addHandler(AsyncHandler(handlers))
@@ -1,3 +1,7 @@
+# Name of the markers recorded by Workflow.checkpoint().
+CHECKPOINT_MARKER_PREFIX = 'simpleflow.checkpoint.'
+
+
 class Marker(object):
     def __init__(self, name, details):
         self.name = name
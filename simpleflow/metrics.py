@@ -0,0 +1,482 @@
+# -*- coding:utf-8 -*-
+"""
+Metrics of the decider and worker processes: counters, gauges and
+histograms, exported in the Prometheus text format.
+
+Deciders and workers fork a process per decision or task, under a
+supervisor. To aggregate their metrics, set ``SIMPLEFLOW_METRICS_DIRECTORY``:
+
+- each long-lived process writes its metrics to ``process-<pid>.json`` in
+  this directory, at most every ``FLUSH_INTERVAL`` seconds;
+- when a process exits, its counters and histograms are added to
+  ``archive.json``; the files of processes that died without doing so are
+  archived by the next collection.
+
+``simpleflow metrics.export`` and ``simpleflow metrics.serve`` collect the
+directory and print the metrics, or serve them over HTTP.
+
+Without a directory, metrics are only kept in the memory of each process.
+"""
+from __future__ import absolute_import
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from simpleflow import logger, settings
+
+# Seconds between two writes of the metrics of a process
+FLUSH_INTERVAL = 5
+
+DEFAULT_BUCKETS = (.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30, 60, float('inf'))
+COUNT_BUCKETS = (1, 10, 100, 1000, 10000, 100000, float('inf'))
+
+ARCHIVE_FILENAME = 'archive.json'
+LOCK_FILENAME = '.lock'
+PROCESS_FILE_PREFIX = 'process-'
+
+
+class Metric(object):
+    """
+    Base class of metrics; values are kept by the registry, by labels.
+
+    :ivar name: metric name, e.g. "simpleflow_poll_seconds".
+    :type name: str
+    :ivar documentation: help text.
+    :type documentation: str
+    """
+    type = None
+
+    def __init__(self, name, documentation, registry=None):
+        self.name = name
+        self.documentation = documentation
+        self._registry = registry if registry is not None else REGISTRY
+        self._registry.register(self)
+
+    def _key(self, labels):
+        return self.name, tuple(sorted(labels.items()))
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        with self._registry.values() as values:
+            key = self._key(labels)
+            values[key] = values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """
+    Gauge; the values of the live processes are summed up.
+    """
+    type = 'gauge'
+
+    def set(self, value, **labels):
+        with self._registry.values() as values:
+            values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        with self._registry.values() as values:
+            key = self._key(labels)
+            values[key] = values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, buckets=DEFAULT_BUCKETS, registry=None):
+        self.buckets = tuple(buckets)
+        if self.buckets[-1] != float('inf'):
+            self.buckets += (float('inf'),)
+        super(Histogram, self).__init__(name, documentation, registry=registry)
+
+    def observe(self, value, **labels):
+        with self._registry.values() as values:
+            key = self._key(labels)
+            sample = values.get(key)
+            if sample is None:
+                # [counts by bucket, sum]
+                sample = values[key] = [[0] * len(self.buckets), 0.]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    sample[0][i] += 1
+                    break
+            sample[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Observe the duration of a block, in seconds.
+        """
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.observe(time.time() - start, **labels)
+
+
+class Registry(object):
+    """
+    Metrics and their values in the current process.
+
+    Values are reset in forked processes: they only account for what
+    happens in the process itself.
+    """
+    def __init__(self):
+        self.metrics = {}
+        self._values = {}
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._last_flush = 0
+        self._finalizer_pid = None
+
+    def register(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError('metric {} is already registered'.format(metric.name))
+        self.metrics[metric.name] = metric
+
+    @contextmanager
+    def values(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._after_fork()
+            elif self._finalizer_pid != self._pid:
+                self._register_finalizer()
+            yield self._values
+
+    def _after_fork(self):
+        self._values = {}
+        self._pid = os.getpid()
+        self._last_flush = 0
+        self._register_finalizer()
+
+    def _register_finalizer(self):
+        if self._finalizer_pid == os.getpid() or not settings.SIMPLEFLOW_METRICS_DIRECTORY:
+            return
+        import multiprocessing.util
+        # Run at the exit of the main process and of multiprocessing children.
+        multiprocessing.util.Finalize(self, self.archive, exitpriority=-50)
+        self._finalizer_pid = os.getpid()
+
+    def snapshot(self):
+        """
+        :return: JSON-serializable values of the current process.
+        :rtype: list[list]
+        """
+        with self.values() as values:
+            return [
+                [name, [list(label) for label in labels], value]
+                for (name, labels), value in values.items()
+            ]
+
+    def flush(self, force=False):
+        """
+        Write the metrics of the process to the metrics directory, if any.
+
+        :param force: write even if the last write is recent.
+        :type force: bool
+        """
+        directory = settings.SIMPLEFLOW_METRICS_DIRECTORY
+        if not directory:
+            return
+        now = time.time()
+        if not force and now - self._last_flush < FLUSH_INTERVAL:
+            return
+        if self._pid != os.getpid():
+            with self.values():
+                pass
+        self._register_finalizer()
+        self._last_flush = now
+        try:
+            _makedirs(directory)
+            _write_json(_process_path(directory, os.getpid()), self.snapshot())
+        except (IOError, OSError) as err:
+            logger.warning('metrics: cannot write to {}: {}'.format(directory, err))
+
+    def archive(self):
+        """
+        Add the counters and histograms of the process to the archive.
+        """
+        directory = settings.SIMPLEFLOW_METRICS_DIRECTORY
+        if not directory or self._pid != os.getpid():
+            return
+        snapshot = self.snapshot()
+        if not snapshot and not os.path.exists(_process_path(directory, os.getpid())):
+            return
+        try:
+            _makedirs(directory)
+            with _locked(directory):
+                archive = _read_json(os.path.join(directory, ARCHIVE_FILENAME)) or []
+                archive = merge([archive, snapshot], self.metrics, with_gauges=False)
+                _write_json(os.path.join(directory, ARCHIVE_FILENAME), archive)
+                _remove(_process_path(directory, os.getpid()))
+        except (IOError, OSError) as err:
+            logger.warning('metrics: cannot archive to {}: {}'.format(directory, err))
+
+
+def flush(force=False):
+    """
+    Write the metrics of the current process, see Registry.flush().
+    """
+    REGISTRY.flush(force=force)
+
+
+def _makedirs(directory):
+    if not os.path.isdir(directory):
+        try:
+            os.makedirs(directory)
+        except OSError:
+            if not os.path.isdir(directory):
+                raise
+
+
+def _process_path(directory, pid):
+    return os.path.join(directory, '{}{}.json'.format(PROCESS_FILE_PREFIX, pid))
+
+
+def _read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (IOError, OSError, ValueError):
+        return None
+
+
+def _write_json(path, data):
+    tmp_path = '{}.tmp-{}'.format(path, os.getpid())
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, separators=(',', ':'))
+    os.rename(tmp_path, path)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+@contextmanager
+def _locked(directory):
+    import fcntl
+
+    fd = os.open(os.path.join(directory, LOCK_FILENAME), os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)
+
+
+def _is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except OSError as err:
+        import errno
+        return err.errno == errno.EPERM
+    return True
+
+
+def merge(snapshots, metrics, with_gauges=True):
+    """
+    Sum up snapshots of values.
+
+    :param snapshots: results of Registry.snapshot().
+    :type snapshots: Iterable[list[list]]
+    :param metrics: known metrics by name; values of other metrics are dropped.
+    :type metrics: dict[str, Metric]
+    :param with_gauges: keep gauges.
+    :type with_gauges: bool
+    :rtype: list[list]
+    """
+    merged = {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot:
+            metric = metrics.get(name)
+            if metric is None or (metric.type == 'gauge' and not with_gauges):
+                continue
+            key = name, tuple(tuple(label) for label in labels)
+            current = merged.get(key)
+            if current is None:
+                merged[key] = value
+            elif metric.type == 'histogram':
+                if len(current[0]) != len(value[0]):
+                    continue  # buckets changed
+                merged[key] = [[a + b for a, b in zip(current[0], value[0])], current[1] + value[1]]
+            else:
+                merged[key] = current + value
+    return [[name, [list(label) for label in labels], value] for (name, labels), value in merged.items()]
+
+
+def collect(registry=None):
+    """
+    Collect the metrics of all processes, from the metrics directory, or of
+    the current process if there is none.
+
+    :rtype: list[list]
+    """
+    registry = registry or REGISTRY
+    directory = settings.SIMPLEFLOW_METRICS_DIRECTORY
+    if not directory or not os.path.isdir(directory):
+        return registry.snapshot()
+
+    with _locked(directory):
+        archive_path = os.path.join(directory, ARCHIVE_FILENAME)
+        archive = _read_json(archive_path) or []
+        live = []
+        dead = []
+        for filename in os.listdir(directory):
+            if not filename.startswith(PROCESS_FILE_PREFIX) or not filename.endswith('.json'):
+                continue
+            try:
+                pid = int(filename[len(PROCESS_FILE_PREFIX):-len('.json')])
+            except ValueError:
+                continue
+            path = os.path.join(directory, filename)
+            snapshot = _read_json(path) or []
+            if _is_alive(pid):
+                live.append(snapshot)
+            else:
+                dead.append((path, snapshot))
+        if dead:
+            archive = merge([archive] + [snapshot for _, snapshot in dead], registry.metrics, with_gauges=False)
+            _write_json(archive_path, archive)
+            for path, _ in dead:
+                _remove(path)
+    return merge([archive] + live, registry.metrics)
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if value == float('-inf'):
+        return '-Inf'
+    return repr(float(value))
+
+
+def _format_labels(labels, extra=None):
+    labels = list(labels) + list(extra or [])
+    if not labels:
+        return ''
+    return '{' + ','.join(
+        '{}="{}"'.format(key, str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"'))
+        for key, value in labels
+    ) + '}'
+
+
+def render(snapshot=None, registry=None):
+    """
+    Format metrics in the Prometheus text format.
+
+    :param snapshot: values to render, collected by default.
+    :type snapshot: Optional[list[list]]
+    :rtype: str
+    """
+    registry = registry or REGISTRY
+    if snapshot is None:
+        snapshot = collect(registry)
+    samples_by_name = {}
+    for name, labels, value in snapshot:
+        samples_by_name.setdefault(name, []).append((sorted(tuple(label) for label in labels), value))
+
+    lines = []
+    for name in sorted(samples_by_name):
+        metric = registry.metrics.get(name)
+        if metric is None:
+            continue
+        lines.append('# HELP {} {}'.format(name, metric.documentation))
+        lines.append('# TYPE {} {}'.format(name, metric.type))
+        for labels, value in sorted(samples_by_name[name]):
+            if metric.type == 'histogram':
+                counts, total = value
+                cumulative = 0
+                for bound, count in zip(metric.buckets, counts):
+                    cumulative += count
+                    lines.append('{}_bucket{} {}'.format(
+                        name, _format_labels(labels, [('le', _format_value(bound))]), _format_value(cumulative)))
+                lines.append('{}_sum{} {}'.format(name, _format_labels(labels), _format_value(total)))
+                lines.append('{}_count{} {}'.format(name, _format_labels(labels), _format_value(cumulative)))
+            else:
+                lines.append('{}{} {}'.format(name, _format_labels(labels), _format_value(value)))
+    return '\n'.join(lines) + '\n'
+
+
+def write_textfile(path, registry=None):
+    """
+    Write the metrics to a file atomically, e.g. for the textfile collector
+    of the Prometheus node exporter.
+
+    :type path: str
+    """
+    tmp_path = '{}.tmp-{}'.format(path, os.getpid())
+    with open(tmp_path, 'w') as f:
+        f.write(render(registry=registry))
+    os.rename(tmp_path, path)
+
+
+def serve(host='127.0.0.1', port=9090, registry=None):
+    """
+    Serve the metrics over HTTP until interrupted.
+    """
+    try:
+        from http.server import BaseHTTPRequestHandler, HTTPServer
+    except ImportError:  # Python 2
+        from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?', 1)[0] not in ('/', '/metrics'):
+                self.send_error(404)
+                return
+            data = render(registry=registry).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            logger.debug('metrics: ' + format % args)
+
+    server = HTTPServer((host, port), Handler)
+    logger.info('serving metrics on http://{}:{}/metrics'.format(*server.server_address[:2]))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+REGISTRY = Registry()
+
+POLL_SECONDS = Histogram(
+    'simpleflow_poll_seconds', 'Duration of the polls of decision and activity tasks.')
+POLL_TIMEOUTS = Counter(
+    'simpleflow_poll_timeouts_total', 'Polls that returned no task.')
+COMPLETE_SECONDS = Histogram(
+    'simpleflow_complete_seconds', 'Duration of the calls completing decision and activity tasks.')
+FORK_SECONDS = Histogram(
+    'simpleflow_fork_seconds', 'Duration of the start of the processes handling tasks.')
+DECISION_SECONDS = Histogram(
+    'simpleflow_decision_seconds', 'Duration of the handling of decision tasks, including the fork.')
+DECISION_TASK_WAIT_SECONDS = Histogram(
+    'simpleflow_decision_task_wait_seconds', 'Time between the scheduling and the start of decision tasks.')
+REPLAY_SECONDS = Histogram(
+    'simpleflow_replay_seconds', 'Duration of the replays of workflow histories.')
+REPLAY_EVENTS = Histogram(
+    'simpleflow_replay_events', 'Number of events of the replayed histories.', buckets=COUNT_BUCKETS)
+DECISIONS_PER_RESPONSE = Histogram(
+    'simpleflow_decisions_per_response', 'Number of decisions sent per decision task.', buckets=COUNT_BUCKETS)
+ACTIVITY_TASK_SECONDS = Histogram(
+    'simpleflow_activity_task_seconds', 'Duration of the processes handling activity tasks.')
+HEARTBEAT_SECONDS = Histogram(
+    'simpleflow_heartbeat_seconds', 'Duration of the heartbeats of activity tasks.')
+CANCEL_SECONDS = Histogram(
+    'simpleflow_cancel_seconds', 'Duration of the termination of the processes handling activity tasks.')
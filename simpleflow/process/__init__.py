@@ -1,2 +1,3 @@
+from .autoscaler import Autoscaler  # NOQA
 from .supervisor import Supervisor, reset_signal_handlers  # NOQA
 from .named_mixin import NamedMixin, with_state  # NOQA
@@ -0,0 +1,122 @@
+from __future__ import division
+
+import logging
+import math
+import multiprocessing
+import time
+
+logger = logging.getLogger(__name__)
+
+# Default number of seconds between two backlog checks.
+CHECK_INTERVAL = 30
+
+# Default number of seconds with an empty backlog before removing a child.
+SCALE_DOWN_COOLDOWN = 300
+
+
+class Autoscaler(object):
+    """
+    Computes the number of children a `Supervisor` should run, from the
+    backlog of its task list.
+
+    Scaling up is immediate: as soon as at least `scale_up_threshold` tasks
+    are pending, children are added (one per `tasks_per_child` pending
+    tasks). Scaling down is conservative: one child is removed when no task
+    was pending for `cooldown` seconds, then one more per `cooldown` seconds
+    while the backlog stays empty. Backlogs between 1 and `scale_up_threshold`
+    leave the number of children unchanged.
+
+    :ivar min_children: lower bound of the number of children.
+    :type min_children: int
+    :ivar max_children: upper bound of the number of children.
+    :type max_children: int
+    """
+
+    def __init__(self, count_pending, min_children=1, max_children=None,
+                 interval=CHECK_INTERVAL, cooldown=SCALE_DOWN_COOLDOWN,
+                 scale_up_threshold=1, tasks_per_child=1):
+        """
+        :param count_pending: returns the number of pending tasks; typically
+                              `swf.actors.ActivityWorker.count_pending` or
+                              `swf.actors.Decider.count_pending`.
+        :type count_pending: () -> int
+        :param min_children:
+        :type min_children: int
+        :param max_children: defaults to the number of CPU cores.
+        :type max_children: Optional[int]
+        :param interval: seconds between two backlog checks.
+        :type interval: float
+        :param cooldown: seconds with an empty backlog before removing a child.
+        :type cooldown: float
+        :param scale_up_threshold: minimum backlog to add children.
+        :type scale_up_threshold: int
+        :param tasks_per_child: pending tasks per added child.
+        :type tasks_per_child: int
+        """
+        if max_children is None:
+            max_children = multiprocessing.cpu_count()
+        if not 0 <= min_children <= max_children:
+            raise ValueError('invalid autoscaling bounds: min={} max={}'.format(
+                min_children, max_children))
+        self._count_pending = count_pending
+        self.min_children = min_children
+        self.max_children = max_children
+        self.interval = interval
+        self.cooldown = cooldown
+        self.scale_up_threshold = max(scale_up_threshold, 1)
+        self.tasks_per_child = max(tasks_per_child, 1)
+
+        self.next_check = 0
+        # Start of the current empty backlog period, or None if tasks are pending.
+        self._empty_since = time.time()
+
+    def target(self, current, pending, now=None):
+        """
+        Number of children to run given the *current* one and the number of
+        *pending* tasks.
+
+        :type current: int
+        :type pending: int
+        :type now: Optional[float]
+        :rtype: int
+        """
+        now = now or time.time()
+        if pending > 0:
+            self._empty_since = None
+        elif self._empty_since is None:
+            self._empty_since = now
+        target = current
+        if pending >= self.scale_up_threshold:
+            target = current + int(math.ceil(pending / self.tasks_per_child))
+        elif pending == 0 and now - self._empty_since >= self.cooldown:
+            target = current - 1
+        target = max(self.min_children, min(self.max_children, target))
+        if target < current:
+            # wait for another cooldown before removing the next child
+            self._empty_since = now
+        return target
+
+    def update(self, current, now=None):
+        """
+        Check the backlog if *interval* has elapsed since the last check, and
+        return the number of children to run. Errors from SWF are logged and
+        leave the number of children unchanged.
+
+        :type current: int
+        :type now: Optional[float]
+        :rtype: int
+        """
+        now = now or time.time()
+        if now < self.next_check:
+            return current
+        self.next_check = now + self.interval
+        try:
+            pending = self._count_pending()
+        except Exception as e:
+            logger.warning('autoscaler: cannot count pending tasks: {}'.format(e))
+            return current
+        target = self.target(current, pending, now)
+        if target != current:
+            logger.info('autoscaler: {} pending tasks, scaling from {} to {} children'.format(
+                pending, current, target))
+        return target
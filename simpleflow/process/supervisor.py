@@ -1,17 +1,27 @@
+import errno
+import fcntl
 import functools
 import logging
 import multiprocessing
 import os
+import select
 import signal
 import time
 import types
 
-import psutil
-
 from .named_mixin import NamedMixin, with_state
 
 logger = logging.getLogger(__name__)
 
+# A child exiting sooner than this after its start is considered crashing:
+# it's restarted with an exponential backoff, up to RESTART_BACKOFF_MAX.
+MIN_CHILD_UPTIME = 10
+RESTART_BACKOFF_MAX = 60
+
+# Re-evaluate the state at least every WAKEUP_INTERVAL seconds, even if no
+# signal was received.
+WAKEUP_INTERVAL = 5
+
 
 def reset_signal_handlers(func):
     """
@@ -31,22 +41,6 @@ def reset_signal_handlers(func):
     return wrapped
 
 
-def _void_handle_sigchld(signum, frame):
-    """
-    Default action for a SIGCHLD signal handling is to ignore it
-    which in practice has no effect on the running program. Having
-    a handler that does nothing is a bit different, in the sense
-    it will interrupt the execution of any "time.sleep()" routing.
-    From "time" module docs:
-
-        The actual suspension time may be less than that requested
-        because any caught signal will terminate the sleep()
-        following execution of that signal's catching routine.
-
-    """
-    pass
-
-
 class Supervisor(NamedMixin):
     """
     The `Supervisor` class is responsible for managing one or many worker processes
@@ -60,7 +54,8 @@ class Supervisor(NamedMixin):
     style.
     """
 
-    def __init__(self, payload, arguments=None, nb_children=None, background=False):
+    def __init__(self, payload, arguments=None, nb_children=None, background=False,
+                 autoscaler=None):
         """
         Initializes a Manager() instance, with a payload (a callable that will be
         executed on worker processes), some arguments (a list or tuple of arguments
@@ -75,9 +70,14 @@ class Supervisor(NamedMixin):
         :type nb_children: int
         :param background: wether the supervisor process should launch in background
         :type background: bool
+        :param autoscaler: scale the number of children with the task list backlog;
+                           nb_children is then ignored.
+        :type autoscaler: Optional[simpleflow.process.Autoscaler]
         """
         # NB: below, compare explicitly to "None" there because nb_children could be 0
-        if nb_children is None:
+        if autoscaler is not None:
+            self._nb_children = autoscaler.min_children
+        elif nb_children is None:
             self._nb_children = multiprocessing.cpu_count()
         else:
             self._nb_children = nb_children
@@ -86,10 +86,21 @@ class Supervisor(NamedMixin):
         self._named_mixin_properties = ["_payload_friendly_name", "_nb_children"]
         self._args = arguments if arguments is not None else ()
         self._background = background
+        self._autoscaler = autoscaler
 
         self._processes = {}
+        self._start_times = {}
+        # children asked to stop after scaling down
+        self._retiring = set()
         self._terminating = False
 
+        # consecutive crashes, and when the next child may be started
+        self._nb_crashes = 0
+        self._restart_after = 0
+
+        # self-pipe, written to by signal handlers to wake up the main loop
+        self._wakeup_fds = None
+
         super(Supervisor, self).__init__()
 
     @with_state("running")
@@ -105,34 +116,52 @@ class Supervisor(NamedMixin):
         else:
             self.target()
 
-    def _cleanup_worker_processes(self):
-        # cleanup children
-        to_remove = []
-        for pid, child in self._processes.items():
-            try:
-                name, status = child.name(), child.status()
-            except psutil.NoSuchProcess:  # May be untimely deceased
-                name, status = "unknown", "unknown"
-            logger.debug("  child: name=%s pid=%d status=%s" % (name, child.pid, status))
-            if status in (psutil.STATUS_ZOMBIE, "unknown"):
-                logger.debug("  process {} is zombie, will cleanup".format(child.pid))
-                # join process to clean it up
-                child.wait()
-                # set the process to be removed from self._processes
-                to_remove.append(pid)
-
-        # cleanup our internal state (self._processes)
-        for pid in to_remove:
+    def _reap_worker_processes(self):
+        """
+        Reap exited worker processes and remove them from self._processes.
+        Each one is checked with a non-blocking waitpid() through
+        multiprocessing, so its bookkeeping stays consistent.
+        """
+        now = time.time()
+        for pid, child in list(self._processes.items()):
+            exitcode = child.exitcode  # waitpid(pid, WNOHANG)
+            if exitcode is None:
+                continue
             del self._processes[pid]
+            uptime = now - self._start_times.pop(pid, now)
+            logger.info("process: child pid={} exited with code {} after {:.1f}s".format(
+                pid, exitcode, uptime))
+            if self._terminating or pid in self._retiring:
+                self._retiring.discard(pid)
+                continue
+            if uptime < MIN_CHILD_UPTIME:
+                self._nb_crashes += 1
+                delay = self.restart_delay(self._nb_crashes)
+                self._restart_after = max(self._restart_after, now + delay)
+                logger.warning("process: child pid={} is crashing, restarting in {}s".format(pid, delay))
+            else:
+                self._nb_crashes = 0
+
+    @staticmethod
+    def restart_delay(nb_crashes):
+        """
+        Exponential restart backoff after *nb_crashes* consecutive crashes.
+
+        >>> [Supervisor.restart_delay(n) for n in range(9)]
+        [0, 1, 2, 4, 8, 16, 32, 60, 60]
+        """
+        if nb_crashes <= 0:
+            return 0
+        return min(2 ** (nb_crashes - 1), RESTART_BACKOFF_MAX)
 
     def _start_worker_processes(self):
         """
         Start missing worker processes depending on self._nb_children and the current
         processes stored in self._processes.
         """
-        if self._terminating:
+        if self._terminating or time.time() < self._restart_after:
             return
-        for _ in range(len(self._processes), self._nb_children):
+        for _ in range(len(self._processes) - len(self._retiring), self._nb_children):
             child = multiprocessing.Process(
                 target=reset_signal_handlers(self._payload),
                 args=self._args
@@ -146,7 +175,75 @@ class Supervisor(NamedMixin):
             # fork. So no big risk, but I add an assertion just in case anyway.
             pid = child.pid
             assert pid, "Cannot add process with pid={}: {}".format(pid, child)
-            self._processes[pid] = psutil.Process(pid)
+            self._processes[pid] = child
+            self._start_times[pid] = time.time()
+
+    def _autoscale(self):
+        """
+        Update self._nb_children from the autoscaler, and ask the most recent
+        children to stop when scaling down. They stop polling and exit once
+        their current task is done.
+        """
+        if self._autoscaler is None or self._terminating:
+            return
+        target = self._autoscaler.update(self._nb_children)
+        if target == self._nb_children:
+            return
+        self._nb_children = target
+        active = [pid for pid in self._processes if pid not in self._retiring]
+        active.sort(key=lambda pid: self._start_times.get(pid, 0), reverse=True)
+        for pid in active[:max(len(active) - target, 0)]:
+            logger.info("process: scaling down, sending SIGTERM to pid={}".format(pid))
+            self._processes[pid].terminate()
+            self._retiring.add(pid)
+
+    def _open_wakeup_pipe(self):
+        self._wakeup_fds = os.pipe()
+        for fd in self._wakeup_fds:
+            flags = fcntl.fcntl(fd, fcntl.F_GETFL)
+            fcntl.fcntl(fd, fcntl.F_SETFL, flags | os.O_NONBLOCK)
+
+    def _wakeup(self):
+        """
+        Wake up the main loop; safe to call from a signal handler.
+        """
+        if self._wakeup_fds is None:
+            return
+        try:
+            os.write(self._wakeup_fds[1], b"\0")
+        except OSError as e:
+            # EAGAIN: the pipe is full, the main loop will wake up anyway
+            if e.errno != errno.EAGAIN:
+                raise
+
+    def _wait_for_event(self, timeout):
+        """
+        Sleep until a signal is received or *timeout* seconds have passed.
+        """
+        try:
+            readable, _, _ = select.select([self._wakeup_fds[0]], [], [], timeout)
+        except (OSError, select.error) as e:
+            if e.args[0] != errno.EINTR:
+                raise
+            return
+        if readable:
+            try:
+                while os.read(self._wakeup_fds[0], 4096):
+                    pass
+            except OSError as e:
+                if e.errno != errno.EAGAIN:
+                    raise
+
+    def _next_wakeup_delay(self):
+        now = time.time()
+        delay = WAKEUP_INTERVAL
+        if self._terminating:
+            return delay
+        if len(self._processes) - len(self._retiring) < self._nb_children:
+            delay = min(self._restart_after - now, delay)
+        if self._autoscaler is not None:
+            delay = min(self._autoscaler.next_check - now, delay)
+        return max(0, delay)
 
     def target(self):
         """
@@ -154,6 +251,7 @@ class Supervisor(NamedMixin):
         code that the manager will execute once started.
         """
         # handle signals
+        self._open_wakeup_pipe()
         self.bind_signal_handlers()
 
         # protection against double use of ".start()"
@@ -167,27 +265,24 @@ class Supervisor(NamedMixin):
             if self._terminating:
                 for proc in self._processes.values():
                     logger.info("process: waiting for proces={} to finish.".format(proc))
-                    proc.wait()
+                    proc.join()
                 break
 
             # start worker processes
-            self._cleanup_worker_processes()
+            self._reap_worker_processes()
+            self._autoscale()
             self._start_worker_processes()
 
-            # re-evaluate state at least every 5 seconds ; if a SIGCHLD happens during
-            # the "time.sleep()" below, it will be interrupted, making the code above
-            # run nearly immediately ; but if a SIGCHLD happens during the two calls
-            # above, the "time.sleep()" here won't be stopped, so better have it
-            # relatively short, but not too short since the above methods involve
-            # scanning a bunch of entries in /proc so that could become slow if we do
-            # it every 0.1s.
-            time.sleep(5)
+            # sleep until a child exits (SIGCHLD), we're asked to terminate, or
+            # a crashing child may be restarted; SIGCHLD handling makes this
+            # immediate, without scanning /proc.
+            self._wait_for_event(self._next_wakeup_delay())
 
     def bind_signal_handlers(self):
         """
         Binds signals for graceful shutdown:
         - SIGTERM and SIGINT lead to a graceful shutdown
-        - SIGCHLD is intentionally left to a void handler, see comment
+        - SIGCHLD wakes up the main loop so exited children are restarted
         - other signals are not modified for now
         """
 
@@ -198,13 +293,17 @@ class Supervisor(NamedMixin):
             logger.info("process: caught signal signal={} pid={}".format(
                 signal_name, os.getpid()))
             self.terminate()
+            self._wakeup()
+
+        def _handle_sigchld(signum, frame):
+            self._wakeup()
 
         # bind SIGTERM and SIGINT
         signal.signal(signal.SIGTERM, _handle_graceful_shutdown)
         signal.signal(signal.SIGINT, _handle_graceful_shutdown)
 
         # bind SIGCHLD
-        signal.signal(signal.SIGCHLD, _void_handle_sigchld)
+        signal.signal(signal.SIGCHLD, _handle_sigchld)
 
     @with_state("stopping")
     def terminate(self):
@@ -0,0 +1,157 @@
+"""
+Progress reporting channel between an activity and its worker.
+
+Before forking the process that executes an activity task, the worker opens
+a pipe. The write end is exposed in the activity context under the
+``progress_fd`` key, so an activity can report its progress with::
+
+    from simpleflow.progress import report_progress
+
+    @activity.with_attributes(task_list='quickstart')
+    class Resize(object):
+        def execute(self):
+            for i, image in enumerate(self.images):
+                ...
+                report_progress(self.context, {'done': i + 1})
+
+The worker reads the pipe while waiting for the task, only keeps the latest
+reported details and sends them along with the next heartbeat. Activities
+therefore never talk to SWF themselves, and reporting progress is cheap: one
+non-blocking write.
+
+Each message is a JSON document followed by a newline. Messages are limited to
+``MAX_HEARTBEAT_DETAILS_LENGTH`` characters, which keeps them below PIPE_BUF
+so that writes from several processes never interleave.
+"""
+import errno
+import fcntl
+import logging
+import os
+import select
+import time
+
+from simpleflow import constants
+from simpleflow.utils import json_dumps
+
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['report_progress', 'ProgressReader']
+
+
+#: Key of the activity context holding the progress file descriptor.
+CONTEXT_KEY = 'progress_fd'
+
+
+def report_progress(context, details):
+    """
+    Report the progress of the current activity.
+
+    Details are serialized in JSON and sent to the worker, which coalesces
+    them in the next heartbeat. Outside of a worker (e.g. with the local
+    executor), or if the worker is too busy to read them, the details are
+    dropped: reporting progress never blocks nor fails the activity.
+
+    :param context: activity context (``self.context`` on class-based activities).
+    :type context: Optional[dict]
+    :param details: progress details; must be serializable in JSON.
+    :type details: Any
+    :return: True if the details were sent to the worker.
+    :rtype: bool
+    """
+    fd = (context or {}).get(CONTEXT_KEY)
+    if fd is None:
+        return False
+
+    message = json_dumps(details)
+    if len(message) > constants.MAX_HEARTBEAT_DETAILS_LENGTH:
+        logger.warning('progress details too long ({} chars), dropping them'.format(len(message)))
+        return False
+
+    try:
+        os.write(fd, (message + '\n').encode('utf-8'))
+    except OSError as e:
+        # EAGAIN: the pipe is full, the worker will get the next details
+        # EPIPE/EBADF: the worker is gone or the channel has been closed
+        if e.errno not in (errno.EAGAIN, errno.EPIPE, errno.EBADF):
+            raise
+        logger.debug('cannot report progress: {}'.format(e.strerror))
+        return False
+    return True
+
+
+class ProgressReader(object):
+    """
+    Worker side of the progress channel.
+
+    :ivar fd: read end of the pipe.
+    :type fd: int
+    :ivar writer_fd: write end of the pipe, to pass to the activity process.
+    :type writer_fd: Optional[int]
+    :ivar details: latest details received, as a JSON string.
+    :type details: Optional[str]
+    :ivar closed: whether all writers have closed the pipe.
+    :type closed: bool
+    """
+
+    def __init__(self):
+        self.fd, self.writer_fd = os.pipe()
+        # activities must never block on a full pipe
+        flags = fcntl.fcntl(self.writer_fd, fcntl.F_GETFL)
+        fcntl.fcntl(self.writer_fd, fcntl.F_SETFL, flags | os.O_NONBLOCK)
+        self.details = None
+        self.closed = False
+        self._buffer = b''
+
+    def close_writer(self):
+        """
+        Close the write end in the worker, once the activity process has
+        inherited it. This is needed to detect when the activity exits.
+        """
+        if self.writer_fd is not None:
+            os.close(self.writer_fd)
+            self.writer_fd = None
+
+    def close(self):
+        self.close_writer()
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def wait(self, timeout=None):
+        """
+        Read progress details until *timeout* expires or all writers are gone.
+
+        :param timeout: seconds; None to wait until the writers are gone.
+        :type timeout: Optional[float]
+        """
+        deadline = time.time() + timeout if timeout is not None else None
+        while not self.closed:
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return
+            try:
+                readable, _, _ = select.select([self.fd], [], [], remaining)
+            except (OSError, select.error) as e:
+                if e.args[0] == errno.EINTR:
+                    continue
+                raise
+            if readable:
+                self.read()
+
+    def read(self):
+        """
+        Read available data and update the latest details.
+        """
+        data = os.read(self.fd, 65536)
+        if not data:
+            self.closed = True
+            return
+        lines = (self._buffer + data).split(b'\n')
+        self._buffer = lines.pop()
+        for line in reversed(lines):
+            if line:
+                self.details = line.decode('utf-8')
+                break
@@ -23,5 +23,14 @@ class Registry(object):
         """
         self._tasks[label][task.name] = task
 
+    def __iter__(self):
+        """
+        Iterate over the registered activities, whatever their label.
+        :rtype: collections.Iterator[simpleflow.activity.Activity]
+        """
+        for tasks in self._tasks.values():
+            for task in tasks.values():
+                yield task
+
 
 registry = Registry()
@@ -73,6 +73,8 @@ ACTIVITY_SCHEDULE_TO_START_TIMEOUT = str
 ACTIVITY_HEARTBEAT_TIMEOUT = str
 
 LOGGING = dict
+SIMPLEFLOW_LOG_FORMAT = str
+SIMPLEFLOW_LOG_ASYNC = bool
 
 SIMPLEFLOW_S3_HOST = str
 SIMPLEFLOW_S3_SSE = bool
@@ -83,4 +85,13 @@ METROLOGY_BUCKET = str
 METROLOGY_PATH_PREFIX = str_or_none
 
 SIMPLEFLOW_ENABLE_DISK_CACHE = bool
+SIMPLEFLOW_ENABLE_HISTORY_CACHE = bool
+SIMPLEFLOW_HISTORY_CACHE_SIZE = int
 SIMPLEFLOW_BINARIES_DIRECTORY = str
+SIMPLEFLOW_BINARIES_DIRECTORY_MAX_SIZE = int
+SIMPLEFLOW_BINARIES_EVICTION_MIN_IDLE_TIME = int
+SIMPLEFLOW_EXECUTE_ZYGOTE = bool
+SIMPLEFLOW_SWF_RATE_LIMITS = str
+SIMPLEFLOW_SWF_RATE_LIMITS_SHARED = bool
+SIMPLEFLOW_K8S_SUBMIT_CONCURRENCY = int
+SIMPLEFLOW_METRICS_DIRECTORY = str
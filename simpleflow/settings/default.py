@@ -53,5 +53,17 @@ LOGGING = {
     }
 }
 
+SIMPLEFLOW_LOG_FORMAT = 'text'  # or 'json'
+SIMPLEFLOW_LOG_ASYNC = False
+
 SIMPLEFLOW_ENABLE_DISK_CACHE = False
+SIMPLEFLOW_ENABLE_HISTORY_CACHE = False
+SIMPLEFLOW_HISTORY_CACHE_SIZE = 512 * 1024 * 1024  # bytes
 SIMPLEFLOW_BINARIES_DIRECTORY = '/tmp/simpleflow-binaries'
+SIMPLEFLOW_BINARIES_DIRECTORY_MAX_SIZE = 0  # bytes, 0 for no limit
+SIMPLEFLOW_BINARIES_EVICTION_MIN_IDLE_TIME = 24 * 3600  # seconds since the last use
+SIMPLEFLOW_EXECUTE_ZYGOTE = False
+SIMPLEFLOW_SWF_RATE_LIMITS = ''  # e.g. 'poll=20,respond=50,heartbeat=20,history=10,list=5'
+SIMPLEFLOW_SWF_RATE_LIMITS_SHARED = False
+SIMPLEFLOW_K8S_SUBMIT_CONCURRENCY = 4  # 0 to create jobs in the poll loop
+SIMPLEFLOW_METRICS_DIRECTORY = ''  # shared by the processes of a host, '' to keep metrics in memory
@@ -6,7 +6,10 @@ import hashlib
 import json
 import logging
 import multiprocessing
+import os
 import re
+import threading
+import time
 import traceback
 
 import simpleflow.task as base_task
@@ -24,7 +27,8 @@ from simpleflow import (
 from simpleflow.activity import Activity, PRIORITY_NOT_SET
 from simpleflow.base import Submittable
 from simpleflow.history import History
-from simpleflow.marker import Marker
+from simpleflow.log import set_log_context
+from simpleflow.marker import CHECKPOINT_MARKER_PREFIX, Marker
 from simpleflow.signal import WaitForSignal
 from simpleflow.swf import constants
 from simpleflow.swf.helpers import swf_identity
@@ -42,7 +46,6 @@ from simpleflow.utils import (
     hex_hash,
     issubclass_,
     json_dumps,
-    retry,
 )
 from simpleflow.workflow import Workflow
 from swf.core import ConnectedSWFObject
@@ -56,74 +59,139 @@ logger = logging.getLogger(__name__)
 __all__ = ['Executor']
 
 
-# if "poll_for_activity_task" doesn't contain a "taskToken"
-# key, then retry ; it happens (not often) that the decider
-# doesn't get the scheduled task while it should...
-@retry.with_delay(nb_times=3,
-                  delay=retry.exponential,
-                  on_exceptions=KeyError)
-def run_fake_activity_task(domain, task_list, result):
-    conn = ConnectedSWFObject().connection
-    resp = conn.poll_for_activity_task(
-        domain,
-        task_list,
-        identity=swf_identity(),
-    )
-    conn.respond_activity_task_completed(
-        resp['taskToken'],
-        result,
-    )
-
-
-# Same retry condition as run_fake_activity_task
-@retry.with_delay(nb_times=3,
-                  delay=retry.exponential,
-                  on_exceptions=KeyError)
-def run_fake_child_workflow_task(domain, task_list, result=None):
-    conn = ConnectedSWFObject().connection
-    resp = conn.poll_for_decision_task(
-        domain,
-        task_list,
-        identity=swf_identity(),
-    )
-    conn.respond_decision_task_completed(
-        resp['taskToken'],
-        decisions=[
-            {
+class FakeTaskWorker(object):
+    """
+    Complete the tasks faked by a repair with their former results.
+
+    All the faked tasks of a repair are scheduled on a single fake task
+    list, served by one long-lived process: a thread polls activity tasks,
+    another one the decision tasks of the faked child workflows.
+
+    :ivar domain: domain name.
+    :type domain: str
+    :ivar task_list: fake task list.
+    :type task_list: str
+    :ivar activity_results: former results by activity ID.
+    :type activity_results: dict[str, Any]
+    :ivar child_workflow_results: former results by child workflow ID.
+    :type child_workflow_results: dict[str, Any]
+    """
+
+    # Delay before polling again after an empty response or an error.
+    retry_delay = 1
+
+    def __init__(self, domain, task_list, activity_results, child_workflow_results):
+        self.domain = domain
+        self.task_list = task_list
+        self.activity_results = activity_results
+        self.child_workflow_results = child_workflow_results
+        self._parent_pid = os.getpid()
+
+    def start(self):
+        """
+        Start the worker in a daemon process: it stops with the decider.
+
+        Must be called in the decider poller process: daemon processes are
+        killed when their parent exits, and decision processes are short-lived.
+
+        :rtype: multiprocessing.Process
+        """
+        self._parent_pid = os.getpid()
+        process = multiprocessing.Process(target=self.run)
+        process.daemon = True
+        process.start()
+        return process
+
+    def is_parent_alive(self):
+        return os.getppid() == self._parent_pid
+
+    def run(self):
+        threads = []
+        if self.activity_results:
+            threads.append(threading.Thread(target=self._serve, args=(self.complete_activity_task,)))
+        if self.child_workflow_results:
+            threads.append(threading.Thread(target=self._serve, args=(self.complete_child_workflow_task,)))
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def _serve(self, complete_task):
+        conn = ConnectedSWFObject().connection
+        while self.is_parent_alive():
+            try:
+                completed = complete_task(conn)
+            except Exception as err:
+                logger.warning('fake task worker on %s: %s', self.task_list, err)
+                completed = False
+            if not completed:
+                time.sleep(self.retry_delay)
+
+    def complete_activity_task(self, conn):
+        """
+        Poll an activity task and complete it with its former result.
+
+        :type conn: boto.swf.layer1.Layer1
+        :return: True if a task was polled.
+        :rtype: bool
+        """
+        resp = conn.poll_for_activity_task(
+            self.domain,
+            self.task_list,
+            identity=swf_identity(),
+        )
+        token = resp.get('taskToken')
+        if not token:
+            return False
+        activity_id = resp['activityId']
+        if activity_id not in self.activity_results:
+            conn.respond_activity_task_failed(
+                token,
+                reason='no former result for activity {}'.format(activity_id),
+            )
+        else:
+            conn.respond_activity_task_completed(
+                token,
+                self.activity_results[activity_id],
+            )
+        return True
+
+    def complete_child_workflow_task(self, conn):
+        """
+        Poll a decision task of a child workflow and complete the workflow
+        with its former result.
+
+        :type conn: boto.swf.layer1.Layer1
+        :return: True if a task was polled.
+        :rtype: bool
+        """
+        resp = conn.poll_for_decision_task(
+            self.domain,
+            self.task_list,
+            identity=swf_identity(),
+            maximum_page_size=1,
+        )
+        token = resp.get('taskToken')
+        if not token:
+            return False
+        workflow_id = resp['workflowExecution']['workflowId']
+        if workflow_id not in self.child_workflow_results:
+            decision = {
+                'decisionType': 'FailWorkflowExecution',
+                'failWorkflowExecutionDecisionAttributes': {
+                    'reason': 'no former result for workflow {}'.format(workflow_id),
+                },
+            }
+        else:
+            decision = {
                 'decisionType': 'CompleteWorkflowExecution',
                 'completeWorkflowExecutionDecisionAttributes': {
-                    'result': result,
+                    'result': self.child_workflow_results[workflow_id],
                 },
             }
-        ]
-    )
-
-
-def run_fake_task_worker(domain, task_list, former_event):
-    if former_event['type'] == 'activity':
-        worker_proc = multiprocessing.Process(
-            target=run_fake_activity_task,
-            args=(
-                domain,
-                task_list,
-                former_event['result'],
-            ),
-        )
-    elif former_event['type'] == 'child_workflow':
-        worker_proc = multiprocessing.Process(
-            target=run_fake_child_workflow_task,
-            args=(
-                domain,
-                task_list,
-            ),
-            kwargs={
-                'result': former_event['result'],
-            },
-        )
-    else:
-        raise Exception('Wrong event type {}'.format(former_event['type']))
-
-    worker_proc.start()
+        conn.respond_decision_task_completed(token, decisions=[decision])
+        return True
 
 
 class TaskRegistry(dict):
@@ -198,6 +266,7 @@ class Executor(executor.Executor):
         self.current_priority = None
         self.handled_failures = {}
         self.created_activity_types = set()
+        self._fake_task_workers = {}  # type: dict[str, multiprocessing.Process]
 
     def reset(self):
         """
@@ -276,21 +345,16 @@ class Executor(executor.Executor):
                     self.domain,
                     name=name,
                     version=version)
-                logger.info('creating activity type {} in domain {}'.format(
-                    activity_type.name,
-                    self.domain.name))
+                logger.info('creating activity type %s in domain %s', activity_type.name, self.domain.name)
                 try:
                     activity_type.save()
                 except swf.exceptions.AlreadyExistsError:
                     logger.info(
-                        'oops: Activity type {} in domain {} already exists, creation failed, continuing...'.format(
-                            activity_type.name,
-                            self.domain.name))
+                        'oops: Activity type %s in domain %s already exists, creation failed, continuing...',
+                        activity_type.name,
+                        self.domain.name)
                 return None
-            logger.info('failed to schedule {}: {}'.format(
-                name,
-                event['cause'],
-            ))
+            logger.info('failed to schedule %s: %s', name, event['cause'])
             return None
         elif state == 'started':
             future.set_running()
@@ -338,10 +402,7 @@ class Executor(executor.Executor):
                     name=event['name'],
                     version=event['version'],
                 )
-                logger.info('Creating workflow type {} in domain {}'.format(
-                    workflow_type.name,
-                    self.domain.name,
-                ))
+                logger.info('Creating workflow type %s in domain %s', workflow_type.name, self.domain.name)
                 try:
                     workflow_type.save()
                 except swf.exceptions.AlreadyExistsError:
@@ -708,17 +769,17 @@ class Executor(executor.Executor):
             if not isinstance(control, dict):
                 control = {}
             if timer['state'] == 'started':
-                logger.debug('handle_failure: timer {} started, "pending" future'.format(timer['id']))
+                logger.debug('handle_failure: timer %s started, "pending" future', timer['id'])
                 return futures.Future(), swf_task  # mark as pending
             elif timer['state'] in ('fired', 'canceled'):
-                logger.debug('handle_failure: timer {} fired or canceled, retrying'.format(timer['id']))
+                logger.debug('handle_failure: timer %s fired or canceled, retrying', timer['id'])
                 swf_task.args = control.get('args', ())
                 swf_task.kwargs = control.get('kwargs', {})
                 return None, swf_task
             elif timer['state'] == 'start_failed':
                 raise exceptions.TaskFailed('timer', timer['id'], timer['cause'])
             else:  # TODO: handle
-                logger.warning('Unexpected timer state for timer "{}": {}'.format(timer['id'], timer['state']))
+                logger.warning('Unexpected timer state for timer "%s": %s', timer['id'], timer['state'])
 
         failure_context = base_task.TaskFailureContext(swf_task, event, future, exception_class, self._history)
         if hasattr(self.workflow, 'on_task_failure'):
@@ -808,7 +869,7 @@ class Executor(executor.Executor):
         if a_task.idempotent:
             task_identifier = (type(a_task), self.domain, a_task.id)
             if task_identifier in self._idempotent_tasks_to_submit:
-                logger.debug('Not resubmitting task {}'.format(a_task.name))
+                logger.debug('Not resubmitting task %s', a_task.name)
                 return
             self._idempotent_tasks_to_submit.add(task_identifier)
 
@@ -864,6 +925,76 @@ class Executor(executor.Executor):
         'timer': _get_future_from_timer_event,
     }
 
+    @property
+    def fake_task_list(self):
+        """
+        Task list of the tasks faked in repair mode, for the current execution.
+
+        :rtype: str
+        """
+        return self.get_fake_task_list(self._workflow_id, self._run_id)
+
+    def get_fake_task_list(self, workflow_id, run_id):
+        """
+        Task list of the tasks faked in repair mode, one per repaired execution.
+
+        :param workflow_id: workflow ID of the repairing execution.
+        :type workflow_id: str
+        :param run_id: run ID of the repairing execution.
+        :type run_id: str
+        :rtype: str
+        """
+        key = json_dumps([
+            self.domain.name,
+            self._repair_workflow_id,
+            self._repair_run_id,
+            workflow_id,
+            run_id,
+        ])
+        return "FAKE-" + hashlib.md5(key.encode('utf-8')).hexdigest()
+
+    def ensure_fake_task_worker(self, workflow_id, run_id):
+        """
+        Start the worker completing the tasks faked for an execution, unless
+        it is running or there is nothing to fake.
+
+        Called by the decider poller before each decision: the worker must
+        outlive the decision processes, which schedule the faked tasks.
+
+        :param workflow_id: workflow ID of the repairing execution.
+        :type workflow_id: str
+        :param run_id: run ID of the repairing execution.
+        :type run_id: str
+        :return: the worker process, if any.
+        :rtype: Optional[multiprocessing.Process]
+        """
+        if not self.repair_with:
+            return None
+        task_list = self.get_fake_task_list(workflow_id, run_id)
+        process = self._fake_task_workers.get(task_list)
+        if process is not None and process.is_alive():
+            return process
+        activity_results = {
+            activity_id: event['result']
+            for activity_id, event in self.repair_with.activities.items()
+            if event['state'] == 'completed'
+        }
+        child_workflow_results = {
+            child_workflow_id: event['result']
+            for child_workflow_id, event in self.repair_with.child_workflows.items()
+            if event['state'] == 'completed'
+        }
+        if not activity_results and not child_workflow_results:
+            return None
+        worker = FakeTaskWorker(
+            self.domain.name,
+            task_list,
+            activity_results=activity_results,
+            child_workflow_results=child_workflow_results,
+        )
+        process = self._fake_task_workers[task_list] = worker.start()
+        return process
+
     def resume(self, a_task, *args, **kwargs):
         """Resume the execution of a task.
         Called by `submit`.
@@ -890,7 +1021,7 @@ class Executor(executor.Executor):
                 workflow_id, run_id = self._workflow_id, self._run_id
             a_task.id = self._make_task_id(a_task, workflow_id, run_id, *args, **kwargs)
         event = self.find_event(a_task, self._history)
-        logger.debug('executor: resume {}, event={}'.format(a_task, event))
+        logger.debug('executor: resume %s, event=%s', a_task, event)
         future = None
 
         # in repair mode, check if we absolutely want to re-execute this task
@@ -905,18 +1036,13 @@ class Executor(executor.Executor):
             if former_event and former_event['state'] == 'completed':
                 logger.info(
                     'faking task completed successfully in previous '
-                    'workflow: {}'.format(former_event['id'])
+                    'workflow: %s', former_event['id']
                 )
-                json_hash = hashlib.md5(json_dumps(former_event).encode('utf-8')).hexdigest()
-                fake_task_list = "FAKE-" + json_hash
-
-                # schedule task on a fake task list
-                self.schedule_task(a_task, task_list=fake_task_list)
+                # schedule task on the fake task list, served by the
+                # worker the decider poller started (ensure_fake_task_worker)
+                self.schedule_task(a_task, task_list=self.fake_task_list)
                 future = futures.Future()
 
-                # start a dedicated process to handle the fake activity
-                run_fake_task_worker(self.domain.name, fake_task_list, former_event)
-
         # back to normal execution flow
         if event:
             ttf = self.EVENT_TYPE_TO_FUTURE.get(event['type'])
@@ -935,8 +1061,7 @@ class Executor(executor.Executor):
             future = futures.Future()  # return a pending future.
 
         if self._open_activity_count == constants.MAX_OPEN_ACTIVITY_COUNT:
-            logger.warning('limit of {} open activities reached'.format(
-                constants.MAX_OPEN_ACTIVITY_COUNT))
+            logger.warning('limit of %s open activities reached', constants.MAX_OPEN_ACTIVITY_COUNT)
             raise exceptions.ExecutionBlocked
 
         return future
@@ -1007,7 +1132,7 @@ class Executor(executor.Executor):
                 a_task = WorkflowTask(self, func, *args, **kwargs)
             elif isinstance(func, WaitForSignal):
                 future = self.get_future_from_signal(func.signal_name)
-                logger.debug('submitted WaitForSignalTask({}): future={}'.format(func.signal_name, future))
+                logger.debug('submitted WaitForSignalTask(%s): future=%s', func.signal_name, future)
                 if not future.done:
                     self._decisions_and_context.append_kv_to_set_context('waiting_signals', func.signal_name)
                 return future
@@ -1083,10 +1208,9 @@ class Executor(executor.Executor):
             self.propagate_signals()
             result = self.run_workflow(*args, **kwargs)
         except exceptions.ExecutionBlocked:
-            logger.info('{} open activities ({} decisions)'.format(
-                self._open_activity_count,
-                len(self._decisions_and_context.decisions),
-            ))
+            logger.info('%s open activities (%s decisions)',
+                        self._open_activity_count,
+                        len(self._decisions_and_context.decisions))
             self.after_replay()
             if decref_workflow:
                 self.decref_workflow()
@@ -1097,6 +1221,14 @@ class Executor(executor.Executor):
                 self.maybe_clear_execution_context()
 
             return self._decisions_and_context
+        except exceptions.ContinueAsNew as err:
+            logger.info('continuing as new after %s events', len(history))
+            decision = self._continue_as_new_decision(workflow_started_event, err.input)
+            self.after_replay()
+            self.after_closed()
+            if decref_workflow:
+                self.decref_workflow()
+            return DecisionsAndContext([decision])
         except (exceptions.TaskException, exceptions.WorkflowException) as err:
             def _extract_reason(err):
                 if hasattr(err.exception, 'reason'):
@@ -1155,6 +1287,28 @@ class Executor(executor.Executor):
             self.decref_workflow()
         return DecisionsAndContext([decision])
 
+    @staticmethod
+    def _continue_as_new_decision(workflow_started_event, input):
+        """
+        Build a decision continuing the execution with *input*; the other
+        parameters of the execution are carried over.
+
+        :type workflow_started_event: swf.models.event.workflow.WorkflowExecutionEvent
+        :type input: dict
+        :rtype: swf.models.decision.WorkflowExecutionDecision
+        """
+        event = workflow_started_event
+        decision = swf.models.decision.WorkflowExecutionDecision()
+        decision.continue_as_new(
+            input=input,
+            child_policy=getattr(event, 'child_policy', None),
+            execution_timeout=getattr(event, 'execution_start_to_close_timeout', None),
+            task_timeout=getattr(event, 'task_start_to_close_timeout', None),
+            tag_list=getattr(event, 'tag_list', None),
+            task_list=getattr(event, 'task_list', {}).get('name'),
+        )
+        return decision
+
     def maybe_clear_execution_context(self):
         """
         Replace a null execution_context with an empty string if the preceding one was set.
@@ -1248,6 +1402,11 @@ class Executor(executor.Executor):
             'parent_workflow_id': getattr(workflow_started_event, 'parent_workflow_execution', {}).get('workflowId'),
             'parent_run_id': getattr(workflow_started_event, 'parent_workflow_execution', {}).get('runId')
         }
+        set_log_context(
+            workflow_id=execution.workflow_id,
+            run_id=execution.run_id,
+            workflow_name=execution.workflow_type.name,
+        )
 
     @property
     def _workflow_id(self):
@@ -1270,12 +1429,11 @@ class Executor(executor.Executor):
         workflow_id = kwargs.pop('workflow_id', None)
         run_id = kwargs.pop('run_id', None)
         propagate = kwargs.pop('propagate', True)
-        logger.debug('signal: name={name}, workflow_id={workflow_id}, run_id={run_id}, propagate={propagate}'.format(
-            name=name,
-            workflow_id=workflow_id if workflow_id else self._workflow_id,
-            run_id=run_id if workflow_id else self._run_id,
-            propagate=propagate,
-        ))
+        logger.debug('signal: name=%s, workflow_id=%s, run_id=%s, propagate=%s',
+                     name,
+                     workflow_id if workflow_id else self._workflow_id,
+                     run_id if workflow_id else self._run_id,
+                     propagate)
 
         extra_input = {'__propagate': propagate if isinstance(propagate, bool) else str(propagate)}
         return SignalTask(
@@ -1288,7 +1446,7 @@ class Executor(executor.Executor):
         )
 
     def wait_signal(self, name):
-        logger.debug('{} - wait_signal({})'.format(self._workflow_id, name))
+        logger.debug('%s - wait_signal(%s)', self._workflow_id, name)
         return WaitForSignal(name)
 
     def propagate_signals(self):
@@ -1363,6 +1521,21 @@ class Executor(executor.Executor):
                 rc.append(Marker(m['name'], format.decode(m['details'])))
         return rc
 
+    def get_checkpoint(self, name):
+        markers = self._history.markers.get(CHECKPOINT_MARKER_PREFIX + name, ())
+        for marker in reversed(markers):
+            if marker['state'] == 'recorded':
+                return self._resume_from_checkpoint(name, format.decode(marker['details']))
+        return None
+
+    def get_task_counters(self):
+        return dict(self._tasks)
+
+    def restore_task_counters(self, counters):
+        for name, count in counters.items():
+            if self._tasks.get(name, 0) < count:
+                self._tasks[name] = count
+
     def get_event_details(self, event_type, event_name):
         if event_type == 'signal':
             return self._history.signals.get(event_name)
@@ -4,9 +4,11 @@ import getpass
 import json
 import os
 import socket
+import threading
 
 from future.utils import iteritems
 
+import swf.core
 import swf.exceptions
 import swf.models
 import swf.querysets
@@ -66,6 +68,57 @@ def show_workflow_profile(domain_name, workflow_id, run_id=None, nb_tasks=None):
     return pretty.profile(workflow_execution, nb_tasks)
 
 
+def show_fleet_profile(domain_name, workflow_type_name, workflow_type_version=None,
+                       started_since=30, limit=100, nb_workers=8, nb_tasks=None):
+    """
+    Profile the tasks of the last closed executions of a workflow type.
+
+    Histories are fetched concurrently, by a pool of ``nb_workers`` threads,
+    each with its own connection.
+
+    :param started_since: only consider executions started in the last N days.
+    :type started_since: int
+    :param limit: maximum number of executions to fetch.
+    :type limit: Optional[int]
+    :type nb_workers: int
+    :type nb_tasks: Optional[int]
+    """
+    from multiprocessing.pool import ThreadPool
+    from simpleflow.history import History
+
+    domain = swf.models.Domain(domain_name)
+    query = swf.querysets.WorkflowExecutionQuerySet(domain)
+    executions = query.iter_filter(
+        status=swf.models.WorkflowExecution.STATUS_CLOSED,
+        workflow_type_name=workflow_type_name,
+        workflow_type_version=workflow_type_version,
+        start_oldest_date=started_since,
+        limit=limit,
+    )
+
+    # The shared connection isn't thread-safe, and the main thread lists the
+    # executions with it meanwhile: each worker thread opens its own.
+    local = threading.local()
+
+    def get_history(execution):
+        connection = getattr(local, 'connection', None)
+        if connection is None:
+            connection = local.connection = swf.core.connect(domain.region, **swf.core.get_credentials())
+        execution.connection = connection
+        return execution.history()
+
+    pool = ThreadPool(nb_workers)
+    try:
+        histories = [
+            History(history) for history in
+            pool.imap_unordered(get_history, executions)
+        ]
+    finally:
+        pool.close()
+        pool.join()
+    return pretty.fleet_profile(histories, nb_tasks)
+
+
 def show_workflow_status(domain_name, workflow_id, run_id=None, nb_tasks=None):
     workflow_execution = get_workflow_execution(
         domain_name,
@@ -78,7 +131,7 @@ def show_workflow_status(domain_name, workflow_id, run_id=None, nb_tasks=None):
 def list_workflow_executions(domain_name, *args, **kwargs):
     domain = swf.models.Domain(domain_name)
     query = swf.querysets.WorkflowExecutionQuerySet(domain)
-    executions = query.all(*args, **kwargs)
+    executions = query.iter_all(*args, **kwargs)
 
     return pretty.list_executions(executions)
 
@@ -88,9 +141,9 @@ def filter_workflow_executions(domain_name, status, tag,
                                workflow_type_version, *args, **kwargs):
     domain = swf.models.Domain(domain_name)
     query = swf.querysets.WorkflowExecutionQuerySet(domain)
-    executions = query.filter(status, tag,
-                              workflow_id, workflow_type_name,
-                              workflow_type_version, *args, **kwargs)
+    executions = query.iter_filter(status, tag,
+                                   workflow_id, workflow_type_name,
+                                   workflow_type_version, *args, **kwargs)
 
     return pretty.list_details(executions)
 
@@ -3,8 +3,9 @@ from __future__ import absolute_import
 import logging
 import multiprocessing
 import os
+import time
 
-from simpleflow import format
+from simpleflow import format, metrics
 import swf.actors
 import swf.exceptions
 import swf.models.decision
@@ -30,11 +31,12 @@ class Decider(Supervisor):
     :ivar _poller: decider poller.
     :type _poller: DeciderPoller
     """
-    def __init__(self, poller, nb_children=None):
+    def __init__(self, poller, nb_children=None, autoscaler=None):
         self._poller = poller
         super(Decider, self).__init__(
             payload=self._poller.start,
             nb_children=nb_children,
+            autoscaler=autoscaler,
         )
 
 
@@ -173,8 +175,64 @@ class DeciderPoller(Poller, swf.actors.Decider):
         :param decision_response: an object wrapping the PollForDecisionTask response.
         :type  decision_response: swf.responses.Response
         """
+        workflow_executor = self.get_workflow_executor(decision_response)
+        if workflow_executor is not None and workflow_executor.repair_with:
+            # The faked tasks must be served by a process outliving the
+            # decision process.
+            execution = decision_response.execution
+            workflow_executor.ensure_fake_task_worker(execution.workflow_id, execution.run_id)
         spawn(self, decision_response)
 
+    def load_workflow_executor(self, workflow_name):
+        """
+        Load the executor of a workflow the decider wasn't started with,
+        e.g. a child workflow from another module, and keep it.
+
+        Decisions are taken in forked processes: the executors must be loaded
+        in the poller process to be reused by the next decisions.
+
+        :param workflow_name: workflow name, e.g. "module.MyWorkflow".
+        :type workflow_name: str
+        :rtype: simpleflow.swf.executor.Executor
+        """
+        workflow_executor = self._workflow_executors.get(workflow_name)
+        if not workflow_executor:
+            from . import helpers
+            workflow_executor = helpers.load_workflow_executor(
+                self.domain,
+                workflow_name,
+                task_list=self.task_list if self.is_standalone else None,
+            )
+            self._workflow_executors[workflow_name] = workflow_executor
+        return workflow_executor
+
+    def preload_workflows(self, workflow_names):
+        """
+        Load the executors of workflows before polling.
+
+        :param workflow_names: workflow names, e.g. "module.MyWorkflow".
+        :type workflow_names: list[str]
+        """
+        for workflow_name in workflow_names:
+            self.load_workflow_executor(workflow_name)
+
+    def get_workflow_executor(self, decision_response):
+        """
+        Get the executor handling a decision, loading it if needed.
+
+        :param decision_response: an object wrapping the PollForDecisionTask response.
+        :type  decision_response: swf.responses.Response
+        :return: the executor, or None if it cannot be loaded (the decision
+            process will report the error).
+        :rtype: Optional[simpleflow.swf.executor.Executor]
+        """
+        workflow_name = decision_response.history[0].workflow_type['name']
+        try:
+            return self.load_workflow_executor(workflow_name)
+        except Exception as err:
+            logger.warning('cannot load workflow executor for %s: %s', workflow_name, err)
+            return None
+
     @with_state('deciding')
     def decide(self, decision_response):
         """
@@ -229,6 +287,12 @@ class DeciderWorker(object):
                 task_list=task_list,
             )
             self._workflow_executors[workflow_name] = workflow_executor
+        labels = {'workflow': workflow_name}
+        wait = get_decision_task_wait(history)
+        if wait is not None:
+            metrics.DECISION_TASK_WAIT_SECONDS.observe(wait, **labels)
+        metrics.REPLAY_EVENTS.observe(len(history), **labels)
+        start = time.time()
         try:
             decisions = workflow_executor.replay(decision_response)
         except Exception as err:
@@ -239,30 +303,58 @@ class DeciderWorker(object):
             decision = swf.models.decision.WorkflowExecutionDecision()
             decision.fail(reason=message, details=details)
             decisions = [decision]
+        metrics.REPLAY_SECONDS.observe(time.time() - start, **labels)
+        nb_decisions = len(decisions.decisions if isinstance(decisions, DecisionsAndContext) else decisions)
+        metrics.DECISIONS_PER_RESPONSE.observe(nb_decisions, **labels)
 
         return decisions
 
 
+def get_decision_task_wait(history):
+    """
+    Time the current decision task waited in the task list.
+
+    :param history: events of the decision task.
+    :type history: swf.models.History | list[swf.models.event.Event]
+    :return: seconds between the scheduling and the start of the last
+        decision task, if known.
+    :rtype: Optional[float]
+    """
+    started = None
+    for event in reversed(list(history)):
+        if event.type != 'DecisionTask':
+            continue
+        if started is None:
+            if event.state != 'started':
+                return None
+            started = event
+        elif event.state == 'scheduled':
+            return (started.timestamp - event.timestamp).total_seconds()
+    return None
+
+
 def process_decision(poller, decision_response):
     # type: (DeciderPoller, Response) -> None
     workflow_id = decision_response.execution.workflow_id
     workflow_str = "workflow {} ({})".format(workflow_id, poller.workflow_name)
-    logger.debug("process_decision() pid={}".format(os.getpid()))
-    logger.info("taking decision for {}".format(workflow_str))
+    logger.debug("process_decision() pid=%s", os.getpid())
+    logger.info("taking decision for %s", workflow_str)
     format.JUMBO_FIELDS_MEMORY_CACHE.clear()
     decisions = poller.decide(decision_response)
     try:
-        logger.info("completing decision for {}".format(workflow_str))
+        logger.info("completing decision for %s", workflow_str)
         poller.complete_with_retry(decision_response.token, decisions)
     except Exception as err:
-        logger.error("cannot complete decision for {}: {}".format(workflow_str, err))
+        logger.error("cannot complete decision for %s: %s", workflow_str, err)
 
 
 def spawn(poller, decision_response):
-    logger.debug("spawn() pid={}".format(os.getpid()))
+    logger.debug("spawn() pid=%s", os.getpid())
     worker = multiprocessing.Process(
         target=process_decision,
         args=(poller, decision_response),
     )
-    worker.start()
-    worker.join()
+    with metrics.DECISION_SECONDS.time(**poller.metrics_labels):
+        with metrics.FORK_SECONDS.time(**poller.metrics_labels):
+            worker.start()
+        worker.join()
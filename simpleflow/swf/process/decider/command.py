@@ -10,6 +10,8 @@ logger = logging.getLogger(__name__)
 def start(workflows, domain, task_list, log_level=None, nb_processes=None,
           repair_with=None, force_activities=None, is_standalone=False,
           repair_workflow_id=None, repair_run_id=None,
+          min_processes=None, max_processes=None,
+          preload_workflows=None,
           ):
     """
     Start a decider.
@@ -33,6 +35,12 @@ def start(workflows, domain, task_list, log_level=None, nb_processes=None,
     :type repair_workflow_id: Optional[str]
     :param repair_run_id: run ID to repair
     :type repair_run_id: Optional[str]
+    :param min_processes: minimum number of processes when autoscaling.
+    :type min_processes: Optional[int]
+    :param max_processes: enable autoscaling up to this number of processes.
+    :type max_processes: Optional[int]
+    :param preload_workflows: other workflows to load before polling, e.g. child workflows.
+    :type preload_workflows: Optional[list[str]]
     """
     if log_level:
         logger.warning(
@@ -45,6 +53,9 @@ def start(workflows, domain, task_list, log_level=None, nb_processes=None,
         is_standalone=is_standalone,
         repair_workflow_id=repair_workflow_id,
         repair_run_id=repair_run_id,
+        min_children=min_processes,
+        max_children=max_processes,
+        preload_workflows=preload_workflows,
     )
     decider.is_alive = True
     decider.start()
@@ -1,7 +1,9 @@
 import logging
 
+import swf.actors
 import swf.models
 
+from simpleflow.process import Autoscaler
 from simpleflow.swf.executor import Executor
 from . import (
     Decider,
@@ -58,6 +60,7 @@ def make_decider_poller(workflows, domain, task_list, repair_with=None,
                         force_activities=None,
                         is_standalone=False,
                         repair_workflow_id=None, repair_run_id=None,
+                        preload_workflows=None,
                         ):
     """
     Factory building a decider poller.
@@ -77,6 +80,8 @@ def make_decider_poller(workflows, domain, task_list, repair_with=None,
     :type repair_workflow_id: Optional[str]
     :param repair_run_id: run ID to repair
     :type repair_run_id: Optional[str]
+    :param preload_workflows: other workflows to load before polling, e.g. child workflows.
+    :type preload_workflows: Optional[list[str]]
     :return:
     :rtype: DeciderPoller
     """
@@ -97,13 +102,19 @@ def make_decider_poller(workflows, domain, task_list, repair_with=None,
         for workflow in workflows
         ]
     domain = swf.models.Domain(domain)
-    return DeciderPoller(executors, domain, task_list, is_standalone)
+    poller = DeciderPoller(executors, domain, task_list, is_standalone)
+    if preload_workflows:
+        poller.preload_workflows(preload_workflows)
+        logger.info('preloaded workflows {}'.format(', '.join(preload_workflows)))
+    return poller
 
 
 def make_decider(workflows, domain, task_list, nb_children=None,
                  repair_with=None, force_activities=None,
                  is_standalone=False,
                  repair_workflow_id=None, repair_run_id=None,
+                 min_children=None, max_children=None,
+                 preload_workflows=None,
                  ):
     """
     Instantiate a Decider.
@@ -125,6 +136,12 @@ def make_decider(workflows, domain, task_list, nb_children=None,
     :type repair_workflow_id: Optional[str]
     :param repair_run_id: run ID to repair
     :type repair_run_id: Optional[str]
+    :param min_children: minimum number of deciders when autoscaling.
+    :type min_children: Optional[int]
+    :param max_children: enable autoscaling up to this number of deciders.
+    :type max_children: Optional[int]
+    :param preload_workflows: other workflows to load before polling, e.g. child workflows.
+    :type preload_workflows: Optional[list[str]]
     :return:
     :rtype: Decider
     """
@@ -134,5 +151,14 @@ def make_decider(workflows, domain, task_list, nb_children=None,
                                  is_standalone=is_standalone,
                                  repair_workflow_id=repair_workflow_id,
                                  repair_run_id=repair_run_id,
+                                 preload_workflows=preload_workflows,
                                  )
-    return Decider(poller, nb_children=nb_children)
+    autoscaler = None
+    if max_children:
+        counter = swf.actors.Decider(poller.domain, poller.task_list)
+        autoscaler = Autoscaler(
+            counter.count_pending,
+            min_children=min_children or 1,
+            max_children=max_children,
+        )
+    return Decider(poller, nb_children=nb_children, autoscaler=autoscaler)
@@ -2,10 +2,11 @@ import abc
 import logging
 import os
 import signal
+import time
 
 import swf.actors
 import swf.exceptions
-from simpleflow import utils
+from simpleflow import metrics, utils
 from simpleflow.process import NamedMixin, with_state
 from simpleflow.swf.helpers import swf_identity
 
@@ -54,7 +55,7 @@ class Poller(swf.actors.Actor, NamedMixin):
 
         # NB: Function is nested to have a reference to *self*.
         def _handle_graceful_shutdown(signum, frame):
-            logger.info("process: caught signal signal=SIGTERM pid={}".format(os.getpid()))
+            logger.info("process: caught signal signal=SIGTERM pid=%s", os.getpid())
             self.stop_gracefully()
 
         # bind SIGTERM and SIGINT
@@ -73,6 +74,7 @@ class Poller(swf.actors.Actor, NamedMixin):
         self.is_alive = True
         self.set_process_name()
         while self.is_alive:
+            metrics.flush()
             try:
                 response = self.poll_with_retry()
             except swf.exceptions.PollTimeout:
@@ -95,6 +97,16 @@ class Poller(swf.actors.Actor, NamedMixin):
                 continue
             self.process(response)
             break
+        metrics.flush(force=True)
+
+    @property
+    def metrics_labels(self):
+        """
+        Labels of the metrics of the poller.
+
+        :rtype: dict[str, str]
+        """
+        return {'poller': self.__class__.__name__, 'task_list': self.task_list}
 
     @with_state('stopping')
     def stop_gracefully(self):
@@ -121,7 +133,8 @@ class Poller(swf.actors.Actor, NamedMixin):
                 log_with=logger.exception,
                 except_on=swf.exceptions.DoesNotExistError,
             )(self.complete)  # Exponential backoff on errors.
-            complete(token, response)
+            with metrics.COMPLETE_SECONDS.time(**self.metrics_labels):
+                complete(token, response)
         except Exception as err:
             # This is embarrassing because the decider cannot notify SWF of the
             # task completion. As it will not try again, the task will
@@ -169,7 +182,14 @@ class Poller(swf.actors.Actor, NamedMixin):
             log_with=logger.exception,
             on_exceptions=swf.exceptions.ResponseError,
         )(self.poll)
-        response = poll(task_list, identity=identity)
+        start = time.time()
+        try:
+            response = poll(task_list, identity=identity)
+        except swf.exceptions.PollTimeout:
+            metrics.POLL_TIMEOUTS.inc(**self.metrics_labels)
+            raise
+        finally:
+            metrics.POLL_SECONDS.observe(time.time() - start, **self.metrics_labels)
         return response
 
     @abc.abstractmethod
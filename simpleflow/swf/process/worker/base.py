@@ -1,26 +1,34 @@
 from base64 import b64decode
-import errno
 import logging
 import json
 import multiprocessing
 import os
 import signal
 import sys
+import time
 import traceback
 import uuid
 
+try:
+    import queue
+except ImportError:  # Python 2
+    import Queue as queue
+
 import psutil
 
-from simpleflow import format
+from simpleflow import format, metrics, settings, zygote
 from simpleflow.exceptions import ExecutionError
+from simpleflow.execute import kill_child_processes
 import swf.actors
 import swf.exceptions
 from swf.models import ActivityTask as BaseActivityTask
 from swf.responses import Response
 from simpleflow.dispatch import dynamic_dispatcher
 from simpleflow.download import download_binaries
-from simpleflow.job import KubernetesJob
+from simpleflow.job import JobSubmitter, KubernetesJob
+from simpleflow.log import set_log_context
 from simpleflow.process import Supervisor, with_state
+from simpleflow.progress import CONTEXT_KEY as PROGRESS_CONTEXT_KEY, ProgressReader
 from simpleflow.swf.constants import VALID_PROCESS_MODES
 from simpleflow.swf.process import Poller
 
@@ -31,13 +39,17 @@ from simpleflow.utils import format_exc, json_dumps, to_k8s_identifier
 
 logger = logging.getLogger(__name__)
 
+# Seconds between SIGTERM and SIGKILL when stopping a cancelled task
+KILL_GRACE_PERIOD = 5
+
 
 class Worker(Supervisor):
-    def __init__(self, poller, nb_children=None):
+    def __init__(self, poller, nb_children=None, autoscaler=None):
         self._poller = poller
         super(Worker, self).__init__(
             payload=self._poller.start,
             nb_children=nb_children,
+            autoscaler=autoscaler,
         )
 
 
@@ -46,7 +58,8 @@ class ActivityPoller(Poller, swf.actors.ActivityWorker):
     Polls an activity and handles it in the worker.
 
     """
-    def __init__(self, domain, task_list, heartbeat=60, process_mode=None, poll_data=None):
+    def __init__(self, domain, task_list, heartbeat=60, process_mode=None, poll_data=None,
+                 cancel_check_interval=None, kill_grace_period=KILL_GRACE_PERIOD):
         """
 
         :param domain:
@@ -57,17 +70,30 @@ class ActivityPoller(Poller, swf.actors.ActivityWorker):
         :type heartbeat:
         :param process_mode: Whether to process locally (default) or spawn a Kubernetes job.
         :type process_mode: Optional[str]
+        :param cancel_check_interval: Check for cancellation more often than heartbeating.
+        :type cancel_check_interval: Optional[int]
+        :param kill_grace_period: Delay between SIGTERM and SIGKILL when stopping a task.
+        :type kill_grace_period: float
         """
         self.nb_retries = 3
         # heartbeat=0 is a special value to disable heartbeating. We want to
         # replace it by None because multiprocessing.Process.join() treats
         # this as "no timeout"
         self._heartbeat = heartbeat or None
+        self._cancel_check_interval = cancel_check_interval or None
+        self._kill_grace_period = kill_grace_period
 
         self.process_mode = process_mode or 'local'
         assert self.process_mode in VALID_PROCESS_MODES, 'invalid process_mode "{}"'.format(self.process_mode)
 
         self.poll_data = poll_data
+        self._job_submitter = None
+        # (token, task, reason) of the jobs the submitter threads failed to
+        # create: the tasks are failed by the polling thread, as the SWF
+        # connection isn't thread-safe.
+        self._failed_jobs = queue.Queue()
+        if self.process_mode == 'kubernetes' and settings.SIMPLEFLOW_K8S_SUBMIT_CONCURRENCY > 0:
+            self._job_submitter = JobSubmitter(settings.SIMPLEFLOW_K8S_SUBMIT_CONCURRENCY)
         super(ActivityPoller, self).__init__(domain, task_list)
 
     @property
@@ -77,8 +103,19 @@ class ActivityPoller(Poller, swf.actors.ActivityWorker):
             self.task_list,
         )
 
+    def start(self):
+        if settings.SIMPLEFLOW_EXECUTE_ZYGOTE and zygote.is_supported():
+            # Start the zygote of the default interpreter before forking task
+            # processes, so that they all share it.
+            zygote.get_zygote('python')
+        try:
+            super(ActivityPoller, self).start()
+        finally:
+            self.wait_for_jobs()
+
     @with_state('polling')
     def poll(self, task_list=None, identity=None):
+        self.report_failed_jobs()
         if self.poll_data:
             # the poll data has been passed as input
             return self.fake_poll()
@@ -109,18 +146,55 @@ class ActivityPoller(Poller, swf.actors.ActivityWorker):
         token = response.task_token
         task = response.activity_task
         if self.process_mode == "kubernetes":
-            try:
-                spawn_kubernetes_job(self, response.raw_response)
-            except Exception as err:
-                logger.exception("spawn_kubernetes_job error")
-                reason = 'cannot spawn kubernetes job for task {}: {} {}'.format(
+            def get_reason(err):
+                return 'cannot spawn kubernetes job for task {}: {} {}'.format(
                     task.activity_id,
                     err.__class__.__name__,
                     err,
                 )
-                self.fail_with_retry(token, task, reason)
+
+            if self._job_submitter:
+                job = KubernetesJob(self.job_name, self.domain.name, response.raw_response)
+                self._job_submitter.submit(
+                    job,
+                    on_error=lambda err: self._failed_jobs.put((token, task, get_reason(err))),
+                )
+                return
+            try:
+                spawn_kubernetes_job(self, response.raw_response)
+            except Exception as err:
+                logger.exception("spawn_kubernetes_job error")
+                self.fail_with_retry(token, task, get_reason(err))
         else:
-            spawn(self, token, task, self._heartbeat)
+            spawn(self, token, task, self._heartbeat,
+                  cancel_check_interval=self._cancel_check_interval,
+                  kill_grace_period=self._kill_grace_period)
+
+    def run_once(self):
+        try:
+            super(ActivityPoller, self).run_once()
+        finally:
+            self.wait_for_jobs()
+
+    def wait_for_jobs(self):
+        """
+        Wait for the Kubernetes jobs submitted in the background to be scheduled.
+        """
+        if self._job_submitter:
+            self._job_submitter.join()
+            self.report_failed_jobs()
+
+    def report_failed_jobs(self):
+        """
+        Fail the tasks whose Kubernetes job couldn't be created in the
+        background.
+        """
+        while True:
+            try:
+                token, task, reason = self._failed_jobs.get_nowait()
+            except queue.Empty:
+                return
+            self.fail_with_retry(token, task, reason)
 
     @with_state('completing')
     def complete(self, token, result=None):
@@ -150,10 +224,7 @@ class ActivityPoller(Poller, swf.actors.ActivityWorker):
                 details=details,
             )
         except Exception as err:
-            logger.error('cannot fail task {}: {}'.format(
-                task.activity_type.name,
-                err,
-            ))
+            logger.error('cannot fail task %s: %s', task.activity_type.name, err)
 
     @property
     def identity(self):
@@ -183,7 +254,7 @@ class ActivityWorker(object):
         name = task.activity_type.name
         return self._dispatcher.dispatch_activity(name)
 
-    def process(self, poller, token, task):
+    def process(self, poller, token, task, progress_fd=None):
         """
 
         :param poller:
@@ -192,8 +263,10 @@ class ActivityWorker(object):
         :type token: str
         :param task:
         :type task: swf.models.ActivityTask
+        :param progress_fd: write end of the progress channel, if any
+        :type progress_fd: Optional[int]
         """
-        logger.debug('ActivityWorker.process() pid={}'.format(os.getpid()))
+        logger.debug('ActivityWorker.process() pid=%s', os.getpid())
         try:
             activity = self.dispatch(task)
             input = format.decode(task.input)
@@ -201,12 +274,14 @@ class ActivityWorker(object):
             kwargs = input.get('kwargs', {})
             context = sanitize_activity_context(task.context)
             context['domain_name'] = poller.domain.name
+            if progress_fd is not None:
+                context[PROGRESS_CONTEXT_KEY] = progress_fd
             if input.get('meta', {}).get('binaries'):
                 download_binaries(input['meta']['binaries'])
             result = ActivityTask(activity, *args, context=context, **kwargs).execute()
         except Exception:
             exc_type, exc_value, exc_traceback = sys.exc_info()
-            logger.exception("process error: {}".format(str(exc_value)))
+            logger.exception("process error: %s", exc_value)
             if isinstance(exc_value, ExecutionError) and len(exc_value.args):
                 details = exc_value.args[0]
                 reason = format_exc(exc_value)  # FIXME json.loads and rebuild?
@@ -240,7 +315,7 @@ class ActivityWorker(object):
             poller.fail_with_retry(token, task, reason)
 
 
-def process_task(poller, token, task):
+def process_task(poller, token, task, progress_fd=None):
     """
 
     :param poller:
@@ -249,11 +324,23 @@ def process_task(poller, token, task):
     :type token: str
     :param task:
     :type task: swf.models.ActivityTask
+    :param progress_fd: write end of the progress channel, if any
+    :type progress_fd: Optional[int]
     """
-    logger.debug('process_task() pid={}'.format(os.getpid()))
+    logger.debug('process_task() pid=%s', os.getpid())
+    workflow_execution = getattr(task, 'workflow_execution', None)
+    set_log_context(
+        activity_id=task.activity_id,
+        activity_name=getattr(task.activity_type, 'name', None),
+        workflow_id=getattr(workflow_execution, 'workflow_id', None),
+        run_id=getattr(workflow_execution, 'run_id', None),
+    )
+    # The poller's SIGTERM handler only stops polling: restore the default
+    # behaviour so that a cancelled task can actually be terminated.
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
     format.JUMBO_FIELDS_MEMORY_CACHE.clear()
     worker = ActivityWorker()
-    worker.process(poller, token, task)
+    worker.process(poller, token, task, progress_fd=progress_fd)
 
 
 def spawn_kubernetes_job(poller, swf_response):
@@ -261,9 +348,20 @@ def spawn_kubernetes_job(poller, swf_response):
     job.schedule()
 
 
-def spawn(poller, token, task, heartbeat=60):
+def spawn(poller, token, task, heartbeat=60, cancel_check_interval=None,
+          kill_grace_period=KILL_GRACE_PERIOD):
     """
     Spawn a process and wait for it to end, sending heartbeats to SWF.
+
+    The latest progress reported by the activity through the progress channel
+    (see simpleflow.progress) is sent as the heartbeat details.
+
+    SWF only tells about a cancellation or a vanished task in a heartbeat
+    response. With a *cancel_check_interval* shorter than *heartbeat*, we
+    heartbeat at this pace so these are noticed sooner. The worker process
+    and its descendants are then terminated, and killed if still there after
+    *kill_grace_period*.
+
     :param poller:
     :type poller: ActivityPoller
     :param token:
@@ -272,28 +370,96 @@ def spawn(poller, token, task, heartbeat=60):
     :type task: swf.models.ActivityTask
     :param heartbeat: heartbeat delay (seconds)
     :type heartbeat: int
+    :param cancel_check_interval: cancellation check delay (seconds)
+    :type cancel_check_interval: Optional[int]
+    :param kill_grace_period: delay between SIGTERM and SIGKILL (seconds)
+    :type kill_grace_period: float
     """
-    logger.debug('spawn() pid={} heartbeat={}'.format(os.getpid(), heartbeat))
+    logger.debug('spawn() pid=%s heartbeat=%s cancel_check_interval=%s',
+                 os.getpid(), heartbeat, cancel_check_interval)
+    if cancel_check_interval and (heartbeat is None or cancel_check_interval < heartbeat):
+        heartbeat = cancel_check_interval
+    progress = ProgressReader()
     worker = multiprocessing.Process(
         target=process_task,
-        args=(poller, token, task),
+        args=(poller, token, task, progress.writer_fd),
     )
-    worker.start()
+    start = time.time()
+    with metrics.FORK_SECONDS.time(**poller.metrics_labels):
+        worker.start()
+    # the worker has its own copy; closing ours lets us notice when it's gone
+    progress.close_writer()
+    try:
+        _wait_and_heartbeat(poller, token, task, worker, progress, heartbeat, kill_grace_period)
+    finally:
+        progress.close()
+        metrics.ACTIVITY_TASK_SECONDS.observe(
+            time.time() - start, activity=task.activity_type.name, **poller.metrics_labels)
+
+
+def _wait_for_worker(worker, progress, heartbeat):
+    """
+    Wait for the worker process during a heartbeat interval, collecting the
+    progress it reports.
+
+    :type worker: multiprocessing.Process
+    :type progress: ProgressReader
+    :type heartbeat: Optional[int]
+    """
+    if heartbeat is None:
+        # nothing to send the progress with
+        worker.join()
+        return
+    deadline = time.time() + heartbeat
+    progress.wait(timeout=heartbeat)
+    if progress.closed:
+        # the worker exited, or closed the channel: plain join
+        worker.join(timeout=max(0, deadline - time.time()))
+    else:
+        # reap the worker if it exited while a descendant keeps the channel open
+        worker.join(timeout=0)
+
+
+def _stop_worker(worker, grace_period, reason):
+    """
+    Terminate the worker process and its descendants, killing those still
+    alive after *grace_period*.
 
+    :type worker: multiprocessing.Process
+    :type grace_period: float
+    :param reason: why the worker is stopped, for logging and metrics.
+    :type reason: str
+    """
+    logger.warning('stopping worker with pid=%s (%s)', worker.pid, reason)
+    start = time.time()
+    still_alive = kill_child_processes(worker.pid, timeout=grace_period, include_parent=True)
+    worker.join(timeout=0)
+    if still_alive:
+        logger.error('worker with pid=%s: processes %s survived SIGKILL',
+                     worker.pid, [p.pid for p in still_alive])
+    duration = time.time() - start
+    metrics.CANCEL_SECONDS.observe(duration, reason=reason)
+    logger.info('worker with pid=%s stopped in %.3fs (%s)', worker.pid, duration, reason)
+
+
+def _wait_and_heartbeat(poller, token, task, worker, progress, heartbeat, kill_grace_period):
+    """
+    Heartbeat until the worker process ends, the task is cancelled, or it no
+    longer exists.
+    """
     def worker_alive():
         return psutil.pid_exists(worker.pid)
 
     while worker_alive():
-        worker.join(timeout=heartbeat)
+        _wait_for_worker(worker, progress, heartbeat)
         if not worker_alive():
             # Most certainly unneeded: we'll see
             if worker.exitcode is None:
                 # race condition, try and re-join
                 worker.join(timeout=0)
                 if worker.exitcode is None:
-                    logger.warning("process {} is dead but multiprocessing doesn't know it (simpleflow bug)".format(
-                        worker.pid
-                    ))
+                    logger.warning("process %s is dead but multiprocessing doesn't know it (simpleflow bug)",
+                                   worker.pid)
             if worker.exitcode != 0:
                 poller.fail_with_retry(
                     token,
@@ -304,45 +470,38 @@ def spawn(poller, token, task, heartbeat=60):
                 )
             return
         try:
-            logger.debug(
-                'heartbeating for pid={} (token={})'.format(worker.pid, token)
-            )
-            response = poller.heartbeat(token)
+            logger.debug('heartbeating for pid=%s (token=%s)', worker.pid, token)
+            with metrics.HEARTBEAT_SECONDS.time(**poller.metrics_labels):
+                response = poller.heartbeat(token, details=progress.details)
         except swf.exceptions.DoesNotExistError as error:
             # Either the task or the workflow execution no longer exists,
-            # let's kill the worker process.
-            logger.warning('heartbeat failed: {}'.format(error))
-            logger.warning('killing (KILL) worker with pid={}'.format(worker.pid))
-            try:
-                # The try/except protects us from a race condition: by the
-                # time we issue the os.kill() call, we're not 100% sure
-                # that the worker process is still alive.
-                os.kill(worker.pid, signal.SIGKILL)
-            except OSError as e:
-                # Compare errno to the errno for "No such process"
-                if e.errno != errno.ESRCH:
-                    # re-raise if we get an OSError for another reason
-                    raise
-                logger.warning('process was not here anymore, got OSError: {}'.format(e.strerror))
+            # let's stop the worker process.
+            logger.warning('heartbeat failed: %s', error)
+            _stop_worker(worker, kill_grace_period, 'task no longer exists')
             return
         except swf.exceptions.RateLimitExceededError as error:
             # ignore rate limit errors: high chances the next heartbeat will be
             # ok anyway, so it would be stupid to break the task for that
             logger.warning(
-                'got a "ThrottlingException / Rate exceeded" when heartbeating for task {}: {}'.format(
-                    task.activity_type.name,
-                    error))
+                'got a "ThrottlingException / Rate exceeded" when heartbeating for task %s: %s',
+                task.activity_type.name,
+                error)
             continue
         except Exception as error:
             # Let's crash if it cannot notify the heartbeat failed.  The
             # subprocess will become orphan and the heartbeat timeout may
             # eventually trigger on Amazon SWF side.
-            logger.error('cannot send heartbeat for task {}: {}'.format(
-                task.activity_type.name,
-                error))
+            logger.error('cannot send heartbeat for task %s: %s', task.activity_type.name, error)
             raise
 
         if response and response.get('cancelRequested'):
             # Task cancelled.
-            worker.terminate()  # SIGTERM
+            _stop_worker(worker, kill_grace_period, 'cancel requested')
+            try:
+                poller.cancel(token)
+            except swf.exceptions.DoesNotExistError:
+                # completed or failed meanwhile
+                pass
+            except Exception as error:
+                logger.error('cannot cancel task %s: %s', task.activity_type.name, error)
             return
@@ -1,14 +1,24 @@
 from __future__ import absolute_import
 
+import logging
+
+import swf.actors
 import swf.models
+from simpleflow.dispatch import dynamic_dispatcher
+from simpleflow.process import Autoscaler
 
 from .base import (
     Worker,
     ActivityPoller,
+    KILL_GRACE_PERIOD,
 )
 
 
-def make_worker_poller(domain, task_list, heartbeat, process_mode, poll_data):
+logger = logging.getLogger(__name__)
+
+
+def make_worker_poller(domain, task_list, heartbeat, process_mode, poll_data,
+                       cancel_check_interval=None, kill_grace_period=KILL_GRACE_PERIOD):
     """
     Make a worker poller for the domain and task list.
     :param domain:
@@ -21,15 +31,23 @@ def make_worker_poller(domain, task_list, heartbeat, process_mode, poll_data):
     :type process_mode: str
     :param poll_data: Base64 encoded poll data from SWF, in case you don't want to poll directly.
     :type poll_data: str
+    :param cancel_check_interval: Check for cancellation more often than heartbeating.
+    :type cancel_check_interval: Optional[int]
+    :param kill_grace_period: Delay between SIGTERM and SIGKILL when stopping a task.
+    :type kill_grace_period: float
     :return:
     :rtype: ActivityPoller
     """
     domain = swf.models.Domain(domain)
-    return ActivityPoller(domain, task_list, heartbeat, process_mode, poll_data)
+    return ActivityPoller(domain, task_list, heartbeat, process_mode, poll_data,
+                          cancel_check_interval=cancel_check_interval,
+                          kill_grace_period=kill_grace_period)
 
 
 def start(domain, task_list, nb_processes=None, heartbeat=60, one_task=False,
-          process_mode=None, poll_data=None):
+          process_mode=None, poll_data=None, cancel_check_interval=None,
+          kill_grace_period=KILL_GRACE_PERIOD, min_processes=None, max_processes=None,
+          preload=None):
     """
     Start a worker for the given domain and task_list.
     :param domain:
@@ -46,8 +64,25 @@ def start(domain, task_list, nb_processes=None, heartbeat=60, one_task=False,
     :type process_mode: Optional[str]
     :param poll_data: Base64 encoded poll data from SWF, in case you don't want to poll directly.
     :type poll_data: Optional[str]
+    :param cancel_check_interval: Check for cancellation more often than heartbeating.
+    :type cancel_check_interval: Optional[int]
+    :param kill_grace_period: Delay between SIGTERM and SIGKILL when stopping a task.
+    :type kill_grace_period: float
+    :param min_processes: minimum number of processes when autoscaling.
+    :type min_processes: Optional[int]
+    :param max_processes: enable autoscaling up to this number of processes.
+    :type max_processes: Optional[int]
+    :param preload: modules to import, and whose activities to resolve, before polling.
+    :type preload: Optional[list[str]]
     """
-    poller = make_worker_poller(domain, task_list, heartbeat, process_mode, poll_data)
+    if preload:
+        # done before forking worker processes so that they all inherit it
+        nb_activities = dynamic_dispatcher.preload(preload)
+        logger.info('preloaded {} activities from {}'.format(nb_activities, ', '.join(preload)))
+
+    poller = make_worker_poller(domain, task_list, heartbeat, process_mode, poll_data,
+                                cancel_check_interval=cancel_check_interval,
+                                kill_grace_period=kill_grace_period)
 
     if poll_data:
         # if "poll_data" is provided, no need to process it multiple times
@@ -56,6 +91,14 @@ def start(domain, task_list, nb_processes=None, heartbeat=60, one_task=False,
     if one_task:
         poller.run_once()
     else:
-        worker = Worker(poller, nb_processes)
+        autoscaler = None
+        if max_processes:
+            counter = swf.actors.ActivityWorker(poller.domain, poller.task_list)
+            autoscaler = Autoscaler(
+                counter.count_pending,
+                min_children=min_processes or 1,
+                max_children=max_processes,
+            )
+        worker = Worker(poller, nb_processes, autoscaler=autoscaler)
         worker.is_alive = True
         worker.start()
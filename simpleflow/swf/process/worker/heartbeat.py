@@ -5,6 +5,7 @@ import time
 
 import swf.exceptions
 from simpleflow._decorators import deprecated
+from simpleflow.log import flush_async_logs
 from simpleflow.utils import retry
 
 logger = logging.getLogger(__name__)
@@ -37,12 +38,11 @@ class HeartbeatProcess(object):  # Are people using it?
             time.sleep(self._interval)
 
             if os.getppid() != ppid:
+                flush_async_logs()
                 os._exit(1)
 
             try:
-                logger.info('heartbeat {} for task {}'.format(
-                    time.time(),
-                    task.activity_type.name))
+                logger.info('heartbeat %s for task %s', time.time(), task.activity_type.name)
             except Exception:
                 # Do not crash for debug
                 pass
@@ -51,15 +51,11 @@ class HeartbeatProcess(object):  # Are people using it?
                 response = self.send_heartbeat(token)
             except swf.exceptions.DoesNotExistError:
                 # Either the task or the workflow execution no longer exists.
-                logger.warning(
-                    'task {} no longer exists. Stopping heartbeat'.format(
-                        task.activity_type.name))
+                logger.warning('task %s no longer exists. Stopping heartbeat', task.activity_type.name)
                 return
             except Exception as error:
                 # Let's crash if it cannot notify the heartbeat failed.
-                logger.error('cannot send heartbeat for task {}: {}'.format(
-                    task.activity_type.name,
-                    error))
+                logger.error('cannot send heartbeat for task %s: %s', task.activity_type.name, error)
                 raise
 
             if response and response.get('cancelRequested'):
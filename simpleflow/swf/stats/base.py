@@ -1,6 +1,7 @@
+from collections import defaultdict
 from itertools import chain
 
-from future.utils import iteritems
+from future.utils import iteritems, itervalues
 
 
 def get_start_to_close_timing(event):
@@ -82,3 +83,91 @@ class WorkflowStats(object):
             (vals + ((vals[timing] / total_time) * 100.,) if vals[timing] else None)
             for vals in self.get_timings()
         ]
+
+
+def percentile(values, q):
+    """
+    Returns the q-th percentile of sorted values, interpolating linearly
+    between the closest ranks.
+
+    :param values: sorted values.
+    :type values: list[float]
+    :param q: percentile, between 0 and 100.
+    :type q: float
+    :rtype: Optional[float]
+    """
+    if not values:
+        return None
+    rank = (len(values) - 1) * q / 100.
+    lower = int(rank)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (rank - lower)
+
+
+class FleetStats(object):
+    """
+    Aggregates the timings of the tasks of many executions by task name,
+    to find the ones dominating the wall time of a workflow type.
+    """
+    PERCENTILES = (50, 90, 99)
+
+    def __init__(self, histories=()):
+        self.nb_executions = 0
+        self._counts = defaultdict(int)
+        self._durations = defaultdict(list)
+        self._queue_waits = defaultdict(list)
+        self._retries = defaultdict(int)
+        for history in histories:
+            self.add(history)
+
+    def add(self, history):
+        """
+        Add the tasks of an execution.
+
+        :type history: simpleflow.history.History
+        """
+        history.parse()
+        self.nb_executions += 1
+        tasks = chain(
+            itervalues(history._activities),
+            itervalues(history._child_workflows),
+        )
+        for attributes in tasks:
+            name = attributes.get('name')
+            if name is None:
+                # e.g. schedule failures
+                continue
+            last_state, scheduled, start, end, duration = get_start_to_close_timing(attributes)
+            self._counts[name] += 1
+            if duration is not None:
+                self._durations[name].append(duration)
+            if scheduled is not None and start is not None:
+                self._queue_waits[name].append((start - scheduled).total_seconds())
+            if 'retry' in attributes:
+                # ``retry`` is 0 after the first failure; the last one isn't
+                # retried if the task is still failed or timed out.
+                self._retries[name] += attributes['retry'] + (
+                    0 if last_state in ('failed', 'timed_out') else 1)
+
+    def get_timings(self):
+        """
+        Returns the statistics of the task durations, by task name.
+
+        :returns:
+            :rtype: ``[(str, int, int, float, [float], [float])]``: name,
+            number of runs, number of retries, total time, duration
+            percentiles and queue wait (start - scheduled) percentiles.
+        """
+        timings = []
+        for name, count in iteritems(self._counts):
+            durations = sorted(self._durations[name])
+            queue_waits = sorted(self._queue_waits[name])
+            timings.append((
+                name,
+                count,
+                self._retries[name],
+                sum(durations),
+                [percentile(durations, q) for q in self.PERCENTILES],
+                [percentile(queue_waits, q) for q in self.PERCENTILES],
+            ))
+        return timings
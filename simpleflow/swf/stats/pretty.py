@@ -1,7 +1,7 @@
 import operator
 from datetime import datetime
 from functools import partial, wraps
-from itertools import chain
+from itertools import chain, islice
 
 from future.utils import iteritems
 
@@ -10,7 +10,7 @@ from simpleflow.history import History
 from simpleflow.utils import json_dumps
 from tabulate import tabulate
 
-from . import WorkflowStats
+from . import FleetStats, WorkflowStats
 
 TEMPLATE = '''
 Workflow Execution {workflow_id}
@@ -24,6 +24,9 @@ Total time = {total_time} seconds
 
 TIME_FORMAT = '%Y-%m-%d %H:%M'
 
+# Rows formatted at once by `streamed`.
+CHUNK_SIZE = 100
+
 
 def _show_tag_list(tag_list):
     return '\n'.join(
@@ -48,9 +51,9 @@ def tabular(values, headers, tablefmt, floatfmt):
 
 def csv(values, headers, delimiter=','):
     import csv
-    from io import BytesIO
+    from io import BytesIO, StringIO
 
-    data = BytesIO()
+    data = BytesIO() if compat.PY2 else StringIO()
 
     csv.writer(data, delimiter=delimiter).writerows(values)
 
@@ -173,6 +176,49 @@ def profile(workflow_execution, nb_tasks=None):
     return header, rows
 
 
+def fleet_profile(histories, nb_tasks=None):
+    """
+    Profile of the tasks of many executions, by task name, sorted by total
+    time.
+
+    :type histories: Iterable[simpleflow.history.History]
+    :type nb_tasks: Optional[int]
+    """
+    stats = FleetStats(histories)
+    timings = stats.get_timings()
+    total_time = sum(total for _, _, _, total, _, _ in timings)
+
+    header = (
+        'Task',
+        'Count',
+        'Retries',
+        'Total Time',
+        'Percentage of total time',
+        'Time Running p50',
+        'Time Running p90',
+        'Time Running p99',
+        'Time Scheduled p50',
+        'Time Scheduled p90',
+        'Time Scheduled p99',
+    )
+    rows = sorted(
+        ((name,
+          count,
+          retries,
+          total,
+          (total / total_time) * 100. if total_time else None) +
+         tuple(durations) + tuple(queue_waits)
+         for name, count, retries, total, durations, queue_waits in timings),
+        key=operator.itemgetter(3),
+        reverse=True,
+    )
+
+    if nb_tasks:
+        rows = rows[:nb_tasks]
+
+    return header, rows
+
+
 def status(workflow_execution, nb_tasks=None):
     history = History(workflow_execution.history())
     history.parse()
@@ -207,6 +253,42 @@ def formatted(with_info=False, with_header=False, fmt=DEFAULT_FORMAT):
     return formatter
 
 
+def streamed(with_header=False, fmt=DEFAULT_FORMAT, chunk_size=CHUNK_SIZE):
+    """
+    Like `formatted`, but the decorated function returns an iterator of
+    formatted chunks of `chunk_size` rows, so that rows can be printed as they
+    are computed. The header is only in the first chunk.
+
+    Only the csv and tsv formats are split: the width of tabular columns
+    depends on all the rows, and json and human can't be split, so they are
+    formatted in a single chunk.
+    """
+    if isinstance(fmt, compat.basestring):
+        fmt = FORMATS[fmt]
+
+    def formatter(func):
+        @wraps(func)
+        def wrapped(*args, **kwargs):
+            header, rows = func(*args, **kwargs)
+            headers = header if (with_header or fmt == human) else []
+            if fmt not in (FORMATS['csv'], FORMATS['tsv']):
+                yield fmt(list(rows), headers=headers)
+                return
+            rows = iter(rows)
+            chunk = list(islice(rows, chunk_size))
+            # Chunks are printed line by line: no trailing line terminator
+            yield fmt(chunk, headers=headers).rstrip('\r\n')
+            while True:
+                chunk = list(islice(rows, chunk_size))
+                if not chunk:
+                    break
+                yield fmt(chunk, headers=[]).rstrip('\r\n')
+
+        return wrapped
+
+    return formatter
+
+
 def list_executions(workflow_executions):
     header = 'Workflow ID', 'Workflow Type', 'Status'
     rows = ((
@@ -127,6 +127,7 @@ class ActivityTask(task.ActivityTask, SwfTask):
                 domain,
                 name,
                 version=version,
+                connection=getattr(domain, 'connection', None),  # don't open a new one
             )
         return cls.cached_models[key]
 
@@ -244,6 +245,7 @@ class WorkflowTask(task.WorkflowTask, SwfTask):
                 domain,
                 name,
                 version=version,
+                connection=getattr(domain, 'connection', None),  # don't open a new one
             )
         return cls.cached_models[key]
 
@@ -33,6 +33,8 @@ class Workflow(Submittable):
     task_priority = None
     retry = 0
     raises_on_failure = True
+    # Number of history events above which should_continue_as_new() is true.
+    max_history_events = None
 
     INHERIT_TAG_LIST = 'INHERIT_TAG_LIST'
 
@@ -115,6 +117,27 @@ class Workflow(Submittable):
         """
         self._executor.fail(reason, details)
 
+    def continue_as_new(self, *args, **kwargs):
+        """
+        Close the execution and start a new one, with the same workflow ID,
+        calling ``run(*args, **kwargs)``. User-called.
+
+        The history of the new execution is empty, so this caps the replay
+        cost of long-running workflows: pass the state to carry over as
+        arguments. Tasks submitted in the same decision are discarded.
+        """
+        self._executor.continue_as_new(*args, **kwargs)
+
+    def should_continue_as_new(self):
+        """
+        Whether the history reached ``max_history_events``. Long-running
+        workflows check it where their state can be carried over, e.g. at
+        the end of an iteration, then call ``continue_as_new()``.
+
+        :rtype: bool
+        """
+        return self._executor.should_continue_as_new()
+
     def before_replay(self, history):
         """
         Method called before playing the execution.
@@ -220,6 +243,30 @@ class Workflow(Submittable):
         # type: (bool) -> List[Marker]
         return self.executor.list_markers(all)
 
+    def checkpoint(self, name, state=None):
+        # type: (str, Any) -> Submittable
+        """
+        Marker recording the state reached at the end of a phase of the
+        workflow; submit it once the phase is done. In later replays,
+        ``get_checkpoint(name)`` returns this state, so the phase doesn't
+        have to be replayed: its tasks needn't be submitted again.
+
+        :param name: checkpoint name.
+        :param state: JSON-serializable state needed by the next phases.
+        """
+        return self.executor.record_checkpoint(name, state)
+
+    def get_checkpoint(self, name):
+        # type: (str) -> Optional[Marker]
+        """
+        Get a recorded checkpoint.
+
+        :param name: checkpoint name.
+        :return: the checkpoint, with the recorded state in ``details``, or
+                 None if it isn't recorded yet.
+        """
+        return self.executor.get_checkpoint(name)
+
     def get_event_details(self, event_type, event_name):
         # type: (str, str) -> Optional[dict]
         """
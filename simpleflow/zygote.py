@@ -0,0 +1,365 @@
+"""
+Zygote backend for :func:`simpleflow.execute.python`.
+
+Without it, each call to a ``python``-decorated callable starts a new
+interpreter, which imports simpleflow, its dependencies and the user module
+from scratch. For short activities, this startup dominates.
+
+A zygote is a long-lived ``interpreter -m simpleflow.zygote`` process with
+simpleflow already imported. It forks a child for each call, which inherits
+the imported modules and runs the callable with
+:func:`simpleflow.execute.run_callable`, exactly like ``python -m
+simpleflow.execute`` does. Result and error file descriptors are passed over
+a UNIX socket (SCM_RIGHTS), so the protocol of ``execute.python`` is
+unchanged. Modules containing the callables are imported once in the zygote
+itself, before forking.
+
+The zygote exits when every process holding its stdin (the process that
+started it and its forked children, e.g. the activity worker processes) is
+gone.
+
+Enable it with ``SIMPLEFLOW_EXECUTE_ZYGOTE=1`` or ``@execute.python(zygote=True)``.
+It requires Python 3 (``socket.sendmsg``); on Python 2, ``execute.python``
+falls back to starting a new interpreter.
+"""
+from __future__ import absolute_import
+
+import array
+import errno
+import json
+import logging
+import os
+import select
+import signal
+import socket
+import subprocess
+import sys
+import time
+import traceback
+
+from simpleflow import execute
+from simpleflow.exceptions import ExecutionError, ExecutionTimeoutError
+from simpleflow.log import flush_async_logs
+from simpleflow.progress import CONTEXT_KEY as PROGRESS_CONTEXT_KEY
+from simpleflow.utils import json_dumps
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['get_zygote', 'is_supported', 'Zygote']
+
+# Max number of file descriptors passed with a request:
+# connection, request, result, error and progress.
+MAX_FDS = 5
+
+MAX_FUNCNAME_LENGTH = 4096
+
+_zygotes = {}
+
+
+def is_supported():
+    return hasattr(socket.socket, 'sendmsg')
+
+
+def get_zygote(interpreter):
+    """
+    Return the zygote for *interpreter*, starting it if needed.
+
+    Zygotes are shared with forked processes: start one before forking
+    workers to let them all use it.
+
+    :type interpreter: str
+    :rtype: Zygote
+    """
+    zygote = _zygotes.get(interpreter)
+    if zygote is None or not zygote.is_alive():
+        zygote = _zygotes[interpreter] = Zygote(interpreter)
+    return zygote
+
+
+class Zygote(object):
+    """
+    Client side of a zygote process.
+    """
+
+    def __init__(self, interpreter):
+        self.interpreter = interpreter
+        control, remote = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._process = subprocess.Popen(
+            [interpreter, '-m', 'simpleflow.zygote', str(remote.fileno())],
+            stdin=subprocess.PIPE,  # lifeline: EOF when all our processes are gone
+            close_fds=True,
+            pass_fds=[remote.fileno()],
+        )
+        remote.close()
+        self._control = control
+        self._owner_pid = os.getpid()
+        self.pid = self._process.pid
+        logger.debug('started zygote pid={} interpreter={}'.format(self.pid, interpreter))
+
+    def is_alive(self):
+        if os.getpid() == self._owner_pid:
+            return self._process.poll() is None
+        # in a forked process, the zygote is not our child
+        try:
+            os.kill(self.pid, 0)
+        except OSError:
+            return False
+        return True
+
+    def run(self, funcname, arguments_json, context, logger_name, kill_children,
+            result_fd, error_fd, timeout=None):
+        """
+        Run *funcname* in a child of the zygote and wait for it.
+
+        :return: exit code of the child; negative if killed by a signal.
+        :rtype: int
+        """
+        conn, remote = socket.socketpair()
+        with conn, execute.anonymous_file('request') as request_file:
+            request_file.write(json_dumps({
+                'arguments': arguments_json,
+                'context': context,
+                'logger_name': logger_name,
+                'kill_children': kill_children,
+            }).encode('utf-8'))
+            request_file.flush()
+            request_file.seek(0)  # the offset is shared with the child
+            fds = [remote.fileno(), request_file.fileno(), result_fd, error_fd]
+            progress_fd = (context or {}).get(PROGRESS_CONTEXT_KEY)
+            if progress_fd is not None:
+                fds.append(progress_fd)
+            try:
+                self._control.sendmsg(
+                    [funcname.encode('utf-8')],
+                    [(socket.SOL_SOCKET, socket.SCM_RIGHTS, array.array('i', fds))],
+                )
+            except (OSError, socket.error) as e:
+                raise ExecutionError('cannot reach zygote pid={}: {}'.format(self.pid, e))
+            finally:
+                remote.close()
+
+            deadline = time.time() + timeout if timeout else None
+            reader = _MessageReader(conn)
+            pid = reader.read()['pid']
+            try:
+                return reader.read(deadline)['exitcode']
+            except ExecutionTimeoutError:
+                _terminate(pid)
+                raise ExecutionTimeoutError(command=[self.interpreter, funcname], timeout_value=timeout)
+
+
+def _terminate(pid):
+    """
+    Terminate a child of the zygote and its descendants: it leads their
+    process group.
+    """
+    try:
+        os.killpg(pid, signal.SIGTERM)
+    except OSError as e:
+        if e.errno != errno.ESRCH:
+            raise
+        # the child may not have created its process group yet
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except OSError as e:
+            if e.errno != errno.ESRCH:
+                raise
+
+
+class _MessageReader(object):
+    """
+    Read newline-delimited JSON messages from a zygote connection.
+    """
+
+    def __init__(self, conn):
+        self._conn = conn
+        self._buffer = b''
+
+    def read(self, deadline=None):
+        while b'\n' not in self._buffer:
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise ExecutionTimeoutError(command=None, timeout_value=None)
+            try:
+                readable, _, _ = select.select([self._conn], [], [], remaining)
+            except (OSError, select.error) as e:
+                if e.args[0] == errno.EINTR:
+                    continue
+                raise
+            if not readable:
+                continue
+            data = self._conn.recv(4096)
+            if not data:
+                raise ExecutionError('zygote connection closed unexpectedly')
+            self._buffer += data
+        line, self._buffer = self._buffer.split(b'\n', 1)
+        return json.loads(line.decode('utf-8'))
+
+
+def _send_message(conn, message):
+    try:
+        conn.sendall((json_dumps(message) + '\n').encode('utf-8'))
+    except (OSError, socket.error):
+        # the client is gone
+        pass
+
+
+def _preload(funcname):
+    """
+    Import the module of *funcname* in the zygote, so that children inherit it.
+    Errors are left to the children, which report them to the client.
+    """
+    module_name = funcname.rsplit('.', 1)[0] if '.' in funcname else None
+    if module_name is None or module_name in sys.modules:
+        return
+    try:
+        __import__(module_name, fromlist=['*'])
+    except BaseException as e:
+        logger.debug('zygote: cannot preload {}: {}'.format(module_name, e))
+
+
+def _run_child(funcname, fds, closed_fds):
+    """
+    Child side: run the callable and exit. Never returns.
+    """
+    code = 1
+    try:
+        os.setpgrp()  # let the zygote stop the whole tree if the client dies
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        signal.set_wakeup_fd(-1)
+        for fd in closed_fds:
+            os.close(fd)
+        devnull = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(devnull, 0)
+        os.close(devnull)
+
+        os.close(fds[0])  # only used by the zygote
+        with os.fdopen(fds[1], 'rb') as request_file:
+            request = json.loads(request_file.read().decode('utf-8'))
+        context = request['context']
+        if len(fds) > 4:
+            context[PROGRESS_CONTEXT_KEY] = fds[4]
+        code = execute.run_callable(
+            funcname,
+            request['arguments'],
+            context=context,
+            logger_name=request['logger_name'],
+            result_fd=fds[2],
+            error_fd=fds[3],
+            kill_children=request['kill_children'],
+        )
+    except SystemExit as e:
+        code = e.code if isinstance(e.code, int) else 1
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        try:
+            flush_async_logs()
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(code)
+
+
+def _exitcode(status):
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+def serve(control_fd):
+    """
+    Zygote side: fork a child for each request until stdin is closed.
+
+    :param control_fd: datagram socket receiving the requests.
+    :type control_fd: int
+    """
+    control = socket.fromfd(control_fd, socket.AF_UNIX, socket.SOCK_DGRAM)
+    os.close(control_fd)
+
+    # Ctrl-C is for the processes we serve; we exit with them.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    wakeup_r, wakeup_w = os.pipe()
+    for fd in (wakeup_r, wakeup_w):
+        os.set_blocking(fd, False)
+    signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+    signal.set_wakeup_fd(wakeup_w)
+
+    children = {}  # pid -> connection
+    watched = {}  # connection fd -> pid, until the child exits or the client leaves
+    stdin = sys.stdin.fileno()
+    while True:
+        try:
+            readable, _, _ = select.select([stdin, wakeup_r, control] + list(watched), [], [])
+        except (OSError, select.error) as e:
+            if e.args[0] == errno.EINTR:
+                continue
+            raise
+
+        if stdin in readable and not os.read(stdin, 4096):
+            break
+
+        if wakeup_r in readable:
+            try:
+                while os.read(wakeup_r, 4096):
+                    pass
+            except OSError as e:
+                if e.errno != errno.EAGAIN:
+                    raise
+            while children:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+                if not pid:
+                    break
+                conn = children.pop(pid, None)
+                if conn is None:
+                    continue
+                watched.pop(conn.fileno(), None)
+                _send_message(conn, {'exitcode': _exitcode(status)})
+                conn.close()
+
+        for fd in readable:
+            if fd in watched and not children[watched[fd]].recv(1):
+                # the client is gone: stop what it was waiting for
+                pid = watched.pop(fd)
+                try:
+                    os.killpg(pid, signal.SIGTERM)
+                except OSError:
+                    pass
+
+        if control in readable:
+            funcname, ancdata, _, _ = control.recvmsg(
+                MAX_FUNCNAME_LENGTH, socket.CMSG_LEN(MAX_FDS * array.array('i').itemsize))
+            fds = array.array('i')
+            for level, typ, data in ancdata:
+                if level == socket.SOL_SOCKET and typ == socket.SCM_RIGHTS:
+                    fds.frombytes(data[:len(data) - (len(data) % fds.itemsize)])
+            if len(fds) < 4:
+                for fd in fds:
+                    os.close(fd)
+                continue
+            funcname = funcname.decode('utf-8')
+            _preload(funcname)
+            sys.stdout.flush()
+            sys.stderr.flush()
+            pid = os.fork()
+            if pid == 0:
+                _run_child(funcname, list(fds), [control.fileno(), wakeup_r, wakeup_w] + list(watched))
+            for fd in fds[1:]:
+                os.close(fd)
+            conn = socket.socket(fileno=fds[0])
+            children[pid] = conn
+            watched[conn.fileno()] = pid
+            _send_message(conn, {'pid': pid})
+
+    for pid in children:
+        try:
+            os.killpg(pid, signal.SIGTERM)
+        except OSError:
+            pass
+
+
+if __name__ == '__main__':
+    serve(int(sys.argv[1]))
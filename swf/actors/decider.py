@@ -57,6 +57,36 @@ class Decider(Actor):
 
             raise ResponseError(message)
 
+    def count_pending(self, task_list=None):
+        """Returns the approximate number of decision tasks waiting
+        in the task list
+
+        :param  task_list: task list to count tasks in (defaults to the
+                           actor's one)
+        :type   task_list: str
+
+        :returns: number of pending decision tasks
+        :rtype: int
+        """
+        task_list = task_list or self.task_list
+
+        try:
+            response = self.connection.count_pending_decision_tasks(
+                self.domain.name,
+                task_list,
+            )
+        except boto.exception.SWFResponseError as e:
+            message = self.get_error_message(e)
+            if e.error_code == 'UnknownResourceFault':
+                raise DoesNotExistError(
+                    "Unable to count pending decision tasks",
+                    message,
+                )
+
+            raise ResponseError(message)
+
+        return response['count']
+
     def poll(self, task_list=None,
              identity=None,
              **kwargs):
@@ -142,6 +142,36 @@ class ActivityWorker(Actor):
 
             raise ResponseError(message)
 
+    def count_pending(self, task_list=None):
+        """Returns the approximate number of activity tasks waiting
+        in the task list
+
+        :param  task_list: task list to count tasks in (defaults to the
+                           actor's one)
+        :type   task_list: str
+
+        :returns: number of pending activity tasks
+        :rtype: int
+        """
+        task_list = task_list or self.task_list
+
+        try:
+            response = self.connection.count_pending_activity_tasks(
+                self.domain.name,
+                task_list,
+            )
+        except boto.exception.SWFResponseError as e:
+            message = self.get_error_message(e)
+            if e.error_code == 'UnknownResourceFault':
+                raise DoesNotExistError(
+                    "Unable to count pending activity tasks",
+                    message,
+                )
+
+            raise ResponseError(message)
+
+        return response['count']
+
     def poll(self, task_list=None, identity=None):
         """Polls for an activity task to process from current
         actor's instance defined ``task_list``
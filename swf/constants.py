@@ -13,3 +13,6 @@ DEPRECATED = 'DEPRECATED'
 # Hence this value is an upper limit to retrieve *all* open/closed workflow
 # executions on a given region+domain.
 MAX_WORKFLOW_AGE = 366 + 90 + 1
+
+# Maximum number of items per page of the list APIs.
+MAX_PAGE_SIZE = 1000
@@ -5,6 +5,7 @@
 #
 # See the file LICENSE for copying permission.
 import os
+import threading
 
 from boto.exception import NoAuthHandlerFound
 import boto.swf
@@ -15,13 +16,118 @@ import boto.swf
 from simpleflow import logger
 from simpleflow.utils import retry
 
-from . import settings
+from . import ratelimit, settings
 
 
 SETTINGS = settings.get()
 RETRIES = int(os.environ.get('SWF_CONNECTION_RETRIES', '5'))
 
 
+def connect(region, **creds):
+    """Connect to SWF in *region*.
+
+    The ``SWF_ENDPOINT_URL`` environment variable points the connection at an
+    emulator (see :mod:`swf.emulator`): ``memory://`` for an in-process
+    service, ``http://host:port`` for a local server.
+
+    Requests are paced by :mod:`swf.ratelimit`.
+
+    :rtype: boto.swf.layer1.Layer1
+
+    """
+    connection = _connect(region, **creds)
+    if connection is None:
+        return None
+    return ratelimit.limit(connection)
+
+
+def _connect(region, **creds):
+    endpoint_url = os.environ.get('SWF_ENDPOINT_URL')
+    if not endpoint_url:
+        return boto.swf.connect_to_region(region, **creds)
+
+    if endpoint_url.startswith('memory://'):
+        from swf import emulator
+        return emulator.Layer1(emulator.get_service())
+
+    from boto.regioninfo import RegionInfo
+    from six.moves.urllib.parse import urlparse
+    url = urlparse(endpoint_url)
+    is_secure = url.scheme == 'https'
+    return boto.swf.layer1.Layer1(
+        region=RegionInfo(name=region, endpoint=url.hostname,
+                          connection_cls=boto.swf.layer1.Layer1),
+        port=url.port or (443 if is_secure else 80),
+        is_secure=is_secure,
+        **creds
+    )
+
+
+# Connections shared by the objects of a process, by region and credentials.
+# They must not be shared with forked processes: the children would use the
+# same sockets (and SSL states) as their parent.
+_connections = {}
+_connections_lock = threading.Lock()
+_connections_pid = os.getpid()
+_CREDENTIALS_ENV_VARS = ('AWS_ACCESS_KEY_ID', 'AWS_SECRET_ACCESS_KEY', 'AWS_SECURITY_TOKEN')
+
+
+def _reset_connections():
+    global _connections, _connections_lock, _connections_pid
+
+    # NB: don't close the connections, they still belong to the parent process.
+    _connections = {}
+    _connections_lock = threading.Lock()
+    _connections_pid = os.getpid()
+
+
+if hasattr(os, 'register_at_fork'):  # Python 3.7+
+    os.register_at_fork(after_in_child=_reset_connections)
+
+
+def get_connection(region, **creds):
+    """Get the connection of the current process to SWF in *region*.
+
+    Connections are created by :func:`connect` on first use, then reused so
+    that boto keeps its HTTP connections alive. They are discarded in forked
+    processes.
+
+    :rtype: boto.swf.layer1.Layer1
+
+    """
+    endpoint_url = os.environ.get('SWF_ENDPOINT_URL')
+    if endpoint_url and endpoint_url.startswith('memory://'):
+        # The in-process service may be replaced, e.g. between tests.
+        return connect(region, **creds)
+
+    if _connections_pid != os.getpid():
+        _reset_connections()
+
+    # boto may also get the credentials from the environment.
+    key = (region, endpoint_url, tuple(sorted(creds.items()))) + tuple(
+        os.environ.get(name) for name in _CREDENTIALS_ENV_VARS)
+    with _connections_lock:
+        connection = _connections.get(key)
+        if connection is None:
+            connection = connect(region, **creds)
+            if connection is not None:
+                _connections[key] = connection
+    return connection
+
+
+def get_credentials():
+    """Credentials to pass to :func:`connect`.
+
+    Use settings-provided keys if available, otherwise an empty dictionary:
+    the boto SWF client will then use its default credentials chain provider.
+
+    :rtype: dict
+
+    """
+    cred_keys = ['aws_access_key_id', 'aws_secret_access_key']
+    return {k: SETTINGS[k] for k in cred_keys if SETTINGS.get(k, None)}
+
+
 class ConnectedSWFObject(object):
     """Authenticated object interface
 
@@ -29,13 +135,15 @@ class ConnectedSWFObject(object):
 
     :ivar region: name of the AWS region
     :type region: str
-    :ivar connection: connection to the SWF endpoint
+    :ivar connection: connection to the SWF endpoint, shared with the other
+        objects of the process unless one is passed to the constructor
     :type connection: boto.swf.layer1.Layer1
 
     """
     __slots__ = [
         'region',
-        'connection'
+        '_connection',
+        '_connection_pid',
     ]
 
     @retry.with_delay(nb_times=RETRIES,
@@ -45,14 +153,28 @@ class ConnectedSWFObject(object):
         self.region = (SETTINGS.get('region') or
                        kwargs.get('region') or
                        boto.swf.layer1.Layer1.DefaultRegionName)
-        # Use settings-provided keys if available, otherwise pass empty
-        # dictionary to boto SWF client, which will use its default credentials
-        # chain provider.
-        cred_keys = ['aws_access_key_id', 'aws_secret_access_key']
-        creds_ = {k: SETTINGS[k] for k in cred_keys if SETTINGS.get(k, None)}
-        self.connection = (kwargs.pop('connection', None) or
-                           boto.swf.connect_to_region(self.region, **creds_))
+        connection = kwargs.pop('connection', None)
+        if connection is None:
+            connection = self._get_shared_connection()
+        self.connection = connection
         if self.connection is None:
             raise ValueError('invalid region: {}'.format(self.region))
 
         logger.debug("initiated connection to region={}".format(self.region))
+
+    def _get_shared_connection(self):
+        return get_connection(self.region, **get_credentials())
+
+    @property
+    def connection(self):
+        if self._connection_pid is not None and self._connection_pid != os.getpid():
+            # Shared connection of the parent process.
+            self.connection = self._get_shared_connection()
+        return self._connection
+
+    @connection.setter
+    def connection(self, connection):
+        self._connection = connection
+        # Only shared connections are replaced in forked processes.
+        is_shared = any(connection is c for c in list(_connections.values()))
+        self._connection_pid = os.getpid() if is_shared else None
@@ -0,0 +1,1211 @@
+# -*- coding:utf-8 -*-
+"""
+In-memory stand-in for the Amazon SWF service, to run deciders and activity
+workers end to end on a single machine, e.g. to measure their throughput.
+
+:class:`Service` implements the SWF actions used by simpleflow (domains and
+types registration, workflow executions, decision and activity tasks with
+long polling, heartbeats, history pagination, signals, markers, timers, child
+workflows, cancellation, timeouts and visibility). It takes and returns the
+JSON documents of the SWF API.
+
+It can be used:
+
+- in the same process: set ``SWF_ENDPOINT_URL=memory://``, every
+  :class:`swf.core.ConnectedSWFObject` then uses a :class:`Layer1` bound to a
+  process-wide :class:`Service` (see :func:`get_service`);
+- from other processes, e.g. forked deciders and workers: run
+  ``simpleflow emulator.start --port 8080`` and set
+  ``SWF_ENDPOINT_URL=http://127.0.0.1:8080``. Boto still signs its requests,
+  so AWS credentials must be set, but any value works.
+
+Simplifications: state is lost when the service stops; retention periods,
+rate limits, lambda functions and workflow priorities are not implemented;
+missing timeouts never expire instead of failing the decisions.
+"""
+from __future__ import absolute_import
+
+import collections
+import heapq
+import itertools
+import json
+import re
+import threading
+import time
+import uuid
+
+import boto.swf.layer1
+
+from simpleflow import logger
+
+__all__ = ['Service', 'Layer1', 'get_service', 'serve']
+
+# Default long polling duration of SWF, in seconds.
+POLL_TIMEOUT = 60
+
+# Default (and maximum) page size of SWF.
+PAGE_SIZE = 1000
+
+FAULT_PREFIX = 'com.amazonaws.swf.base.model#'
+
+# Events that don't schedule a decision task.
+_SILENT_EVENTS = frozenset([
+    'DecisionTaskScheduled',
+    'DecisionTaskStarted',
+    'DecisionTaskCompleted',
+    'ActivityTaskScheduled',
+    'ActivityTaskStarted',
+    'ActivityTaskCancelRequested',
+    'MarkerRecorded',
+    'TimerStarted',
+    'TimerCanceled',
+    'StartChildWorkflowExecutionInitiated',
+    'SignalExternalWorkflowExecutionInitiated',
+    'RequestCancelExternalWorkflowExecutionInitiated',
+    'WorkflowExecutionCompleted',
+    'WorkflowExecutionFailed',
+    'WorkflowExecutionCanceled',
+    'WorkflowExecutionContinuedAsNew',
+    'WorkflowExecutionTerminated',
+    'WorkflowExecutionTimedOut',
+])
+
+# Close decisions: decision type -> (close status, failed event type)
+_CLOSE_DECISIONS = {
+    'CompleteWorkflowExecution': ('COMPLETED', 'CompleteWorkflowExecutionFailed'),
+    'FailWorkflowExecution': ('FAILED', 'FailWorkflowExecutionFailed'),
+    'CancelWorkflowExecution': ('CANCELED', 'CancelWorkflowExecutionFailed'),
+    'ContinueAsNewWorkflowExecution': ('CONTINUED_AS_NEW', 'ContinueAsNewWorkflowExecutionFailed'),
+}
+
+# Close status -> event type in the execution, event type in its parent.
+_CLOSE_EVENTS = {
+    'COMPLETED': ('WorkflowExecutionCompleted', 'ChildWorkflowExecutionCompleted'),
+    'FAILED': ('WorkflowExecutionFailed', 'ChildWorkflowExecutionFailed'),
+    'CANCELED': ('WorkflowExecutionCanceled', 'ChildWorkflowExecutionCanceled'),
+    'CONTINUED_AS_NEW': ('WorkflowExecutionContinuedAsNew', None),
+    'TERMINATED': ('WorkflowExecutionTerminated', 'ChildWorkflowExecutionTerminated'),
+    'TIMED_OUT': ('WorkflowExecutionTimedOut', 'ChildWorkflowExecutionTimedOut'),
+}
+
+
+class Fault(Exception):
+    """
+    Error returned to the client, e.g. ``Fault('UnknownResourceFault', 'Unknown domain: foo')``.
+    """
+
+    def __init__(self, name, message):
+        super(Fault, self).__init__(message)
+        self.name = name
+        self.message = message
+
+    def to_json(self):
+        return {'__type': FAULT_PREFIX + self.name, 'message': self.message}
+
+
+def _attributes_key(name, suffix):
+    return name[0].lower() + name[1:] + suffix
+
+
+def _snake_case(name):
+    return re.sub(r'(?<!^)([A-Z])', r'_\1', name).lower()
+
+
+def _timeout(value):
+    """
+    Seconds from a SWF duration; None for "NONE" or missing durations.
+    """
+    if value in (None, '', 'NONE', '0'):
+        return None
+    return int(value)
+
+
+def _in_range(timestamp, time_filter):
+    return time_filter.get('oldestDate', 0) <= timestamp <= time_filter.get('latestDate', float('inf'))
+
+
+def _page(items, params, page_size_key='maximumPageSize'):
+    """
+    Paginate *items* like SWF, with an offset as page token.
+
+    :return: page and next page token, if any.
+    :rtype: (list, Optional[str])
+    """
+    if params.get('reverseOrder'):
+        items = items[::-1]
+    page_size = min(params.get(page_size_key) or PAGE_SIZE, PAGE_SIZE)
+    offset = int(params.get('nextPageToken') or 0)
+    end = offset + page_size
+    return items[offset:end], str(end) if end < len(items) else None
+
+
+class _Type(object):
+    def __init__(self, kind, name, version, description, configuration):
+        self.kind = kind  # 'activityType' or 'workflowType'
+        self.name = name
+        self.version = version
+        self.status = 'REGISTERED'
+        self.description = description
+        self.creation_date = time.time()
+        self.deprecation_date = None
+        self.configuration = configuration
+
+    def info(self):
+        info = {
+            self.kind: {'name': self.name, 'version': self.version},
+            'status': self.status,
+            'creationDate': self.creation_date,
+        }
+        if self.description:
+            info['description'] = self.description
+        if self.deprecation_date:
+            info['deprecationDate'] = self.deprecation_date
+        return info
+
+
+class _Domain(object):
+    def __init__(self, name, retention_period, description):
+        self.name = name
+        self.status = 'REGISTERED'
+        self.retention_period = retention_period
+        self.description = description
+        self.types = {}  # (kind, name, version) -> _Type
+        self.executions = collections.OrderedDict()  # run id -> _Execution
+        self.open_executions = {}  # workflow id -> _Execution
+
+    def info(self):
+        info = {'name': self.name, 'status': self.status}
+        if self.description:
+            info['description'] = self.description
+        return info
+
+
+class _Execution(object):
+    def __init__(self, domain, workflow_id, workflow_type, configuration, input, tag_list, parent=None):
+        self.domain = domain
+        self.workflow_id = workflow_id
+        self.run_id = uuid.uuid4().hex
+        self.workflow_type = workflow_type
+        self.configuration = configuration
+        self.input = input
+        self.tag_list = tag_list or []
+        self.parent = parent  # (parent execution, initiated event id)
+        self.events = []
+        self.status = 'OPEN'
+        self.close_status = None
+        self.start_timestamp = time.time()
+        self.close_timestamp = None
+        self.cancel_requested = False
+        self.decision_scheduled = None  # event id
+        self.decision_started = None  # event id
+        self.previous_started = 0
+        self.activities = {}  # activity id -> _ActivityTask, while open
+        self.timers = {}  # timer id -> started event id, while open
+        self.children = {}  # workflow id -> (child execution, initiated event id), while open
+        self.latest_execution_context = None
+        self.latest_activity_task_timestamp = None
+
+    @property
+    def is_open(self):
+        return self.status == 'OPEN'
+
+    def reference(self):
+        return {'workflowId': self.workflow_id, 'runId': self.run_id}
+
+    def info(self):
+        info = {
+            'execution': self.reference(),
+            'workflowType': {'name': self.workflow_type.name, 'version': self.workflow_type.version},
+            'startTimestamp': self.start_timestamp,
+            'executionStatus': self.status,
+            'cancelRequested': self.cancel_requested,
+            'tagList': self.tag_list,
+        }
+        if self.close_status:
+            info['closeStatus'] = self.close_status
+            info['closeTimestamp'] = self.close_timestamp
+        if self.parent:
+            info['parent'] = self.parent[0].reference()
+        return info
+
+
+class _ActivityTask(object):
+    def __init__(self, execution, activity_id, activity_type, task_list, input, priority, timeouts, scheduled_id):
+        self.execution = execution
+        self.activity_id = activity_id
+        self.activity_type = activity_type
+        self.task_list = task_list
+        self.input = input
+        self.priority = priority
+        self.timeouts = timeouts  # timeout type -> seconds
+        self.scheduled_id = scheduled_id
+        self.started_id = None
+        self.token = None
+        self.heartbeat_deadline = None
+        self.cancel_requested = False
+
+    @property
+    def is_open(self):
+        return self.execution.is_open and self.execution.activities.get(self.activity_id) is self
+
+
+class Service(object):
+    """
+    In-memory SWF service.
+
+    All actions are serialized by a lock; long polls wait on a condition until
+    a task is available or *poll_timeout* expires.
+
+    :ivar poll_timeout: long polling duration, in seconds.
+    :type poll_timeout: float
+    """
+
+    def __init__(self, poll_timeout=POLL_TIMEOUT):
+        self.poll_timeout = poll_timeout
+        self._condition = threading.Condition(threading.RLock())
+        self._domains = {}
+        self._decision_queues = collections.defaultdict(collections.deque)  # (domain, task list) -> executions
+        self._activity_queues = collections.defaultdict(list)  # (domain, task list) -> heap of activity tasks
+        self._tokens = {}  # task token -> (execution, started event id) or _ActivityTask
+        self._timeouts = []  # heap of (deadline, sequence, callback, args)
+        self._sequence = itertools.count()
+
+    # Entry point
+
+    def handle(self, action, params):
+        """
+        Run the SWF *action*.
+
+        :param action: e.g. "PollForDecisionTask".
+        :type action: str
+        :param params: request, as sent to SWF.
+        :type params: dict
+        :return: HTTP status and response.
+        :rtype: (int, dict)
+        """
+        name = _snake_case(action)
+        method = getattr(self, name, None)
+        if not action[:1].isupper() or name == 'handle' or not callable(method):
+            return 400, Fault('UnknownOperationException', 'Unknown action: {}'.format(action)).to_json()
+        try:
+            with self._condition:
+                self._fire_timeouts()
+                response = method(params) or {}
+        except Fault as fault:
+            return 400, fault.to_json()
+        # like SWF, omit missing fields, e.g. the last page has no next page token
+        return 200, {k: v for k, v in response.items() if v is not None}
+
+    # Domains and types
+
+    def _get_domain(self, name):
+        domain = self._domains.get(name)
+        if domain is None:
+            raise Fault('UnknownResourceFault', 'Unknown domain: {}'.format(name))
+        return domain
+
+    def _get_type(self, domain, kind, name, version):
+        type_ = domain.types.get((kind, name, version))
+        if type_ is None:
+            raise Fault('UnknownResourceFault', 'Unknown type: {}=[name={}, version={}]'.format(kind, name, version))
+        return type_
+
+    def register_domain(self, params):
+        name = params['name']
+        if name in self._domains:
+            raise Fault('DomainAlreadyExistsFault', name)
+        self._domains[name] = _Domain(
+            name,
+            params.get('workflowExecutionRetentionPeriodInDays'),
+            params.get('description'),
+        )
+
+    def describe_domain(self, params):
+        domain = self._get_domain(params['name'])
+        return {
+            'domainInfo': domain.info(),
+            'configuration': {'workflowExecutionRetentionPeriodInDays': domain.retention_period},
+        }
+
+    def list_domains(self, params):
+        domains = [d.info() for d in self._domains.values() if d.status == params.get('registrationStatus')]
+        page, token = _page(sorted(domains, key=lambda d: d['name']), params)
+        return {'domainInfos': page, 'nextPageToken': token}
+
+    def deprecate_domain(self, params):
+        domain = self._get_domain(params['name'])
+        if domain.status == 'DEPRECATED':
+            raise Fault('DomainDeprecatedFault', domain.name)
+        domain.status = 'DEPRECATED'
+
+    def _register_type(self, params, kind, configuration_keys):
+        domain = self._get_domain(params['domain'])
+        key = (kind, params['name'], params['version'])
+        if key in domain.types:
+            raise Fault('TypeAlreadyExistsFault', '{}=[name={}, version={}]'.format(*key))
+        configuration = {k: params[k] for k in configuration_keys if params.get(k) is not None}
+        domain.types[key] = _Type(kind, params['name'], params['version'], params.get('description'), configuration)
+
+    def _describe_type(self, params, kind):
+        domain = self._get_domain(params['domain'])
+        type_ = self._get_type(domain, kind, params[kind]['name'], params[kind]['version'])
+        return {'typeInfo': type_.info(), 'configuration': type_.configuration}
+
+    def _list_types(self, params, kind):
+        domain = self._get_domain(params['domain'])
+        types = [
+            t.info() for (k, name, _), t in sorted(domain.types.items())
+            if k == kind and t.status == params.get('registrationStatus') and
+            params.get('name') in (None, name)
+        ]
+        page, token = _page(types, params)
+        return {'typeInfos': page, 'nextPageToken': token}
+
+    def _deprecate_type(self, params, kind):
+        domain = self._get_domain(params['domain'])
+        type_ = self._get_type(domain, kind, params[kind]['name'], params[kind]['version'])
+        if type_.status == 'DEPRECATED':
+            raise Fault('TypeDeprecatedFault', '{}=[name={}, version={}]'.format(kind, type_.name, type_.version))
+        type_.status = 'DEPRECATED'
+        type_.deprecation_date = time.time()
+
+    def register_activity_type(self, params):
+        self._register_type(params, 'activityType', (
+            'defaultTaskList',
+            'defaultTaskHeartbeatTimeout',
+            'defaultTaskScheduleToCloseTimeout',
+            'defaultTaskScheduleToStartTimeout',
+            'defaultTaskStartToCloseTimeout',
+            'defaultTaskPriority',
+        ))
+
+    def describe_activity_type(self, params):
+        return self._describe_type(params, 'activityType')
+
+    def list_activity_types(self, params):
+        return self._list_types(params, 'activityType')
+
+    def deprecate_activity_type(self, params):
+        self._deprecate_type(params, 'activityType')
+
+    def register_workflow_type(self, params):
+        self._register_type(params, 'workflowType', (
+            'defaultTaskList',
+            'defaultChildPolicy',
+            'defaultExecutionStartToCloseTimeout',
+            'defaultTaskStartToCloseTimeout',
+            'defaultTaskPriority',
+        ))
+
+    def describe_workflow_type(self, params):
+        return self._describe_type(params, 'workflowType')
+
+    def list_workflow_types(self, params):
+        return self._list_types(params, 'workflowType')
+
+    def deprecate_workflow_type(self, params):
+        self._deprecate_type(params, 'workflowType')
+
+    # Workflow executions
+
+    def _get_execution(self, domain, workflow_id, run_id=None):
+        if run_id:
+            execution = domain.executions.get(run_id)
+            if execution is not None and execution.workflow_id == workflow_id:
+                return execution
+        else:
+            execution = domain.open_executions.get(workflow_id)
+            if execution is not None:
+                return execution
+        raise Fault('UnknownResourceFault', 'Unknown execution: WorkflowExecution=[workflowId={}, runId={}]'.format(
+            workflow_id, run_id))
+
+    def _start_execution(self, domain, params, parent=None):
+        """
+        Start an execution from StartWorkflowExecution-like *params*.
+
+        :raise Fault: the type is unknown or deprecated, or the workflow is running.
+        :rtype: _Execution
+        """
+        workflow_type = self._get_type(domain, 'workflowType', params['workflowType']['name'],
+                                       params['workflowType']['version'])
+        if workflow_type.status == 'DEPRECATED':
+            raise Fault('TypeDeprecatedFault', workflow_type.name)
+        if params['workflowId'] in domain.open_executions:
+            raise Fault('WorkflowExecutionAlreadyStartedFault', params['workflowId'])
+
+        defaults = workflow_type.configuration
+        configuration = {
+            'taskList': params.get('taskList') or defaults.get('defaultTaskList'),
+            'childPolicy': params.get('childPolicy') or defaults.get('defaultChildPolicy') or 'TERMINATE',
+            'executionStartToCloseTimeout': (params.get('executionStartToCloseTimeout') or
+                                             defaults.get('defaultExecutionStartToCloseTimeout')),
+            'taskStartToCloseTimeout': (params.get('taskStartToCloseTimeout') or
+                                        defaults.get('defaultTaskStartToCloseTimeout')),
+        }
+        if not configuration['taskList']:
+            raise Fault('DefaultUndefinedFault', 'No task list for {}'.format(params['workflowId']))
+
+        execution = _Execution(domain, params['workflowId'], workflow_type, configuration,
+                               params.get('input'), params.get('tagList'), parent)
+        domain.executions[execution.run_id] = execution
+        domain.open_executions[execution.workflow_id] = execution
+
+        attributes = dict(configuration, workflowType=params['workflowType'], tagList=execution.tag_list)
+        if execution.input is not None:
+            attributes['input'] = execution.input
+        if parent:
+            attributes['parentWorkflowExecution'] = parent[0].reference()
+            attributes['parentInitiatedEventId'] = parent[1]
+        if params.get('continuedExecutionRunId'):
+            attributes['continuedExecutionRunId'] = params['continuedExecutionRunId']
+        self._add_event(execution, 'WorkflowExecutionStarted', attributes)
+
+        timeout = _timeout(configuration['executionStartToCloseTimeout'])
+        if timeout:
+            self._add_timeout(timeout, self._execution_timed_out, execution)
+        return execution
+
+    def start_workflow_execution(self, params):
+        domain = self._get_domain(params['domain'])
+        return {'runId': self._start_execution(domain, params).run_id}
+
+    def describe_workflow_execution(self, params):
+        domain = self._get_domain(params['domain'])
+        execution = self._get_execution(domain, params['execution']['workflowId'], params['execution']['runId'])
+        response = {
+            'executionInfo': execution.info(),
+            'executionConfiguration': execution.configuration,
+            'openCounts': {
+                'openActivityTasks': len(execution.activities),
+                'openDecisionTasks': int(execution.decision_scheduled is not None or
+                                         execution.decision_started is not None),
+                'openTimers': len(execution.timers),
+                'openChildWorkflowExecutions': len(execution.children),
+                'openLambdaFunctions': 0,
+            },
+        }
+        if execution.latest_execution_context is not None:
+            response['latestExecutionContext'] = execution.latest_execution_context
+        if execution.latest_activity_task_timestamp is not None:
+            response['latestActivityTaskTimestamp'] = execution.latest_activity_task_timestamp
+        return response
+
+    def get_workflow_execution_history(self, params):
+        domain = self._get_domain(params['domain'])
+        execution = self._get_execution(domain, params['execution']['workflowId'], params['execution']['runId'])
+        page, token = _page(execution.events, params)
+        return {'events': page, 'nextPageToken': token}
+
+    def _filter_executions(self, params, status):
+        domain = self._get_domain(params['domain'])
+        start_filter = params.get('startTimeFilter') or {}
+        close_filter = params.get('closeTimeFilter') or {}
+        workflow_id = (params.get('executionFilter') or {}).get('workflowId')
+        type_filter = params.get('typeFilter') or {}
+        tag = (params.get('tagFilter') or {}).get('tag')
+        close_status = (params.get('closeStatusFilter') or {}).get('status')
+
+        def match(e):
+            return (
+                e.status == status and
+                _in_range(e.start_timestamp, start_filter) and
+                (not close_filter or _in_range(e.close_timestamp, close_filter)) and
+                workflow_id in (None, e.workflow_id) and
+                type_filter.get('name') in (None, e.workflow_type.name) and
+                type_filter.get('version') in (None, e.workflow_type.version) and
+                (tag is None or tag in e.tag_list) and
+                close_status in (None, e.close_status)
+            )
+
+        # most recent first, like SWF
+        return [e.info() for e in reversed(list(domain.executions.values())) if match(e)]
+
+    def list_open_workflow_executions(self, params):
+        page, token = _page(self._filter_executions(params, 'OPEN'), params)
+        return {'executionInfos': page, 'nextPageToken': token}
+
+    def list_closed_workflow_executions(self, params):
+        page, token = _page(self._filter_executions(params, 'CLOSED'), params)
+        return {'executionInfos': page, 'nextPageToken': token}
+
+    def count_open_workflow_executions(self, params):
+        return {'count': len(self._filter_executions(params, 'OPEN')), 'truncated': False}
+
+    def count_closed_workflow_executions(self, params):
+        return {'count': len(self._filter_executions(params, 'CLOSED')), 'truncated': False}
+
+    def signal_workflow_execution(self, params):
+        domain = self._get_domain(params['domain'])
+        execution = self._get_execution(domain, params['workflowId'], params.get('runId'))
+        if not execution.is_open:
+            raise Fault('UnknownResourceFault', 'Execution is closed: {}'.format(execution.workflow_id))
+        self._add_event(execution, 'WorkflowExecutionSignaled', {
+            'signalName': params['signalName'],
+            'input': params.get('input'),
+            'externalInitiatedEventId': 0,
+        })
+
+    def request_cancel_workflow_execution(self, params):
+        domain = self._get_domain(params['domain'])
+        execution = self._get_execution(domain, params['workflowId'], params.get('runId'))
+        if not execution.is_open:
+            raise Fault('UnknownResourceFault', 'Execution is closed: {}'.format(execution.workflow_id))
+        self._request_cancel(execution)
+
+    def terminate_workflow_execution(self, params):
+        domain = self._get_domain(params['domain'])
+        execution = self._get_execution(domain, params['workflowId'], params.get('runId'))
+        if not execution.is_open:
+            raise Fault('UnknownResourceFault', 'Execution is closed: {}'.format(execution.workflow_id))
+        self._close(execution, 'TERMINATED', {
+            'reason': params.get('reason'),
+            'details': params.get('details'),
+            'childPolicy': params.get('childPolicy') or execution.configuration['childPolicy'],
+        })
+
+    def _request_cancel(self, execution, external=None):
+        execution.cancel_requested = True
+        attributes = {'externalInitiatedEventId': 0}
+        if external:
+            attributes['externalWorkflowExecution'] = external[0].reference()
+            attributes['externalInitiatedEventId'] = external[1]
+        self._add_event(execution, 'WorkflowExecutionCancelRequested', attributes)
+
+    # Events, timeouts and closing
+
+    def _add_event(self, execution, event_type, attributes):
+        """
+        Append an event to the history of *execution* and schedule a
+        decision task if the decider must handle it.
+
+        :return: event id.
+        :rtype: int
+        """
+        event_id = len(execution.events) + 1
+        execution.events.append({
+            'eventId': event_id,
+            'eventType': event_type,
+            'eventTimestamp': time.time(),
+            _attributes_key(event_type, 'EventAttributes'): {
+                k: v for k, v in attributes.items() if v is not None
+            },
+        })
+        if event_type not in _SILENT_EVENTS:
+            self._schedule_decision(execution)
+        return event_id
+
+    def _schedule_decision(self, execution):
+        if not execution.is_open or execution.decision_scheduled is not None:
+            return
+        execution.decision_scheduled = self._add_event(execution, 'DecisionTaskScheduled', {
+            'taskList': execution.configuration['taskList'],
+            'startToCloseTimeout': execution.configuration['taskStartToCloseTimeout'],
+        })
+        if execution.decision_started is None:
+            self._enqueue_decision(execution)
+
+    def _enqueue_decision(self, execution):
+        self._decision_queues[(execution.domain.name, execution.configuration['taskList']['name'])].append(execution)
+        self._condition.notify_all()
+
+    def _add_timeout(self, delay, callback, *args):
+        heapq.heappush(self._timeouts, (time.time() + delay, next(self._sequence), callback, args))
+        self._condition.notify_all()
+
+    def _fire_timeouts(self):
+        now = time.time()
+        while self._timeouts and self._timeouts[0][0] <= now:
+            _, _, callback, args = heapq.heappop(self._timeouts)
+            callback(*args)
+
+    def _next_timeout_delay(self):
+        if not self._timeouts:
+            return None
+        return max(self._timeouts[0][0] - time.time(), 0)
+
+    def _execution_timed_out(self, execution):
+        if execution.is_open:
+            self._close(execution, 'TIMED_OUT', {
+                'timeoutType': 'START_TO_CLOSE',
+                'childPolicy': execution.configuration['childPolicy'],
+            })
+
+    def _close(self, execution, close_status, attributes, decision_id=None):
+        """
+        Close *execution*, apply its child policy and notify its parent.
+        """
+        event_type, parent_event_type = _CLOSE_EVENTS[close_status]
+        if decision_id is not None:
+            attributes['decisionTaskCompletedEventId'] = decision_id
+        self._add_event(execution, event_type, attributes)
+        execution.status = 'CLOSED'
+        execution.close_status = close_status
+        execution.close_timestamp = time.time()
+        execution.decision_scheduled = execution.decision_started = None
+        if execution.domain.open_executions.get(execution.workflow_id) is execution:
+            del execution.domain.open_executions[execution.workflow_id]
+        execution.activities.clear()
+        execution.timers.clear()
+
+        child_policy = attributes.get('childPolicy') or execution.configuration['childPolicy']
+        for child, _ in list(execution.children.values()):
+            if not child.is_open:
+                continue
+            if child_policy == 'TERMINATE':
+                self._close(child, 'TERMINATED', {'childPolicy': child.configuration['childPolicy'],
+                                                  'cause': 'CHILD_POLICY_APPLIED'})
+            elif child_policy == 'REQUEST_CANCEL':
+                self._request_cancel(child)
+        execution.children.clear()
+
+        if execution.parent and parent_event_type:
+            parent, initiated_id = execution.parent
+            entry = parent.children.pop(execution.workflow_id, None)
+            if parent.is_open and entry is not None:
+                parent_attributes = {
+                    'workflowExecution': execution.reference(),
+                    'workflowType': {'name': execution.workflow_type.name,
+                                     'version': execution.workflow_type.version},
+                    'initiatedEventId': initiated_id,
+                    'startedEventId': entry[1],
+                }
+                for key in ('result', 'reason', 'details', 'timeoutType'):
+                    if key in attributes:
+                        parent_attributes[key] = attributes[key]
+                self._add_event(parent, parent_event_type, parent_attributes)
+
+    # Decision tasks
+
+    def _pop_decision(self, domain, task_list):
+        queue = self._decision_queues.get((domain, task_list))
+        while queue:
+            execution = queue.popleft()
+            if (execution.is_open and execution.decision_scheduled is not None and
+                    execution.decision_started is None):
+                return execution
+        return None
+
+    def _wait(self, deadline):
+        """
+        Wait for a change until *deadline*.
+
+        :return: False if the deadline is reached.
+        :rtype: bool
+        """
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            return False
+        delay = self._next_timeout_delay()
+        self._condition.wait(remaining if delay is None else min(remaining, delay))
+        self._fire_timeouts()
+        return True
+
+    def _decision_page(self, token, params):
+        execution, started_id = self._tokens[token]
+        page, next_token = _page(execution.events[:started_id], params)
+        return {
+            'taskToken': token,
+            'startedEventId': started_id,
+            'previousStartedEventId': execution.previous_started,
+            'workflowExecution': execution.reference(),
+            'workflowType': {'name': execution.workflow_type.name, 'version': execution.workflow_type.version},
+            'events': page,
+            'nextPageToken': token + ':' + next_token if next_token else None,
+        }
+
+    def poll_for_decision_task(self, params):
+        if params.get('nextPageToken'):
+            token, offset = params['nextPageToken'].rsplit(':', 1)
+            if token not in self._tokens:
+                raise Fault('UnknownResourceFault', 'Unknown page token')
+            return self._decision_page(token, dict(params, nextPageToken=offset))
+
+        domain = self._get_domain(params['domain']).name
+        deadline = time.time() + self.poll_timeout
+        execution = self._pop_decision(domain, params['taskList']['name'])
+        while execution is None:
+            if not self._wait(deadline):
+                return {'startedEventId': 0, 'previousStartedEventId': 0}
+            execution = self._pop_decision(domain, params['taskList']['name'])
+
+        scheduled_id = execution.decision_scheduled
+        execution.decision_scheduled = None
+        started_id = execution.decision_started = self._add_event(execution, 'DecisionTaskStarted', {
+            'scheduledEventId': scheduled_id,
+            'identity': params.get('identity'),
+        })
+        token = uuid.uuid4().hex
+        self._tokens[token] = (execution, started_id)
+        timeout = _timeout(execution.configuration['taskStartToCloseTimeout'])
+        if timeout:
+            self._add_timeout(timeout, self._decision_timed_out, execution, started_id, scheduled_id)
+        return self._decision_page(token, params)
+
+    def _decision_timed_out(self, execution, started_id, scheduled_id):
+        if execution.decision_started != started_id:
+            return
+        execution.decision_started = None
+        self._add_event(execution, 'DecisionTaskTimedOut', {
+            'scheduledEventId': scheduled_id,
+            'startedEventId': started_id,
+            'timeoutType': 'START_TO_CLOSE',
+        })
+        if execution.decision_scheduled is not None:
+            self._enqueue_decision(execution)
+
+    def count_pending_decision_tasks(self, params):
+        queue = self._decision_queues.get((params['domain'], params['taskList']['name']), ())
+        return {'count': sum(1 for e in queue if e.is_open and e.decision_started is None), 'truncated': False}
+
+    def respond_decision_task_completed(self, params):
+        token = params['taskToken']
+        execution, started_id = self._tokens.pop(token, (None, None))
+        if execution is None or not execution.is_open or execution.decision_started != started_id:
+            raise Fault('UnknownResourceFault', 'Unknown decision task, token={}'.format(token))
+
+        scheduled_id = execution.events[started_id - 1]['decisionTaskStartedEventAttributes']['scheduledEventId']
+        decision_id = self._add_event(execution, 'DecisionTaskCompleted', {
+            'scheduledEventId': scheduled_id,
+            'startedEventId': started_id,
+            'executionContext': params.get('executionContext'),
+        })
+        execution.decision_started = None
+        execution.previous_started = started_id
+        if params.get('executionContext') is not None:
+            execution.latest_execution_context = params['executionContext']
+
+        for decision in params.get('decisions') or []:
+            if not execution.is_open:
+                break
+            decision_type = decision['decisionType']
+            attributes = decision.get(_attributes_key(decision_type, 'DecisionAttributes'), {})
+            if decision_type in _CLOSE_DECISIONS:
+                self._close_decision(execution, decision_type, attributes, decision_id)
+                continue
+            handler = getattr(self, '_decide_' + _snake_case(decision_type), None)
+            if handler is None:
+                raise Fault('ValidationException', 'Unsupported decision: {}'.format(decision_type))
+            handler(execution, attributes, decision_id)
+
+        if execution.is_open and execution.decision_scheduled is not None:
+            self._enqueue_decision(execution)
+
+    def _close_decision(self, execution, decision_type, attributes, decision_id):
+        close_status, failed_event_type = _CLOSE_DECISIONS[decision_type]
+        if execution.decision_scheduled is not None:
+            # new events arrived while deciding: the decider must see them first
+            self._add_event(execution, failed_event_type, {
+                'cause': 'UNHANDLED_DECISION',
+                'decisionTaskCompletedEventId': decision_id,
+            })
+            return
+        if close_status != 'CONTINUED_AS_NEW':
+            self._close(execution, close_status, dict(attributes), decision_id)
+            return
+
+        params = {
+            'workflowId': execution.workflow_id,
+            'workflowType': {
+                'name': execution.workflow_type.name,
+                'version': attributes.get('workflowTypeVersion') or execution.workflow_type.version,
+            },
+            'taskList': attributes.get('taskList') or execution.configuration['taskList'],
+            'childPolicy': attributes.get('childPolicy') or execution.configuration['childPolicy'],
+            'executionStartToCloseTimeout': (attributes.get('executionStartToCloseTimeout') or
+                                             execution.configuration['executionStartToCloseTimeout']),
+            'taskStartToCloseTimeout': (attributes.get('taskStartToCloseTimeout') or
+                                        execution.configuration['taskStartToCloseTimeout']),
+            'input': attributes.get('input'),
+            'tagList': attributes.get('tagList'),
+            'continuedExecutionRunId': execution.run_id,
+        }
+        parent = execution.parent
+        # the new run takes over the workflow id and the parent
+        del execution.domain.open_executions[execution.workflow_id]
+        execution.parent = None
+        try:
+            new_execution = self._start_execution(execution.domain, params, parent)
+        except Fault as fault:
+            execution.domain.open_executions[execution.workflow_id] = execution
+            execution.parent = parent
+            self._add_event(execution, failed_event_type, {
+                'cause': ('WORKFLOW_TYPE_DOES_NOT_EXIST' if fault.name == 'UnknownResourceFault'
+                          else 'OPERATION_NOT_PERMITTED'),
+                'decisionTaskCompletedEventId': decision_id,
+            })
+            return
+        if parent and execution.workflow_id in parent[0].children:
+            started_id = parent[0].children[execution.workflow_id][1]
+            parent[0].children[execution.workflow_id] = (new_execution, started_id)
+        attributes = {k: v for k, v in params.items() if k not in ('workflowId', 'continuedExecutionRunId')}
+        attributes['newExecutionRunId'] = new_execution.run_id
+        self._close(execution, 'CONTINUED_AS_NEW', attributes, decision_id)
+
+    def _decide_schedule_activity_task(self, execution, attributes, decision_id):
+        activity_type = attributes['activityType']
+        activity_id = attributes['activityId']
+        try:
+            type_ = self._get_type(execution.domain, 'activityType', activity_type['name'], activity_type['version'])
+        except Fault:
+            type_ = None
+        cause = None
+        if type_ is None:
+            cause = 'ACTIVITY_TYPE_DOES_NOT_EXIST'
+        elif type_.status == 'DEPRECATED':
+            cause = 'ACTIVITY_TYPE_DEPRECATED'
+        elif activity_id in execution.activities:
+            cause = 'ACTIVITY_ID_ALREADY_IN_USE'
+        if cause:
+            self._add_event(execution, 'ScheduleActivityTaskFailed', {
+                'activityType': activity_type,
+                'activityId': activity_id,
+                'cause': cause,
+                'decisionTaskCompletedEventId': decision_id,
+            })
+            return
+
+        defaults = type_.configuration
+        task_list = attributes.get('taskList') or defaults.get('defaultTaskList')
+        timeouts = {}
+        event_attributes = {
+            'activityType': activity_type,
+            'activityId': activity_id,
+            'input': attributes.get('input'),
+            'control': attributes.get('control'),
+            'taskList': task_list,
+            'taskPriority': attributes.get('taskPriority') or defaults.get('defaultTaskPriority'),
+            'decisionTaskCompletedEventId': decision_id,
+        }
+        for timeout_type, key in (
+                ('SCHEDULE_TO_CLOSE', 'scheduleToCloseTimeout'),
+                ('SCHEDULE_TO_START', 'scheduleToStartTimeout'),
+                ('START_TO_CLOSE', 'startToCloseTimeout'),
+                ('HEARTBEAT', 'heartbeatTimeout')):
+            value = attributes.get(key) or defaults.get('defaultTask' + key[0].upper() + key[1:])
+            event_attributes[key] = value
+            timeouts[timeout_type] = _timeout(value)
+
+        scheduled_id = self._add_event(execution, 'ActivityTaskScheduled', event_attributes)
+        task = _ActivityTask(execution, activity_id, activity_type, task_list['name'], attributes.get('input'),
+                             int(event_attributes['taskPriority'] or 0), timeouts, scheduled_id)
+        execution.activities[activity_id] = task
+        heapq.heappush(self._activity_queues[(execution.domain.name, task.task_list)],
+                       (-task.priority, next(self._sequence), task))
+        self._condition.notify_all()
+        for timeout_type in ('SCHEDULE_TO_START', 'SCHEDULE_TO_CLOSE'):
+            if timeouts[timeout_type]:
+                self._add_timeout(timeouts[timeout_type], self._activity_timed_out, task, timeout_type)
+
+    def _decide_request_cancel_activity_task(self, execution, attributes, decision_id):
+        task = execution.activities.get(attributes['activityId'])
+        if task is None:
+            self._add_event(execution, 'RequestCancelActivityTaskFailed', {
+                'activityId': attributes['activityId'],
+                'cause': 'ACTIVITY_ID_UNKNOWN',
+                'decisionTaskCompletedEventId': decision_id,
+            })
+            return
+        cancel_id = self._add_event(execution, 'ActivityTaskCancelRequested', {
+            'activityId': task.activity_id,
+            'decisionTaskCompletedEventId': decision_id,
+        })
+        task.cancel_requested = True
+        if task.started_id is None:
+            # not started yet: canceled right away
+            self._close_activity(task, 'ActivityTaskCanceled', {'latestCancelRequestedEventId': cancel_id})
+
+    def _decide_record_marker(self, execution, attributes, decision_id):
+        self._add_event(execution, 'MarkerRecorded', dict(attributes, decisionTaskCompletedEventId=decision_id))
+
+    def _decide_start_timer(self, execution, attributes, decision_id):
+        timer_id = attributes['timerId']
+        if timer_id in execution.timers:
+            self._add_event(execution, 'StartTimerFailed', {
+                'timerId': timer_id,
+                'cause': 'TIMER_ID_ALREADY_IN_USE',
+                'decisionTaskCompletedEventId': decision_id,
+            })
+            return
+        started_id = self._add_event(execution, 'TimerStarted', dict(
+            attributes, decisionTaskCompletedEventId=decision_id))
+        execution.timers[timer_id] = started_id
+        self._add_timeout(int(attributes['startToFireTimeout']), self._timer_fired, execution, timer_id, started_id)
+
+    def _timer_fired(self, execution, timer_id, started_id):
+        if execution.is_open and execution.timers.get(timer_id) == started_id:
+            del execution.timers[timer_id]
+            self._add_event(execution, 'TimerFired', {'timerId': timer_id, 'startedEventId': started_id})
+
+    def _decide_cancel_timer(self, execution, attributes, decision_id):
+        timer_id = attributes['timerId']
+        started_id = execution.timers.pop(timer_id, None)
+        if started_id is None:
+            self._add_event(execution, 'CancelTimerFailed', {
+                'timerId': timer_id,
+                'cause': 'TIMER_ID_UNKNOWN',
+                'decisionTaskCompletedEventId': decision_id,
+            })
+            return
+        self._add_event(execution, 'TimerCanceled', {
+            'timerId': timer_id,
+            'startedEventId': started_id,
+            'decisionTaskCompletedEventId': decision_id,
+        })
+
+    def _decide_start_child_workflow_execution(self, execution, attributes, decision_id):
+        initiated_id = self._add_event(execution, 'StartChildWorkflowExecutionInitiated', dict(
+            attributes, decisionTaskCompletedEventId=decision_id))
+        try:
+            child = self._start_execution(execution.domain, attributes, parent=(execution, initiated_id))
+        except Fault as fault:
+            causes = {
+                'UnknownResourceFault': 'WORKFLOW_TYPE_DOES_NOT_EXIST',
+                'TypeDeprecatedFault': 'WORKFLOW_TYPE_DEPRECATED',
+                'WorkflowExecutionAlreadyStartedFault': 'WORKFLOW_ALREADY_RUNNING',
+                'DefaultUndefinedFault': 'DEFAULT_TASK_LIST_UNDEFINED',
+            }
+            self._add_event(execution, 'StartChildWorkflowExecutionFailed', {
+                'workflowType': attributes['workflowType'],
+                'workflowId': attributes['workflowId'],
+                'cause': causes.get(fault.name, 'OPERATION_NOT_PERMITTED'),
+                'initiatedEventId': initiated_id,
+                'decisionTaskCompletedEventId': decision_id,
+                'control': attributes.get('control'),
+            })
+            return
+        started_id = self._add_event(execution, 'ChildWorkflowExecutionStarted', {
+            'workflowExecution': child.reference(),
+            'workflowType': attributes['workflowType'],
+            'initiatedEventId': initiated_id,
+        })
+        execution.children[child.workflow_id] = (child, started_id)
+
+    def _find_external(self, execution, attributes):
+        try:
+            target = self._get_execution(execution.domain, attributes['workflowId'], attributes.get('runId'))
+        except Fault:
+            return None
+        return target if target.is_open else None
+
+    def _decide_signal_external_workflow_execution(self, execution, attributes, decision_id):
+        initiated_id = self._add_event(execution, 'SignalExternalWorkflowExecutionInitiated', dict(
+            attributes, decisionTaskCompletedEventId=decision_id))
+        target = self._find_external(execution, attributes)
+        if target is None:
+            self._add_event(execution, 'SignalExternalWorkflowExecutionFailed', {
+                'workflowId': attributes['workflowId'],
+                'runId': attributes.get('runId'),
+                'cause': 'UNKNOWN_EXTERNAL_WORKFLOW_EXECUTION',
+                'initiatedEventId': initiated_id,
+                'decisionTaskCompletedEventId': decision_id,
+                'control': attributes.get('control'),
+            })
+            return
+        self._add_event(target, 'WorkflowExecutionSignaled', {
+            'signalName': attributes['signalName'],
+            'input': attributes.get('input'),
+            'externalWorkflowExecution': execution.reference(),
+            'externalInitiatedEventId': initiated_id,
+        })
+        self._add_event(execution, 'ExternalWorkflowExecutionSignaled', {
+            'workflowExecution': target.reference(),
+            'initiatedEventId': initiated_id,
+        })
+
+    def _decide_request_cancel_external_workflow_execution(self, execution, attributes, decision_id):
+        initiated_id = self._add_event(execution, 'RequestCancelExternalWorkflowExecutionInitiated', dict(
+            attributes, decisionTaskCompletedEventId=decision_id))
+        target = self._find_external(execution, attributes)
+        if target is None:
+            self._add_event(execution, 'RequestCancelExternalWorkflowExecutionFailed', {
+                'workflowId': attributes['workflowId'],
+                'runId': attributes.get('runId'),
+                'cause': 'UNKNOWN_EXTERNAL_WORKFLOW_EXECUTION',
+                'initiatedEventId': initiated_id,
+                'decisionTaskCompletedEventId': decision_id,
+                'control': attributes.get('control'),
+            })
+            return
+        self._request_cancel(target, external=(execution, initiated_id))
+        self._add_event(execution, 'ExternalWorkflowExecutionCancelRequested', {
+            'workflowExecution': target.reference(),
+            'initiatedEventId': initiated_id,
+        })
+
+    # Activity tasks
+
+    def _pop_activity(self, domain, task_list):
+        heap = self._activity_queues.get((domain, task_list))
+        while heap:
+            task = heapq.heappop(heap)[-1]
+            if task.is_open and task.started_id is None:
+                return task
+        return None
+
+    def poll_for_activity_task(self, params):
+        domain = self._get_domain(params['domain']).name
+        deadline = time.time() + self.poll_timeout
+        task = self._pop_activity(domain, params['taskList']['name'])
+        while task is None:
+            if not self._wait(deadline):
+                return {'startedEventId': 0}
+            task = self._pop_activity(domain, params['taskList']['name'])
+
+        execution = task.execution
+        task.started_id = self._add_event(execution, 'ActivityTaskStarted', {
+            'scheduledEventId': task.scheduled_id,
+            'identity': params.get('identity'),
+        })
+        execution.latest_activity_task_timestamp = time.time()
+        task.token = uuid.uuid4().hex
+        self._tokens[task.token] = task
+        if task.timeouts['START_TO_CLOSE']:
+            self._add_timeout(task.timeouts['START_TO_CLOSE'], self._activity_timed_out, task, 'START_TO_CLOSE')
+        if task.timeouts['HEARTBEAT']:
+            task.heartbeat_deadline = time.time() + task.timeouts['HEARTBEAT']
+            self._add_timeout(task.timeouts['HEARTBEAT'], self._activity_timed_out, task, 'HEARTBEAT')
+        response = {
+            'taskToken': task.token,
+            'activityId': task.activity_id,
+            'startedEventId': task.started_id,
+            'workflowExecution': execution.reference(),
+            'activityType': task.activity_type,
+        }
+        if task.input is not None:
+            response['input'] = task.input
+        return response
+
+    def count_pending_activity_tasks(self, params):
+        heap = self._activity_queues.get((params['domain'], params['taskList']['name']), ())
+        return {'count': sum(1 for entry in heap if entry[-1].is_open and entry[-1].started_id is None),
+                'truncated': False}
+
+    def _get_activity(self, token):
+        task = self._tokens.get(token)
+        if not isinstance(task, _ActivityTask) or not task.is_open:
+            raise Fault('UnknownResourceFault', 'Unknown activity task, token={}'.format(token))
+        return task
+
+    def _close_activity(self, task, event_type, attributes):
+        del task.execution.activities[task.activity_id]
+        self._tokens.pop(task.token, None)
+        attributes = dict(attributes, scheduledEventId=task.scheduled_id)
+        if task.started_id is not None:
+            attributes['startedEventId'] = task.started_id
+        self._add_event(task.execution, event_type, attributes)
+
+    def _activity_timed_out(self, task, timeout_type):
+        if not task.is_open:
+            return
+        if timeout_type == 'SCHEDULE_TO_START' and task.started_id is not None:
+            return
+        if timeout_type == 'HEARTBEAT' and task.heartbeat_deadline > time.time():
+            heapq.heappush(self._timeouts, (task.heartbeat_deadline, next(self._sequence),
+                                            self._activity_timed_out, (task, timeout_type)))
+            return
+        self._close_activity(task, 'ActivityTaskTimedOut', {'timeoutType': timeout_type})
+
+    def respond_activity_task_completed(self, params):
+        task = self._get_activity(params['taskToken'])
+        self._close_activity(task, 'ActivityTaskCompleted', {'result': params.get('result')})
+
+    def respond_activity_task_failed(self, params):
+        task = self._get_activity(params['taskToken'])
+        self._close_activity(task, 'ActivityTaskFailed', {
+            'reason': params.get('reason'),
+            'details': params.get('details'),
+        })
+
+    def respond_activity_task_canceled(self, params):
+        task = self._get_activity(params['taskToken'])
+        self._close_activity(task, 'ActivityTaskCanceled', {'details': params.get('details')})
+
+    def record_activity_task_heartbeat(self, params):
+        task = self._get_activity(params['taskToken'])
+        if task.timeouts['HEARTBEAT']:
+            task.heartbeat_deadline = time.time() + task.timeouts['HEARTBEAT']
+        return {'cancelRequested': task.cancel_requested}
+
+
+class Layer1(boto.swf.layer1.Layer1):
+    """
+    Boto connection to an in-process :class:`Service`: requests are encoded
+    and decoded in JSON like with SWF, but no HTTP request is made.
+    """
+
+    def __init__(self, service):
+        # Don't call the parent constructor: no credentials nor HTTP connection.
+        self.service = service
+
+    def make_request(self, action, body='', object_hook=None):
+        status, response = self.service.handle(action, json.loads(body))
+        if status == 200:
+            return json.loads(json.dumps(response), object_hook=object_hook)
+        fault_name = response.get('__type')
+        excp_cls = self._fault_excp.get(fault_name, self.ResponseError)
+        raise excp_cls(status, 'Bad Request', body=response)
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_service():
+    """
+    Process-wide service used with ``SWF_ENDPOINT_URL=memory://``.
+
+    :rtype: Service
+    """
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = Service()
+        return _service
+
+
+def serve(host='127.0.0.1', port=8080, service=None, domains=()):
+    """
+    Serve the SWF JSON API over HTTP until interrupted.
+
+    :param domains: names of domains to register.
+    :type domains: Iterable[str]
+    """
+    try:
+        from http.server import BaseHTTPRequestHandler, HTTPServer
+        from socketserver import ThreadingMixIn
+    except ImportError:  # Python 2
+        from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+        from SocketServer import ThreadingMixIn
+
+    service = service or Service()
+    for name in domains:
+        service.handle('RegisterDomain', {'name': name, 'workflowExecutionRetentionPeriodInDays': '1'})
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self):
+            action = self.headers.get('X-Amz-Target', '').rsplit('.', 1)[-1]
+            body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+            status, response = service.handle(action, json.loads(body.decode('utf-8') or '{}'))
+            data = json.dumps(response).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/x-amz-json-1.0')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            logger.debug('emulator: ' + format % args)
+
+    class Server(ThreadingMixIn, HTTPServer):
+        daemon_threads = True
+
+    server = Server((host, port), Handler)
+    logger.info('SWF emulator listening on http://{}:{}'.format(*server.server_address[:2]))
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+    return server
@@ -62,7 +62,8 @@ class WorkflowExecutionDecision(Decision):
                         execution_timeout=None, task_timeout=None,
                         input=None, tag_list=None, task_list=None,
                         workflow_type_version=None):
-        """Coninue as new workflow execution decision builder
+        """Continue as new workflow execution decision builder
+
         :param  child_policy: specifies the policy to use for the
                               child workflow executions of the new execution
         :type   child_policy: CHILD_POLICIES.{TERMINATE | REQUEST_CANCEL | ABANDON}
@@ -94,7 +95,7 @@ class WorkflowExecutionDecision(Decision):
             'taskStartToCloseTimeout': task_timeout,
             'input': input,
             'tagList': tag_list,
-            'taskList': task_list,
+            'taskList': {'name': task_list} if task_list else None,
             'workflowTypeVersion': workflow_type_version,
         })
 
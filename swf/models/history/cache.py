@@ -0,0 +1,103 @@
+# -*- coding:utf-8 -*-
+"""
+On-disk cache of the histories of closed workflow executions.
+
+The history of a closed execution never changes, so it can be kept locally
+instead of being downloaded again, page by page, by each ``simpleflow
+workflow.*`` command. Histories are stored as compressed JSON in a
+``diskcache`` directory, bounded by ``SIMPLEFLOW_HISTORY_CACHE_SIZE`` bytes,
+the least recently used ones being evicted first.
+
+The cache is enabled with ``SIMPLEFLOW_ENABLE_HISTORY_CACHE``.
+"""
+import json
+import os
+import zlib
+
+from simpleflow import constants, logger, settings
+
+# Last event of a closed execution history.
+CLOSE_EVENT_TYPES = frozenset([
+    'WorkflowExecutionCompleted',
+    'WorkflowExecutionFailed',
+    'WorkflowExecutionCanceled',
+    'WorkflowExecutionTerminated',
+    'WorkflowExecutionTimedOut',
+    'WorkflowExecutionContinuedAsNew',
+])
+
+CACHE_DIR = os.path.join(constants.CACHE_DIR, 'histories')
+
+
+def is_closed(events):
+    """
+    :param events: raw history events, in chronological order.
+    :type events: list[dict]
+    :rtype: bool
+    """
+    return bool(events) and events[-1]['eventType'] in CLOSE_EVENT_TYPES
+
+
+def _get_cache():
+    from diskcache import Cache
+
+    # NB: cache objects do not survive forks, they are instantiated lazily.
+    return Cache(
+        CACHE_DIR,
+        size_limit=settings.SIMPLEFLOW_HISTORY_CACHE_SIZE,
+        eviction_policy='least-recently-used',
+    )
+
+
+def _key(domain, workflow_id, run_id):
+    return 'history/{}/{}/{}'.format(domain, workflow_id, run_id)
+
+
+def get(domain, workflow_id, run_id):
+    """
+    Get the cached history of an execution.
+
+    :type domain: str
+    :type workflow_id: str
+    :type run_id: str
+    :return: raw events, or None if the history isn't cached.
+    :rtype: Optional[list[dict]]
+    """
+    if not settings.SIMPLEFLOW_ENABLE_HISTORY_CACHE or not run_id:
+        return None
+    from sqlite3 import OperationalError
+
+    try:
+        value = _get_cache().get(_key(domain, workflow_id, run_id))
+    except OperationalError:
+        logger.warning('diskcache: got an OperationalError, skipping history cache usage')
+        return None
+    if value is None:
+        return None
+    logger.debug('history cache: hit for workflow_id={} run_id={}'.format(workflow_id, run_id))
+    return json.loads(zlib.decompress(value).decode('utf-8'))
+
+
+def set(domain, workflow_id, run_id, events):
+    """
+    Cache the history of an execution if it is closed.
+
+    :type domain: str
+    :type workflow_id: str
+    :type run_id: str
+    :param events: raw events, in chronological order.
+    :type events: list[dict]
+    :return: True if the history was cached.
+    :rtype: bool
+    """
+    if not settings.SIMPLEFLOW_ENABLE_HISTORY_CACHE or not run_id or not is_closed(events):
+        return False
+    from sqlite3 import OperationalError
+
+    value = zlib.compress(json.dumps(events, separators=(',', ':')).encode('utf-8'))
+    try:
+        _get_cache().set(_key(domain, workflow_id, run_id), value)
+    except OperationalError:
+        logger.warning('diskcache: got an OperationalError on write, skipping history cache write')
+        return False
+    return True
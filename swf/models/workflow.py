@@ -21,6 +21,7 @@ from swf.exceptions import (
 from swf.models import BaseModel, Domain
 from swf.models.base import ModelDiff
 from swf.models.history import History
+from swf.models.history import cache as history_cache
 from swf.utils import immutable
 
 _POLICIES = (
@@ -457,6 +458,13 @@ class WorkflowExecution(BaseModel):
         if not isinstance(domain, compat.basestring):
             domain = domain.name
 
+        # Only full histories are cached, i.e. without paging options.
+        use_cache = not kwargs
+        if use_cache:
+            events = history_cache.get(domain, self.workflow_id, self.run_id)
+            if events is not None:
+                return History.from_event_list(events)
+
         response = self.connection.get_workflow_execution_history(
             domain,
             self.run_id,
@@ -478,6 +486,8 @@ class WorkflowExecution(BaseModel):
             events.extend(response['events'])
             next_page = response.get('nextPageToken')
 
+        if use_cache:
+            history_cache.set(domain, self.workflow_id, self.run_id, events)
         return History.from_event_list(events)
 
     @exceptions.translate(SWFResponseError,
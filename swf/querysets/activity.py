@@ -64,7 +64,7 @@ class ActivityTypeQuerySet(BaseQuerySet):
         )
 
     def _list(self, *args, **kwargs):
-        return self.connection.list_activity_types(*args, **kwargs)['typeInfos']
+        return self.connection.list_activity_types(*args, **kwargs)
 
     def get(self, name, version, *args, **kwargs):
         """Fetches the activity type with provided ``name`` and ``version``
@@ -258,10 +258,23 @@ class ActivityTypeQuerySet(BaseQuerySet):
         :returns: list of matched ActivityType models objects
         :rtype: list
         """
+        return list(self.iter_filter(domain, registration_status, name, **kwargs))
+
+    def iter_filter(self, domain=None,
+                    registration_status=REGISTERED,
+                    name=None, limit=None, *args, **kwargs):
+        """Same as :meth:`filter`, but yields the activity types as pages
+        are fetched
+
+        :param      limit: maximum number of activity types to return
+        :type       limit: int
+
+        :rtype: Iterator[ActivityType]
+        """
         # name, domain filter is disposable, but not mandatory.
         domain = domain or self.domain
-        return [self.to_ActivityType(domain, type_info) for type_info in
-                self._list(domain.name, registration_status, name=name)]
+        return (self.to_ActivityType(domain, type_info) for type_info in
+                self._list_items(domain.name, registration_status, name=name, limit=limit))
 
     def all(self, registration_status=REGISTERED,
             *args, **kwargs):
@@ -297,20 +310,18 @@ class ActivityTypeQuerySet(BaseQuerySet):
                 ]
             }
         """
-        def get_activity_types():
-            response = {'nextPageToken': None}
-            while 'nextPageToken' in response:
-                response = self.connection.list_activity_types(
-                    self.domain.name,
-                    registration_status,
-                    next_page_token=response['nextPageToken']
-                )
-
-                for activity_type_info in response[self._infos_plural]:
-                    yield activity_type_info
-
-        return [self.to_ActivityType(self.domain, activity_info) for activity_info
-                in get_activity_types()]
+        return self.filter(registration_status=registration_status)
+
+    def iter_all(self, registration_status=REGISTERED, limit=None, *args, **kwargs):
+        """Same as :meth:`all`, but yields the activity types as pages are
+        fetched
+
+        :param      limit: maximum number of activity types to return
+        :type       limit: int
+
+        :rtype: Iterator[ActivityType]
+        """
+        return self.iter_filter(registration_status=registration_status, limit=limit)
 
     def create(self, name, version,
                status=REGISTERED,
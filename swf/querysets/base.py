@@ -5,13 +5,50 @@
 #
 # See the file LICENSE for copying permission.
 
+from swf.constants import MAX_PAGE_SIZE
 from swf.core import ConnectedSWFObject
 
 
 class BaseQuerySet(ConnectedSWFObject):
+    # Amazon response section listing the queried objects
+    _infos_plural = None
+
     def __init__(self, *args, **kwargs):
         super(BaseQuerySet, self).__init__(*args, **kwargs)
 
+    def _list(self, *args, **kwargs):
+        raise NotImplementedError
+
+    def _list_items(self, *args, **kwargs):
+        """Iterates over the items of every page returned by ``_list``
+
+        Pages are fetched lazily, when the previous one is consumed.
+
+        :param  limit: maximum number of items to return, also used as
+                       page size when lower than the SWF maximum.
+        :type   limit: int
+        """
+        limit = kwargs.pop('limit', None)
+        if limit is not None:
+            if limit <= 0:
+                return
+            kwargs['maximum_page_size'] = min(limit, MAX_PAGE_SIZE)
+
+        count = 0
+        response = {'nextPageToken': None}
+        while 'nextPageToken' in response:
+            response = self._list(
+                *args,
+                next_page_token=response['nextPageToken'],
+                **kwargs
+            )
+
+            for item in response[self._infos_plural]:
+                yield item
+                count += 1
+                if count == limit:
+                    return
+
     def get(self, *args, **kwargs):
         raise NotImplementedError
 
@@ -1,4 +1,5 @@
 from swf.models import History
+from swf.models.history import cache as history_cache
 from swf.querysets.base import BaseQuerySet
 
 
@@ -32,6 +33,12 @@ class HistoryQuerySet(BaseQuerySet):
         """
         max_results = max_results or page_size
 
+        events = history_cache.get(self.domain.name, workflow_id, run_id)
+        if events is not None:
+            if reverse:
+                events.reverse()
+            return History.from_event_list(events[:max_results])
+
         if max_results < page_size:
             page_size = max_results
 
@@ -56,4 +63,6 @@ class HistoryQuerySet(BaseQuerySet):
             events.extend(response['events'])
             next_page = response.get('nextPageToken')
 
+        if next_page is None:
+            history_cache.set(self.domain.name, workflow_id, run_id, events[::-1] if reverse else events)
         return History.from_event_list(events)
@@ -55,21 +55,6 @@ class BaseWorkflowQuerySet(BaseQuerySet):
             raise TypeError(err)
         self._domain = value
 
-    def _list(self, *args, **kwargs):
-        raise NotImplementedError
-
-    def _list_items(self, *args, **kwargs):
-        response = {'nextPageToken': None}
-        while 'nextPageToken' in response:
-            response = self._list(
-                *args,
-                next_page_token=response['nextPageToken'],
-                **kwargs
-            )
-
-            for item in response[self._infos_plural]:
-                yield item
-
 
 class WorkflowTypeQuerySet(BaseWorkflowQuerySet):
     # Explicit is better than implicit, keep zen
@@ -276,11 +261,26 @@ class WorkflowTypeQuerySet(BaseWorkflowQuerySet):
         :returns: list of matched WorkflowType models objects
         :rtype: list
         """
+        return list(self.iter_filter(domain, registration_status, name, **kwargs))
+
+    def iter_filter(self, domain=None,
+                    registration_status=REGISTERED,
+                    name=None,
+                    limit=None,
+                    *args, **kwargs):
+        """Same as :meth:`filter`, but yields the workflow types as pages
+        are fetched
+
+        :param      limit: maximum number of workflow types to return
+        :type       limit: int
+
+        :rtype: Iterator[WorkflowType]
+        """
         # As WorkflowTypeQuery has to be built against a specific domain
         # name, domain filter is disposable, but not mandatory.
         domain = domain or self.domain
-        return [self.to_WorkflowType(domain, wf) for wf in
-                self._list_items(domain.name, registration_status, name=name)]
+        return (self.to_WorkflowType(domain, wf) for wf in
+                self._list_items(domain.name, registration_status, name=name, limit=limit))
 
     def all(self, registration_status=REGISTERED, *args, **kwargs):
         """Retrieves every Workflow types
@@ -320,6 +320,17 @@ class WorkflowTypeQuerySet(BaseWorkflowQuerySet):
         """
         return self.filter(registration_status=registration_status)
 
+    def iter_all(self, registration_status=REGISTERED, limit=None, *args, **kwargs):
+        """Same as :meth:`all`, but yields the workflow types as pages are
+        fetched
+
+        :param      limit: maximum number of workflow types to return
+        :type       limit: int
+
+        :rtype: Iterator[WorkflowType]
+        """
+        return self.iter_filter(registration_status=registration_status, limit=limit)
+
     def create(self, name, version,
                status=REGISTERED,
                creation_date=0.0,
@@ -555,8 +566,24 @@ class WorkflowExecutionQuerySet(BaseWorkflowQuerySet):
             :returns: workflow executions objects list
             :rtype: list
         """
-        # As WorkflowTypeQuery has to be built against a specific domain
-        # name, domain filter is disposable, but not mandatory.
+        return list(self.iter_filter(status, tag, workflow_id, workflow_type_name, workflow_type_version,
+                                     *args, **kwargs))
+
+    def iter_filter(self,
+                    status=WorkflowExecution.STATUS_OPEN, tag=None,
+                    workflow_id=None, workflow_type_name=None,
+                    workflow_type_version=None,
+                    *args, **kwargs):
+        """Same as :meth:`filter`, but yields the workflow executions as
+        pages are fetched, so that the first ones are available before
+        every page is listed
+
+        :param  limit: maximum number of workflow executions to return
+        :type   limit: int
+
+        :rtype: Iterator[WorkflowExecution]
+        """
+        limit = kwargs.pop('limit', None)
         invalid_kwargs = self._validate_status_parameters(status, kwargs)
 
         if invalid_kwargs:
@@ -588,7 +615,7 @@ class WorkflowExecutionQuerySet(BaseWorkflowQuerySet):
         else:
             start_oldest_date = None
 
-        return [self.to_WorkflowExecution(self.domain, wfe) for wfe in
+        return (self.to_WorkflowExecution(self.domain, wfe) for wfe in
                 self._list_items(
                     *args,
                     domain=self.domain.name,
@@ -598,8 +625,9 @@ class WorkflowExecutionQuerySet(BaseWorkflowQuerySet):
                     workflow_version=workflow_type_version,
                     start_oldest_date=start_oldest_date,
                     tag=tag,
+                    limit=limit,
                     **kwargs
-                )]
+                ))
 
     def _list(self, *args, **kwargs):
         return self.list_workflow_executions(*args, **kwargs)
@@ -651,10 +679,25 @@ class WorkflowExecutionQuerySet(BaseWorkflowQuerySet):
                 "nextPageToken": "string"
             }
         """
+        return list(self.iter_all(status, start_oldest_date, **kwargs))
+
+    def iter_all(self, status=WorkflowExecution.STATUS_OPEN,
+                 start_oldest_date=MAX_WORKFLOW_AGE,
+                 limit=None,
+                 *args, **kwargs):
+        """Same as :meth:`all`, but yields the workflow executions as pages
+        are fetched
+
+        :param  limit: maximum number of workflow executions to return
+        :type   limit: int
+
+        :rtype: Iterator[WorkflowExecution]
+        """
         start_oldest_date = datetime_timestamp(past_day(start_oldest_date))
 
-        return [self.to_WorkflowExecution(self.domain, wfe) for wfe
+        return (self.to_WorkflowExecution(self.domain, wfe) for wfe
                 in self._list_items(
                 status,
                 self.domain.name,
-                start_oldest_date=int(start_oldest_date))]
+                start_oldest_date=int(start_oldest_date),
+                limit=limit))
@@ -0,0 +1,281 @@
+# -*- coding:utf-8 -*-
+"""
+Client-side rate limiting of the SWF API calls.
+
+SWF throttles API calls per account and per region, with one token bucket
+per API. With hundreds of worker processes, the account buckets get
+exhausted and the throttled processes all retry at the same pace. This
+module paces calls with a token bucket per *family* of APIs:
+
+- ``poll``: ``PollForDecisionTask``, ``PollForActivityTask``
+- ``respond``: ``RespondDecisionTask*``, ``RespondActivityTask*``
+- ``heartbeat``: ``RecordActivityTaskHeartbeat``
+- ``history``: ``GetWorkflowExecutionHistory``
+- ``list``: ``List*``, ``Count*``, ``Describe*``
+
+The limits are set in requests per second with ``SIMPLEFLOW_SWF_RATE_LIMITS``,
+e.g. ``poll=20,respond=50,heartbeat=20,history=10,list=5``; families without
+a limit aren't paced. Rates are adaptive (AIMD): a throttled call halves the
+rate of its family, each successful call raises it back by a fraction of the
+limit.
+
+Buckets are per process, unless ``SIMPLEFLOW_SWF_RATE_LIMITS_SHARED`` is set:
+then the processes of the host share them through memory-mapped files.
+"""
+from __future__ import absolute_import
+
+import os
+import random
+import struct
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+import boto.exception
+
+from simpleflow import logger, settings
+
+# A throttled call multiplies the rate by DECREASE_FACTOR, a successful one
+# increases it by INCREASE_RATIO * limit. The rate never goes below
+# MIN_RATE_RATIO * limit.
+DECREASE_FACTOR = 0.5
+INCREASE_RATIO = 0.05
+MIN_RATE_RATIO = 1 / 32.
+
+SHARED_DIRECTORY = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+
+_STATE_FORMAT = '3d'  # tokens, updated at, rate
+_STATE_SIZE = struct.calcsize(_STATE_FORMAT)
+
+
+def get_family(action):
+    """
+    :param action: SWF API action, e.g. "PollForActivityTask".
+    :type action: str
+    :rtype: Optional[str]
+    """
+    if action.startswith('PollFor'):
+        return 'poll'
+    if action == 'RecordActivityTaskHeartbeat':
+        return 'heartbeat'
+    if action.startswith('Respond'):
+        return 'respond'
+    if action == 'GetWorkflowExecutionHistory':
+        return 'history'
+    if action.startswith(('List', 'Count', 'Describe')):
+        return 'list'
+    return None
+
+
+def parse_limits(value):
+    """
+    Parse rate limits.
+
+    :param value: e.g. "poll=10,respond=20.5".
+    :type value: str
+    :return: requests per second by family.
+    :rtype: dict[str, float]
+    """
+    limits = {}
+    for item in value.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        family, _, rate = item.partition('=')
+        try:
+            rate = float(rate)
+        except ValueError:
+            rate = 0
+        if rate <= 0:
+            raise ValueError('invalid rate limit: {!r}'.format(item))
+        limits[family.strip()] = rate
+    return limits
+
+
+class _LocalState(object):
+    """
+    State of a bucket in the memory of the process.
+    """
+    def __init__(self, initial):
+        self._lock = threading.Lock()
+        self._values = list(initial)
+
+    @contextmanager
+    def locked(self):
+        with self._lock:
+            yield self._values
+
+
+class _SharedState(object):
+    """
+    State of a bucket in a memory-mapped file, locked with ``flock``.
+    """
+    def __init__(self, path, initial):
+        self.path = path
+        self._initial = initial
+        self._lock = threading.Lock()
+        self._pid = None
+        self._fd = None
+        self._mmap = None
+
+    def _open(self):
+        import mmap
+
+        # The file description, hence the flock, mustn't be shared with
+        # the parent process.
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(fd).st_size < _STATE_SIZE:
+            os.ftruncate(fd, _STATE_SIZE)
+        self._fd = fd
+        self._mmap = mmap.mmap(fd, _STATE_SIZE)
+        self._pid = os.getpid()
+
+    @contextmanager
+    def locked(self):
+        import fcntl
+
+        with self._lock:
+            if self._pid != os.getpid():
+                self._open()
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                values = list(struct.unpack(_STATE_FORMAT, self._mmap[:_STATE_SIZE]))
+                if not values[2]:  # new file
+                    values = list(self._initial)
+                yield values
+                self._mmap[:_STATE_SIZE] = struct.pack(_STATE_FORMAT, *values)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+
+class TokenBucket(object):
+    """
+    Token bucket with an adaptive refill rate.
+
+    :ivar limit: maximum rate, in requests per second.
+    :type limit: float
+    :ivar burst: maximum number of tokens.
+    :type burst: float
+    """
+    def __init__(self, limit, burst=None, path=None):
+        """
+        :param path: file to share the bucket with other processes.
+        :type path: Optional[str]
+        """
+        self.limit = limit
+        self.burst = burst or max(1., limit)
+        self.min_rate = limit * MIN_RATE_RATIO
+        initial = (self.burst, time.time(), limit)
+        if path:
+            self._state = _SharedState(path, initial)
+        else:
+            self._state = _LocalState(initial)
+
+    @property
+    def rate(self):
+        with self._state.locked() as values:
+            return values[2]
+
+    def acquire(self):
+        """
+        Take a token, waiting for it if needed.
+
+        :return: time waited, in seconds.
+        :rtype: float
+        """
+        waited = 0.
+        while True:
+            with self._state.locked() as values:
+                now = time.time()
+                tokens, updated_at, rate = values
+                tokens = min(self.burst, tokens + max(0., now - updated_at) * rate)
+                if tokens >= 1:
+                    values[:2] = tokens - 1, now
+                    return waited
+                values[:2] = tokens, now
+                delay = (1 - tokens) / rate
+            # Some jitter so that waiting processes don't wake up together.
+            delay *= 1 + random.random() * 0.1
+            time.sleep(delay)
+            waited += delay
+
+    def throttled(self):
+        """
+        Multiplicative decrease of the rate, and drop the remaining tokens.
+        """
+        with self._state.locked() as values:
+            values[0] = min(values[0], 0.)
+            values[2] = max(self.min_rate, values[2] * DECREASE_FACTOR)
+
+    def succeeded(self):
+        """
+        Additive increase of the rate.
+        """
+        with self._state.locked() as values:
+            if values[2] < self.limit:
+                values[2] = min(self.limit, values[2] + self.limit * INCREASE_RATIO)
+
+
+_buckets = {}
+_buckets_key = None
+_buckets_lock = threading.Lock()
+
+
+def get_bucket(family):
+    """
+    Get the bucket of an API family in the current process, according to
+    the current settings.
+
+    :type family: Optional[str]
+    :rtype: Optional[TokenBucket]
+    """
+    if family is None or not settings.SIMPLEFLOW_SWF_RATE_LIMITS:
+        return None
+    global _buckets, _buckets_key
+
+    key = (os.getpid(), settings.SIMPLEFLOW_SWF_RATE_LIMITS, settings.SIMPLEFLOW_SWF_RATE_LIMITS_SHARED)
+    with _buckets_lock:
+        if key != _buckets_key:
+            limits = parse_limits(settings.SIMPLEFLOW_SWF_RATE_LIMITS)
+            _buckets = {}
+            for name, limit in limits.items():
+                path = None
+                if settings.SIMPLEFLOW_SWF_RATE_LIMITS_SHARED:
+                    path = os.path.join(SHARED_DIRECTORY, 'simpleflow-swf-ratelimit-{}-{}'.format(
+                        os.getuid(), name))
+                _buckets[name] = TokenBucket(limit, path=path)
+            _buckets_key = key
+        return _buckets.get(family)
+
+
+def limit(connection):
+    """
+    Pace the requests of a boto SWF connection.
+
+    :type connection: boto.swf.layer1.Layer1
+    :rtype: boto.swf.layer1.Layer1
+    """
+    make_request = connection.make_request
+
+    # NB: no functools.wraps(), which fails on Python 2 for objects without
+    # a __name__, e.g. mocked connections.
+    def limited_make_request(action, *args, **kwargs):
+        bucket = get_bucket(get_family(action))
+        if bucket is None:
+            return make_request(action, *args, **kwargs)
+        waited = bucket.acquire()
+        if waited:
+            logger.debug('rate limit: waited {:.2f}s before {}'.format(waited, action))
+        try:
+            response = make_request(action, *args, **kwargs)
+        except boto.exception.SWFResponseError as e:
+            if e.error_code == 'ThrottlingException':
+                bucket.throttled()
+                logger.info('rate limit: {} throttled, rate lowered to {:.2f}/s'.format(action, bucket.rate))
+            raise
+        bucket.succeeded()
+        return response
+
+    connection.make_request = limited_make_request
+    return connection
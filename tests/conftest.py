@@ -0,0 +1,10 @@
+import pytest
+
+import swf.core
+
+
+@pytest.fixture(autouse=True)
+def reset_swf_connections():
+    # Shared connections keep their HTTP connections alive: don't let them
+    # leak across tests which mock or record SWF calls.
+    swf.core._reset_connections()
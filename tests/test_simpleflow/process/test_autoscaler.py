@@ -0,0 +1,65 @@
+import unittest
+
+from sure import expect
+
+from simpleflow.process import Autoscaler
+
+
+class TestAutoscaler(unittest.TestCase):
+    def make_autoscaler(self, pending=0, **kwargs):
+        self.pending = pending
+        kwargs.setdefault('min_children', 1)
+        kwargs.setdefault('max_children', 8)
+        kwargs.setdefault('cooldown', 60)
+        return Autoscaler(lambda: self.pending, **kwargs)
+
+    def test_invalid_bounds(self):
+        with self.assertRaises(ValueError):
+            self.make_autoscaler(min_children=4, max_children=2)
+
+    def test_scale_up_with_backlog(self):
+        autoscaler = self.make_autoscaler(tasks_per_child=2)
+        expect(autoscaler.target(2, 3, now=1000)).to.equal(4)
+        expect(autoscaler.target(4, 100, now=1000)).to.equal(8)
+
+    def test_hysteresis(self):
+        autoscaler = self.make_autoscaler(scale_up_threshold=3)
+        now = autoscaler._empty_since
+        # a small backlog neither scales up nor down
+        expect(autoscaler.target(2, 2, now=now + 1000)).to.equal(2)
+        expect(autoscaler.target(2, 3, now=now + 1000)).to.equal(5)
+
+    def test_scale_down_after_cooldown(self):
+        autoscaler = self.make_autoscaler()
+        now = 1000
+        autoscaler.target(1, 4, now=now)
+        expect(autoscaler.target(5, 0, now=now + 30)).to.equal(5)
+        expect(autoscaler.target(5, 0, now=now + 90)).to.equal(4)
+        # cooldown restarts after each removal
+        expect(autoscaler.target(4, 0, now=now + 120)).to.equal(4)
+        expect(autoscaler.target(4, 0, now=now + 150)).to.equal(3)
+        expect(autoscaler.target(1, 0, now=now + 1000)).to.equal(1)
+
+    def test_no_scale_down_if_backlog_not_empty(self):
+        autoscaler = self.make_autoscaler(scale_up_threshold=3)
+        now = 1000
+        autoscaler.target(1, 4, now=now)
+        expect(autoscaler.target(5, 0, now=now + 30)).to.equal(5)
+        # a small backlog during the cooldown restarts it
+        expect(autoscaler.target(5, 2, now=now + 50)).to.equal(5)
+        expect(autoscaler.target(5, 0, now=now + 70)).to.equal(5)
+        expect(autoscaler.target(5, 0, now=now + 100)).to.equal(5)
+        expect(autoscaler.target(5, 0, now=now + 130)).to.equal(4)
+
+    def test_update_checks_at_interval(self):
+        autoscaler = self.make_autoscaler(pending=2, interval=30)
+        expect(autoscaler.update(1, now=1000)).to.equal(3)
+        self.pending = 10
+        expect(autoscaler.update(3, now=1010)).to.equal(3)
+        expect(autoscaler.update(3, now=1030)).to.equal(8)
+
+    def test_update_ignores_errors(self):
+        def count_pending():
+            raise Exception('throttled')
+        autoscaler = Autoscaler(count_pending, min_children=1, max_children=4)
+        expect(autoscaler.update(2)).to.equal(2)
@@ -3,6 +3,7 @@ import os
 import signal
 import sys
 import time
+import unittest
 
 from flaky import flaky
 from psutil import Process
@@ -10,7 +11,8 @@ from pytest import mark
 from setproctitle import setproctitle
 from sure import expect
 
-from simpleflow.process import Supervisor, reset_signal_handlers
+from simpleflow.process import Autoscaler, Supervisor, reset_signal_handlers
+from simpleflow.process.supervisor import MIN_CHILD_UPTIME, RESTART_BACKOFF_MAX, WAKEUP_INTERVAL
 from tests.utils import IntegrationTestCase
 
 TIME_STORE = {}
@@ -161,3 +163,101 @@ class TestSupervisor(IntegrationTestCase):
         os.kill(p.pid, signal.SIGTERM)
         p.join()
         expect(p.exitcode).to.equal(-15)
+
+
+def exit_immediately():
+    pass
+
+
+class TestSupervisorReaping(unittest.TestCase):
+    def setUp(self):
+        self.supervisor = Supervisor(exit_immediately, nb_children=2)
+
+    def tearDown(self):
+        for child in self.supervisor._processes.values():
+            child.terminate()
+            child.join()
+
+    def test_restart_delay(self):
+        expect(Supervisor.restart_delay(0)).to.equal(0)
+        expect(Supervisor.restart_delay(1)).to.equal(1)
+        expect(Supervisor.restart_delay(4)).to.equal(8)
+        expect(Supervisor.restart_delay(100)).to.equal(RESTART_BACKOFF_MAX)
+
+    def test_reap_crashing_children_with_backoff(self):
+        self.supervisor._start_worker_processes()
+        children = list(self.supervisor._processes.values())
+        expect(len(children)).to.equal(2)
+        for child in children:
+            child.join()
+
+        self.supervisor._reap_worker_processes()
+        expect(self.supervisor._processes).to.be.empty
+        expect(self.supervisor._nb_crashes).to.equal(2)
+        expect(self.supervisor._restart_after).to.be.greater_than(time.time())
+
+        # no restart before the backoff delay expires
+        self.supervisor._start_worker_processes()
+        expect(self.supervisor._processes).to.be.empty
+        expect(self.supervisor._next_wakeup_delay()).to.be.lower_than(2.1)
+
+        self.supervisor._restart_after = 0
+        self.supervisor._start_worker_processes()
+        expect(len(self.supervisor._processes)).to.equal(2)
+
+    def test_long_running_child_resets_crashes(self):
+        self.supervisor._nb_crashes = 3
+        self.supervisor._start_worker_processes()
+        for pid, child in self.supervisor._processes.items():
+            child.join()
+            self.supervisor._start_times[pid] -= MIN_CHILD_UPTIME
+        self.supervisor._reap_worker_processes()
+        expect(self.supervisor._nb_crashes).to.equal(0)
+
+    def test_sigchld_wakes_up_main_loop(self):
+        self.supervisor._open_wakeup_pipe()
+        self.supervisor.bind_signal_handlers()
+        try:
+            self.supervisor._start_worker_processes()
+            start = time.time()
+            self.supervisor._wait_for_event(WAKEUP_INTERVAL)
+            expect(time.time() - start).to.be.lower_than(WAKEUP_INTERVAL)
+        finally:
+            for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGCHLD):
+                signal.signal(signum, signal.SIG_DFL)
+
+
+def sleep_until_terminated():
+    time.sleep(30)
+
+
+class TestSupervisorAutoscaling(unittest.TestCase):
+    def tearDown(self):
+        for child in self.supervisor._processes.values():
+            child.terminate()
+            child.join()
+
+    def test_scale_up_and_down(self):
+        autoscaler = Autoscaler(lambda: self.pending, min_children=1, max_children=3,
+                                interval=0, cooldown=0)
+        self.supervisor = Supervisor(sleep_until_terminated, autoscaler=autoscaler)
+        expect(self.supervisor._nb_children).to.equal(1)
+
+        self.pending = 2
+        self.supervisor._autoscale()
+        self.supervisor._start_worker_processes()
+        expect(len(self.supervisor._processes)).to.equal(3)
+
+        self.pending = 0
+        self.supervisor._autoscale()
+        expect(self.supervisor._nb_children).to.equal(2)
+        expect(len(self.supervisor._retiring)).to.equal(1)
+        for pid in self.supervisor._retiring:
+            self.supervisor._processes[pid].join()
+        self.supervisor._reap_worker_processes()
+        expect(len(self.supervisor._processes)).to.equal(2)
+        expect(self.supervisor._retiring).to.be.empty
+        # a retired child is neither a crash nor replaced
+        expect(self.supervisor._nb_crashes).to.equal(0)
+        self.supervisor._start_worker_processes()
+        expect(len(self.supervisor._processes)).to.equal(2)
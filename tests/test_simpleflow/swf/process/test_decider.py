@@ -0,0 +1,135 @@
+from datetime import datetime
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from mock import Mock, patch
+
+try:
+    from moto import mock_swf_deprecated as mock_swf
+except ImportError:
+    from moto import mock_swf
+
+from simpleflow.swf.executor import Executor, FakeTaskWorker
+from simpleflow.swf.process.decider import base, helpers
+from simpleflow.swf.process.decider.base import DeciderPoller
+from swf.models import Domain
+from tests.data import BaseTestWorkflow
+
+
+CHILD_WORKFLOW = 'tests.test_simpleflow.swf.process.test_decider.ChildWorkflow'
+
+
+class ParentWorkflow(BaseTestWorkflow):
+    name = 'tests.test_simpleflow.swf.process.test_decider.ParentWorkflow'
+
+
+class ChildWorkflow(BaseTestWorkflow):
+    name = CHILD_WORKFLOW
+
+
+def decision_response(workflow_name):
+    event = Mock(workflow_type={'name': workflow_name, 'version': 'test_version'})
+    return Mock(history=[event])
+
+
+def decide_nothing(poller, decision_response):
+    pass
+
+
+# Directory where the fake task workers of the tests report.
+REPORT_DIRECTORY = None
+
+
+def run_fake_task_worker(worker):
+    # Stands for the polling loop: report that the worker is still running
+    # once the decision process exited.
+    time.sleep(0.5)
+    with open(os.path.join(REPORT_DIRECTORY, worker.task_list), 'w') as f:
+        f.write(str(os.getppid()))
+
+
+@mock_swf
+class TestDeciderPoller(unittest.TestCase):
+    def setUp(self):
+        self.domain = Domain('test-domain')
+        self.poller = DeciderPoller(
+            [Executor(self.domain, ParentWorkflow)], self.domain, 'test-task-list', is_standalone=False,
+        )
+
+    @patch.object(base, 'spawn')
+    def test_process_keeps_child_workflow_executors(self, mock_spawn):
+        self.poller.process(decision_response(CHILD_WORKFLOW))
+        executor = self.poller._workflow_executors[CHILD_WORKFLOW]
+        self.assertIs(ChildWorkflow, executor.workflow_class)
+        self.assertEqual(1, mock_spawn.call_count)
+
+        # The next decisions reuse the executor loaded in the poller process.
+        with patch.object(helpers, 'load_workflow_executor') as mock_load:
+            self.poller.process(decision_response(CHILD_WORKFLOW))
+        self.assertFalse(mock_load.called)
+        self.assertIs(executor, self.poller._workflow_executors[CHILD_WORKFLOW])
+
+    @patch.object(base, 'spawn')
+    def test_process_unknown_workflow(self, mock_spawn):
+        # The decision process reports the error.
+        self.poller.process(decision_response('does.not.Exist'))
+        self.assertNotIn('does.not.Exist', self.poller._workflow_executors)
+        self.assertEqual(1, mock_spawn.call_count)
+
+    def test_preload_workflows(self):
+        poller = helpers.make_decider_poller(
+            [ParentWorkflow.name], 'test-domain', 'test-task-list', preload_workflows=[CHILD_WORKFLOW],
+        )
+        self.assertEqual(sorted([ParentWorkflow.name, CHILD_WORKFLOW]), sorted(poller._workflow_executors))
+        self.assertEqual(ParentWorkflow.name, poller.workflow_name)
+
+
+@mock_swf
+class TestRepairDeciderPoller(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        patcher = patch('{}.REPORT_DIRECTORY'.format(__name__), self.directory)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.domain = Domain('test-domain')
+        repair_with = Mock(activities={'activity-1': {'state': 'completed', 'result': '1'}}, child_workflows={})
+        self.executor = Executor(self.domain, ParentWorkflow, repair_with=repair_with)
+        self.poller = DeciderPoller([self.executor], self.domain, 'test-task-list', is_standalone=True)
+
+    def decision_response(self):
+        response = decision_response(ParentWorkflow.name)
+        response.execution = Mock(workflow_id='workflow-1', run_id='run-1')
+        return response
+
+    @patch.object(base, 'process_decision', decide_nothing)
+    @patch.object(FakeTaskWorker, 'run', run_fake_task_worker)
+    def test_fake_task_worker_outlives_decisions(self):
+        task_list = self.executor.get_fake_task_list('workflow-1', 'run-1')
+
+        self.poller.process(self.decision_response())
+        process = self.executor._fake_task_workers[task_list]
+        self.poller.process(self.decision_response())
+        self.assertIs(process, self.executor._fake_task_workers[task_list])
+
+        process.join(5)
+        with open(os.path.join(self.directory, task_list)) as f:
+            self.assertEqual(str(os.getpid()), f.read())
+
+
+class TestDecisionTaskWait(unittest.TestCase):
+    def test_get_decision_task_wait(self):
+        history = [
+            Mock(type='WorkflowExecution', state='started', timestamp=datetime(2020, 1, 1, 0, 0, 0)),
+            Mock(type='DecisionTask', state='scheduled', timestamp=datetime(2020, 1, 1, 0, 0, 1)),
+            Mock(type='DecisionTask', state='started', timestamp=datetime(2020, 1, 1, 0, 0, 3, 500000)),
+        ]
+        self.assertEqual(2.5, base.get_decision_task_wait(history))
+        self.assertIsNone(base.get_decision_task_wait(history[:2]))
+
+
+if __name__ == '__main__':
+    unittest.main()
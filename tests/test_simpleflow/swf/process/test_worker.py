@@ -1,13 +1,19 @@
 from collections import namedtuple
-from mock import patch
+from mock import Mock, patch
+import subprocess
+import time
 import unittest
 
+import psutil
+
 try:
     from moto import mock_swf_deprecated as mock_swf
 except ImportError:
     from moto import mock_swf
 
-from simpleflow.swf.process.worker.base import ActivityWorker, ActivityPoller
+from simpleflow import metrics
+from simpleflow.progress import report_progress
+from simpleflow.swf.process.worker.base import ActivityWorker, ActivityPoller, spawn
 from swf.models import Domain, ActivityTask
 
 
@@ -35,5 +41,58 @@ class TestActivityWorker(unittest.TestCase):
         self.assertIn("No module named ", mock.call_args[1]["reason"])
 
 
+def report_progress_task(poller, token, task, progress_fd=None):
+    for i in range(4):
+        report_progress({'progress_fd': progress_fd}, {'step': i})
+        time.sleep(0.2)
+
+
+class TestSpawn(unittest.TestCase):
+    @patch("simpleflow.swf.process.worker.base.process_task", report_progress_task)
+    def test_heartbeat_with_progress(self):
+        poller = Mock(metrics_labels={})
+        poller.heartbeat.return_value = {}
+
+        spawn(poller, "token", Mock(), heartbeat=0.3)
+
+        self.assertFalse(poller.fail_with_retry.called)
+        self.assertTrue(poller.heartbeat.called)
+        details = [call[1]["details"] for call in poller.heartbeat.call_args_list]
+        self.assertIn(details[-1], ('{"step":2}', '{"step":3}'))
+
+    @patch("simpleflow.swf.process.worker.base.process_task")
+    def test_cancel_stops_process_tree(self, process_task):
+        def sleep_with_child(poller, token, task, progress_fd=None):
+            subprocess.Popen(["sleep", "60"])
+            time.sleep(60)
+
+        process_task.side_effect = sleep_with_child
+        poller = Mock(metrics_labels={})
+        children = []
+        # e.g. a zygote left by other tests
+        other_children = set(psutil.Process().children(recursive=True))
+
+        def heartbeat(token, details=None):
+            children.extend(set(psutil.Process().children(recursive=True)) - other_children)
+            return {"cancelRequested": True}
+
+        poller.heartbeat.side_effect = heartbeat
+
+        start = time.time()
+        with patch.object(metrics.CANCEL_SECONDS, "observe") as observe:
+            spawn(poller, "token", Mock(), heartbeat=60, cancel_check_interval=0.5, kill_grace_period=1)
+
+        self.assertTrue(time.time() - start < 10)
+        self.assertEqual(1, poller.heartbeat.call_count)
+        poller.cancel.assert_called_once_with("token")
+        self.assertEqual(1, observe.call_count)
+        (duration,), labels = observe.call_args
+        self.assertTrue(0 <= duration < 10)
+        self.assertEqual({"reason": "cancel requested"}, labels)
+        self.assertTrue(len(children) >= 2)
+        for child in children:
+            self.assertFalse(child.is_running() and child.status() != psutil.STATUS_ZOMBIE)
+
+
 if __name__ == '__main__':
     unittest.main()
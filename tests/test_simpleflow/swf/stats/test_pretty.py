@@ -3,7 +3,8 @@ import unittest
 
 from swf.models import History as BasicHistory
 from simpleflow.history import History
-from simpleflow.swf.stats.pretty import dump_history_to_json
+from simpleflow.swf.stats import percentile
+from simpleflow.swf.stats.pretty import dump_history_to_json, fleet_profile, streamed
 
 
 def fake_history():
@@ -32,3 +33,47 @@ class TestSimpleflowSwfStatsPretty(unittest.TestCase):
              "activity-examples.basic.double-1"],
             [t[0] for t in parsed],
         )
+
+    def test_fleet_profile(self):
+        header, rows = fleet_profile([fake_history(), fake_history()])
+        self.assertEqual(len(header), len(rows[0]))
+        names = [row[0] for row in rows]
+        self.assertEqual(sorted(set(names)), sorted(names))
+        self.assertIn('examples.basic.increment', names)
+        for row in rows:
+            self.assertEqual(2, row[1])
+        totals = [row[3] for row in rows]
+        self.assertEqual(sorted(totals, reverse=True), totals)
+        self.assertAlmostEqual(100., sum(row[4] for row in rows))
+
+        _, rows = fleet_profile([fake_history()], nb_tasks=1)
+        self.assertEqual(1, len(rows))
+
+    def test_percentile(self):
+        self.assertIsNone(percentile([], 50))
+        self.assertEqual(3, percentile([3], 99))
+        self.assertEqual(2.5, percentile([1, 2, 3, 4], 50))
+        self.assertAlmostEqual(39.6, percentile(list(range(41)), 99))
+
+    def test_streamed(self):
+        def rows(n):
+            return ('a', 'b'), ((i, i * 2) for i in range(n))
+
+        chunks = list(streamed(fmt='csv', chunk_size=2)(rows)(5))
+        self.assertEqual(['0,0\r\n1,2', '2,4\r\n3,6', '4,8'], chunks)
+
+        chunks = list(streamed(fmt='json', chunk_size=2)(rows)(5))
+        self.assertEqual(1, len(chunks))
+        self.assertEqual(5, len(json.loads(chunks[0])))
+
+    def test_streamed_tabular(self):
+        # columns are aligned on all the rows, not per chunk
+        def rows():
+            return ('name', 'n'), [('w0', 0), ('w1', 1), ('w2w2', 2)]
+
+        chunks = list(streamed(with_header=True, fmt='tabular', chunk_size=2)(rows)())
+        self.assertEqual(1, len(chunks))
+        lines = chunks[0].splitlines()
+        self.assertEqual(4, len(lines))
+        # numbers are right-aligned
+        self.assertEqual(1, len(set(len(line) for line in lines)), lines)
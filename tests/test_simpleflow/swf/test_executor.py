@@ -10,6 +10,7 @@ from swf.responses import Response
 from tests.data import (
     BaseTestWorkflow,
     DOMAIN,
+    double,
     increment,
 )
 from tests.utils import MockSWFTestCase
@@ -41,6 +42,39 @@ class ExampleWorkflow(BaseTestWorkflow):
         futures.wait(a, b, c, d, e)
 
 
+class ContinueAsNewWorkflow(BaseTestWorkflow):
+    max_history_events = 8
+
+    def run(self, x):
+        x = self.submit(increment, x).result
+        if self.should_continue_as_new():
+            self.continue_as_new(x)
+        self.submit(increment, x)
+        return x
+
+
+class CheckpointWorkflow(BaseTestWorkflow):
+    def run(self):
+        checkpoint = self.get_checkpoint('phase1')
+        if checkpoint is None:
+            x = self.submit(increment, 1).result
+            self.submit(self.checkpoint('phase1', {'x': x}))
+        else:
+            x = checkpoint.details['x']
+        return self.submit(double, x).result
+
+
+class CheckpointReuseWorkflow(BaseTestWorkflow):
+    def run(self):
+        checkpoint = self.get_checkpoint('phase1')
+        if checkpoint is None:
+            x = self.submit(increment, 1).result
+            self.submit(self.checkpoint('phase1', x))
+        else:
+            x = checkpoint.details
+        return self.submit(increment, 10).result + x
+
+
 class TestSimpleflowSwfExecutor(MockSWFTestCase):
     def test_submit_resolves_priority(self):
         self.start_workflow_execution()
@@ -124,6 +158,98 @@ class TestCaseNotNeedingDomain(unittest.TestCase):
         details = executor.get_event_details('timer', 'another_timer')
         expect(details).to.be.none
 
+    def test_checkpoint(self):
+        history = builder.History(CheckpointWorkflow, input={})
+        (history
+         .add_decision_task_completed()
+         .add_activity_task(increment,
+                            decision_id=history.last_id,
+                            last_state='completed',
+                            activity_id='activity-tests.data.activities.increment-1',
+                            input={'args': [1]},
+                            result=2)
+         .add_decision_task_scheduled()
+         .add_decision_task_started())
+        decisions = Executor(DOMAIN, CheckpointWorkflow).replay(
+            Response(history=history, execution=None)).decisions
+        expect([d['decisionType'] for d in decisions][:2]).to.equal(['RecordMarker', 'ScheduleActivityTask'])
+        attributes = decisions[0]['recordMarkerDecisionAttributes']
+        expect(attributes['markerName']).to.equal('simpleflow.checkpoint.phase1')
+        expect(format.decode(attributes['details'])).to.equal({
+            'state': {'x': 2},
+            'task_counters': {'activity-tests.data.activities.increment': 1},
+        })
+
+        # the first phase isn't replayed once the checkpoint is recorded
+        history = builder.History(CheckpointWorkflow, input={})
+        (history
+         .add_decision_task_completed()
+         .add_marker('simpleflow.checkpoint.phase1', {'x': 2})
+         .add_decision_task_scheduled()
+         .add_decision_task_started())
+        executor = Executor(DOMAIN, CheckpointWorkflow)
+        decisions = executor.replay(Response(history=history, execution=None), decref_workflow=False).decisions
+        expect(decisions).to.have.length_of(1)
+        attributes = decisions[0]['scheduleActivityTaskDecisionAttributes']
+        expect(attributes['activityType']['name']).to.equal(double.name)
+        expect(format.decode(attributes['input'])).to.equal({'args': [2], 'kwargs': {}})
+        expect(executor.get_checkpoint('phase2')).to.be.none
+
+    def test_checkpoint_keeps_task_ids(self):
+        history = builder.History(CheckpointReuseWorkflow, input={})
+        (history
+         .add_decision_task_completed()
+         .add_activity_task(increment,
+                            decision_id=history.last_id,
+                            last_state='completed',
+                            activity_id='activity-tests.data.activities.increment-1',
+                            input={'args': [1]},
+                            result=2)
+         .add_decision_task_scheduled()
+         .add_decision_task_started())
+        decisions = Executor(DOMAIN, CheckpointReuseWorkflow).replay(
+            Response(history=history, execution=None)).decisions
+        details = format.decode(decisions[0]['recordMarkerDecisionAttributes']['details'])
+
+        (history
+         .add_decision_task_completed()
+         .add_marker('simpleflow.checkpoint.phase1', details)
+         .add_decision_task_scheduled()
+         .add_decision_task_started())
+        decisions = Executor(DOMAIN, CheckpointReuseWorkflow).replay(
+            Response(history=history, execution=None)).decisions
+        # the task after the checkpoint doesn't take the ID of the skipped one
+        expect(decisions).to.have.length_of(1)
+        attributes = decisions[0]['scheduleActivityTaskDecisionAttributes']
+        expect(attributes['activityId']).to.equal('activity-tests.data.activities.increment-2')
+        expect(format.decode(attributes['input'])).to.equal({'args': [10], 'kwargs': {}})
+
+    def test_continue_as_new(self):
+        history = builder.History(ContinueAsNewWorkflow, input={'args': [1]}, tag_list=['a=b'])
+        decisions = Executor(DOMAIN, ContinueAsNewWorkflow).replay(
+            Response(history=history, execution=None)).decisions
+        expect(decisions[0]['decisionType']).to.equal('ScheduleActivityTask')
+
+        (history
+         .add_decision_task_completed()
+         .add_activity_task(increment,
+                            decision_id=history.last_id,
+                            last_state='completed',
+                            activity_id='activity-tests.data.activities.increment-1',
+                            input={'args': [1]},
+                            result=2)
+         .add_decision_task_scheduled()
+         .add_decision_task_started())
+        decisions = Executor(DOMAIN, ContinueAsNewWorkflow).replay(
+            Response(history=history, execution=None)).decisions
+        expect(decisions).to.have.length_of(1)
+        expect(decisions[0]['decisionType']).to.equal('ContinueAsNewWorkflowExecution')
+        attributes = decisions[0]['continueAsNewWorkflowExecutionDecisionAttributes']
+        expect(format.decode(attributes['input'])).to.equal({'args': [2], 'kwargs': {}})
+        expect(attributes['taskList']).to.equal({'name': ContinueAsNewWorkflow.task_list})
+        expect(attributes['tagList']).to.equal(['a=b'])
+        expect(attributes['childPolicy']).to.equal('TERMINATE')
+
 
 @activity.with_attributes(raises_on_failure=True)
 def print_me_n_times(s, n, raises=False):
@@ -67,3 +67,28 @@ class TestSwfHelpers(unittest.TestCase):
         expect(identity).to_not.have.key("user")
         # key ignored
         expect(identity).to_not.have.key("foo")
+
+
+class TestFleetProfile(unittest.TestCase):
+    def test_show_fleet_profile(self):
+        from mock import Mock
+        from swf.models import Domain, History as BasicHistory
+        from swf.querysets import WorkflowExecutionQuerySet
+        from simpleflow.swf.helpers import show_fleet_profile
+
+        with open("tests/data/dumps/workflow_execution_basic.json") as f:
+            events = json.load(f)["events"]
+        executions = [Mock(history=lambda: BasicHistory.from_event_list(events)) for _ in range(5)]
+
+        with patch.dict("os.environ", {"SWF_ENDPOINT_URL": "memory://"}), \
+                patch.object(WorkflowExecutionQuerySet, "iter_filter", return_value=iter(executions)) as iter_filter:
+            header, rows = show_fleet_profile("TestDomain", "basic", limit=5, nb_workers=2)
+            shared_connection = Domain("TestDomain").connection
+
+        expect(iter_filter.call_args[1]).to.have.key("status").being.equal("CLOSED")
+        expect(iter_filter.call_args[1]).to.have.key("limit").being.equal(5)
+        expect(set(row[1] for row in rows)).to.equal({5})
+        # one connection per worker thread
+        connections = set(execution.connection for execution in executions)
+        self.assertIn(len(connections), (1, 2))
+        self.assertFalse(shared_connection in connections)
@@ -0,0 +1,45 @@
+import json
+import unittest
+
+from click.testing import CliRunner
+
+from simpleflow import benchmark
+from simpleflow.command import cli
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_workflow_input(self):
+        kwargs = benchmark.workflow_input(10000, 'mixed')['kwargs']
+        self.assertEqual(kwargs['activities'] * 2 // 100, kwargs['children'])
+        self.assertEqual(kwargs['activities'] // 100, kwargs['signals'])
+
+    def test_history_size(self):
+        for scenario in benchmark.SCENARIOS:
+            history = benchmark.build_history(1000, scenario)
+            self.assertTrue(900 < len(history.events) < 1100)
+
+    def test_completed_history(self):
+        decisions = benchmark.replay(benchmark.build_history(500, 'mixed'))
+        self.assertEqual(['CompleteWorkflowExecution'], [d['decisionType'] for d in decisions])
+
+    def test_unscheduled_activities(self):
+        result = benchmark.benchmark(500, 'fanout', unscheduled=0.05, repeat=1, memory=False)
+        # at most MAX_DECISIONS, then a wake-up timer
+        self.assertTrue(result['decision_types']['ScheduleActivityTask'] > 1)
+        self.assertNotIn('CompleteWorkflowExecution', result['decision_types'])
+        self.assertIsNone(result['peak_memory'])
+
+    def test_command(self):
+        result = CliRunner().invoke(cli, [
+            'benchmark.replay', '--events', '100,200', '--scenario', 'mixed', '--repeat', '1'])
+        self.assertEqual(0, result.exit_code, result.output)
+        results = json.loads(result.output)['results']
+        self.assertEqual(2, len(results))
+        for result in results:
+            self.assertEqual('mixed', result['scenario'])
+            self.assertEqual(1, result['decisions'])
+            self.assertTrue(result['replay_time'] > 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -7,7 +7,7 @@ import re
 from builtins import range
 
 import boto
-from mock import patch
+from mock import Mock, patch
 
 try:
     from moto import mock_swf_deprecated as mock_swf
@@ -22,7 +22,7 @@ from simpleflow import (
 )
 from simpleflow.history import History
 from simpleflow.swf import constants
-from simpleflow.swf.executor import Executor
+from simpleflow.swf.executor import Executor, FakeTaskWorker
 from simpleflow.swf.task import NonPythonicActivityTask
 from simpleflow.task import ActivityTask
 from simpleflow.utils import json_dumps
@@ -123,7 +123,8 @@ def test_workflow_that_submits_an_activity_task():
 
 
 @mock_swf
-def test_workflow_with_repair_if_task_successful():
+@patch.object(FakeTaskWorker, 'start')
+def test_workflow_with_repair_if_task_successful(mock_start):
     workflow = ATestDefinitionWithInput
     history = builder.History(workflow, input={'args': [4]})
 
@@ -149,6 +150,75 @@ def test_workflow_with_repair_if_task_successful():
     assert decisions[0]['decisionType'] == 'ScheduleActivityTask'
     attrs = decisions[0]['scheduleActivityTaskDecisionAttributes']
     assert attrs['taskList']['name'].startswith("FAKE-")
+    # The worker completing the faked task is started by the decider poller.
+    assert not mock_start.called
+
+
+@mock_swf
+@patch.object(FakeTaskWorker, 'start')
+def test_workflow_with_repair_shares_fake_task_worker(mock_start):
+    workflow = ATestDefinitionMap
+    history = builder.History(workflow)
+
+    previous_history = builder.History(workflow)
+    decision_id = previous_history.last_id
+    for i in range(workflow.nb_parts):
+        previous_history.add_activity_task(
+            increment,
+            decision_id=decision_id,
+            activity_id='activity-tests.data.activities.increment-{}'.format(i + 1),
+            last_state='completed' if i else 'failed',
+            input={'args': i},
+            result=i + 1)
+    to_repair = History(previous_history)
+    to_repair.parse()
+
+    executor = Executor(DOMAIN, workflow, repair_with=to_repair)
+    decisions = executor.replay(Response(history=history, execution=None)).decisions
+
+    # The failed task is executed again, the others are faked on a single task list.
+    task_lists = [d['scheduleActivityTaskDecisionAttributes']['taskList']['name'] for d in decisions]
+    assert not task_lists[0].startswith("FAKE-")
+    assert task_lists[1] == task_lists[2] == executor.fake_task_list
+    assert task_lists[1].startswith("FAKE-")
+    assert not mock_start.called
+
+    # A single worker serves the faked tasks of the execution.
+    assert executor.get_fake_task_list(None, None) == executor.fake_task_list
+    assert executor.ensure_fake_task_worker(None, None) is mock_start.return_value
+    mock_start.return_value.is_alive.return_value = True
+    assert executor.ensure_fake_task_worker(None, None) is mock_start.return_value
+    mock_start.assert_called_once_with()
+
+
+def test_fake_task_worker():
+    worker = FakeTaskWorker(
+        'TestDomain', 'FAKE-test',
+        activity_results={'activity-1': '42'},
+        child_workflow_results={'workflow-1': '"done"'},
+    )
+    conn = Mock()
+
+    conn.poll_for_activity_task.return_value = {}
+    assert not worker.complete_activity_task(conn)
+
+    conn.poll_for_activity_task.return_value = {'taskToken': 'token', 'activityId': 'activity-1'}
+    assert worker.complete_activity_task(conn)
+    conn.respond_activity_task_completed.assert_called_once_with('token', '42')
+
+    conn.poll_for_activity_task.return_value = {'taskToken': 'token', 'activityId': 'activity-2'}
+    worker.complete_activity_task(conn)
+    assert conn.respond_activity_task_failed.called
+
+    conn.poll_for_decision_task.return_value = {
+        'taskToken': 'token',
+        'workflowExecution': {'workflowId': 'workflow-1', 'runId': 'run-1'},
+    }
+    assert worker.complete_child_workflow_task(conn)
+    conn.respond_decision_task_completed.assert_called_once_with('token', decisions=[{
+        'decisionType': 'CompleteWorkflowExecution',
+        'completeWorkflowExecutionDecisionAttributes': {'result': '"done"'},
+    }])
 
 
 @mock_swf
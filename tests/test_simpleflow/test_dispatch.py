@@ -0,0 +1,43 @@
+import unittest
+
+from simpleflow import activity
+from simpleflow.dispatch import dynamic_dispatcher
+from simpleflow.dispatch.exceptions import DispatchError
+from simpleflow.registry import registry
+
+
+def plain_function():
+    return 1
+
+
+class TestDynamicDispatcher(unittest.TestCase):
+    def setUp(self):
+        dynamic_dispatcher._activities.clear()
+
+    def test_dispatch_is_cached(self):
+        dispatcher = dynamic_dispatcher.Dispatcher()
+        first = dispatcher.dispatch_activity('tests.test_simpleflow.test_dispatch.plain_function')
+        self.assertIsInstance(first, activity.Activity)
+        self.assertIs(first.callable, plain_function)
+        second = dispatcher.dispatch_activity('tests.test_simpleflow.test_dispatch.plain_function')
+        self.assertIs(first, second)
+
+    def test_dispatch_error(self):
+        with self.assertRaises(DispatchError):
+            dynamic_dispatcher.Dispatcher.dispatch_activity('tests.test_simpleflow.test_dispatch.missing')
+
+    def test_preload(self):
+        nb_activities = dynamic_dispatcher.preload(['tests.data.activities'])
+        self.assertTrue(nb_activities > 0)
+        names = set(a.name for a in registry)
+        self.assertIn('tests.data.activities.increment', names)
+        self.assertIn('tests.data.activities.increment', dynamic_dispatcher._activities)
+
+    def test_preload_custom_name(self):
+        custom = activity.with_attributes(name='custom-name')(plain_function)
+        dynamic_dispatcher.preload([])
+        self.assertIs(custom, dynamic_dispatcher.Dispatcher.dispatch_activity('custom-name'))
+
+    def test_preload_import_error(self):
+        with self.assertRaises(ImportError):
+            dynamic_dispatcher.preload(['does.not.exist'])
@@ -1,10 +1,14 @@
+import hashlib
 import os
+import tempfile
+import time
 import unittest
 from mock import patch
 import shutil
 from sure import expect
 
-from simpleflow.download import RemoteBinary, with_binaries
+from simpleflow import settings
+from simpleflow.download import ChecksumError, RemoteBinary, download_binaries, evict_binaries, with_binaries
 
 
 # example binary remote/local location
@@ -64,3 +68,93 @@ class TestWithBinariesDecorator(unittest.TestCase):
         expect(res).to.equal("foo!")
 
         method_mock.assert_called_once_with()
+
+
+def fake_pull(content):
+    def pull(bucket, path, dest_file):
+        with open(dest_file, "wb") as f:
+            f.write(content)
+    return pull
+
+
+class TestDownloadCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        patcher = patch("simpleflow.download.SIMPLEFLOW_BINARIES_DIRECTORY", self.directory)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(os.environ.__setitem__, "PATH", os.environ["PATH"])
+
+    def test_checksum(self):
+        checksum = "sha256:" + hashlib.sha256(b"binary").hexdigest()
+        binary = RemoteBinary("custom-bin", remote_location, checksum=checksum)
+        with patch("simpleflow.download.pull", fake_pull(b"binary")):
+            binary.download()
+        with open(binary.checksum_location) as f:
+            expect(f.read()).to.equal(checksum.split(":")[1])
+        expect(os.access(binary.local_location, os.X_OK)).to.be.true
+
+        # a different checksum is expected: the binary is downloaded again
+        binary = RemoteBinary("custom-bin", remote_location, checksum="0123")
+        with patch("simpleflow.download.pull", fake_pull(b"other binary")):
+            with self.assertRaises(ChecksumError):
+                binary.download()
+        # ... and the previous one is left untouched
+        with open(binary.local_location, "rb") as f:
+            expect(f.read()).to.equal(b"binary")
+        expect(os.listdir(binary.local_directory)).to.have.length_of(2)
+
+    def test_download_binaries_in_parallel(self):
+        with patch("simpleflow.download.pull", fake_pull(b"binary")):
+            download_binaries({
+                "bin1": "s3://a.bucket/bin1",
+                "bin2": {"location": "s3://a.bucket/bin2", "checksum": hashlib.sha256(b"binary").hexdigest()},
+            })
+        for name in ("bin1", "bin2"):
+            binary = RemoteBinary(name, "s3://a.bucket/" + name)
+            expect(os.access(binary.local_location, os.X_OK)).to.be.true
+            expect(os.environ["PATH"]).to.contain(binary.local_directory)
+
+    def test_evict_binaries(self):
+        binaries = []
+        with patch("simpleflow.download.pull", fake_pull(b"x" * 100)):
+            for i in range(3):
+                binary = RemoteBinary("bin{}".format(i), "s3://a.bucket/bin{}".format(i))
+                binary.download()
+                os.utime(binary.local_directory, (i, i))
+                binaries.append(binary)
+
+        # each binary takes 164 bytes with its checksum; bin0 is the least
+        # recently used one, but is used now
+        expect(evict_binaries(350, keep=[binaries[0].local_directory])).to.equal(1)
+        expect(os.path.exists(binaries[0].local_location)).to.be.true
+        expect(os.path.exists(binaries[1].local_location)).to.be.false
+        expect(os.path.exists(binaries[2].local_location)).to.be.true
+
+        with patch.object(settings, "SIMPLEFLOW_BINARIES_DIRECTORY_MAX_SIZE", 200):
+            with patch("simpleflow.download.pull", fake_pull(b"x" * 100)):
+                download_binaries({"bin2": "s3://a.bucket/bin2"})
+        expect(os.path.exists(binaries[0].local_location)).to.be.false
+        expect(os.path.exists(binaries[2].local_location)).to.be.true
+
+    def test_evict_binaries_keeps_recent_binaries_and_locks(self):
+        binaries = []
+        with patch("simpleflow.download.pull", fake_pull(b"x" * 100)):
+            for i in range(2):
+                binary = RemoteBinary("bin{}".format(i), "s3://a.bucket/bin{}".format(i))
+                binary.download()
+                binaries.append(binary)
+        # a process waits for the lock of bin0
+        waiting_lock = os.path.join(binaries[0].local_directory, "otherhost-1234.5678")
+        open(waiting_lock, "w").close()
+        # bin0 was last used an hour ago, bin1 is still in use
+        last_use = time.time() - 3600
+        os.utime(binaries[0].local_directory, (last_use, last_use))
+
+        expect(evict_binaries(0, min_idle_time=7200)).to.equal(0)
+        expect(evict_binaries(0, min_idle_time=1800)).to.equal(1)
+        expect(os.path.exists(binaries[0].local_location)).to.be.false
+        expect(os.path.exists(binaries[0].checksum_location)).to.be.false
+        expect(os.path.exists(waiting_lock)).to.be.true
+        expect(os.path.exists(binaries[1].local_location)).to.be.true
@@ -2,19 +2,26 @@
 from __future__ import print_function
 
 import json
+import logging
 import sys
 import tempfile
 import os.path
 import platform
 import threading
 
+import boto
 import psutil
 import pytest
 import time
 
 import subprocess
 
-from simpleflow import execute
+try:
+    from moto import mock_s3_deprecated as mock_s3
+except ImportError:
+    from moto import mock_s3
+
+from simpleflow import constants, execute, format
 from simpleflow.exceptions import ExecutionError, ExecutionTimeoutError
 
 
@@ -335,3 +342,32 @@ def test_large_command_line_utf8():
     """
     x = u"ä" * 1024 * 1024
     assert length(x.encode('utf-8')) == len(x)
+
+
+def test_anonymous_file():
+    with execute.anonymous_file('test') as f:
+        f.write(b'foo')
+        f.seek(0)
+        assert f.read() == b'foo'
+        if platform.system() == 'Linux' and (hasattr(os, 'memfd_create') or execute._libc_memfd_create):
+            # no file on disk
+            assert os.readlink('/proc/self/fd/{}'.format(f.fileno())).startswith('/memfd:test')
+
+
+@mock_s3
+def test_store_large_result():
+    logger = logging.getLogger(__name__)
+    result = json.dumps(['A' * constants.MAX_RESULT_LENGTH])
+    # jumbo fields disabled
+    assert execute._store_large_result(result, logger) == result
+
+    boto.connect_s3().create_bucket('jumbo-bucket')
+    os.environ['SIMPLEFLOW_JUMBO_FIELDS_BUCKET'] = 'jumbo-bucket'
+    try:
+        assert execute._store_large_result('[1]', logger) == '[1]'
+        signature = execute._store_large_result(result, logger)
+        assert signature.startswith(constants.JUMBO_FIELDS_PREFIX)
+        assert format.result(format.decode(signature)) == signature
+        assert format.decode(signature, use_proxy=False) == ['A' * constants.MAX_RESULT_LENGTH]
+    finally:
+        os.environ['SIMPLEFLOW_JUMBO_FIELDS_BUCKET'] = ''
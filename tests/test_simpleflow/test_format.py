@@ -4,6 +4,7 @@ import unittest
 import random
 
 import boto
+from mock import patch
 
 try:
     from moto import mock_s3_deprecated as mock_s3
@@ -129,3 +130,25 @@ class TestFormat(unittest.TestCase):
 
         for case in cases:
             self.assertEqual(case[1], format.decode(case[0], parse_json=False))
+
+    def test_result_forwards_jumbo_signature(self):
+        self.setup_jumbo_fields("jumbo-bucket")
+        signature = format.result(['A' * 64000])
+        value = format.decode(signature)
+
+        with patch("simpleflow.format._pull_jumbo_field") as pull:
+            self.assertEqual(signature, format.result(value))
+            self.assertFalse(pull.called)
+
+        self.assertIsNone(format.jumbo_signature(format.decode(signature, parse_json=False)))
+        self.assertIsNone(format.jumbo_signature(['A']))
+
+    def test_result_encodes_modified_jumbo_field(self):
+        self.setup_jumbo_fields("jumbo-bucket")
+        signature = format.result(['A' * 64000])
+        value = format.decode(signature)
+        value.append('B')
+
+        new_signature = format.result(value)
+        self.assertNotEqual(signature, new_signature)
+        self.assertEqual(['A' * 64000, 'B'], list(format.decode(new_signature)))
@@ -0,0 +1,74 @@
+"""
+Guard the startup time of the simpleflow CLI and of the subprocesses started
+by `simpleflow.execute`: heavy optional dependencies must only be imported
+when used.
+"""
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+# Only needed in some modes (kubernetes jobs, disk cache, jumbo fields, ...).
+HEAVY_MODULES = ('boto', 'diskcache', 'jinja2', 'kubernetes', 'psutil', 'sqlite3', 'yaml')
+
+# Cumulative import time budget, in seconds, checked with "python -X importtime"
+# (Python 3.7+). Generous, to stay meaningful on slow machines.
+IMPORT_TIME_BUDGET = {
+    'simpleflow.execute': 1.0,
+}
+
+
+def run_python(*args):
+    env = dict(os.environ, PYTHONWARNINGS='ignore')
+    process = subprocess.Popen(
+        [sys.executable] + list(args),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        env=env,
+    )
+    stdout, stderr = process.communicate()
+    if process.returncode:
+        raise AssertionError(stderr.decode('utf-8', 'replace'))
+    return stdout.decode('utf-8'), stderr.decode('utf-8')
+
+
+def imported_modules(module):
+    stdout, _ = run_python('-c', 'import json, sys; import {}; print(json.dumps(sorted(sys.modules)))'.format(module))
+    return set(json.loads(stdout))
+
+
+def import_time(module):
+    """
+    Cumulative time to import *module* in a new interpreter, in seconds.
+    """
+    _, stderr = run_python('-X', 'importtime', '-c', 'import {}'.format(module))
+    for line in stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        parts = line.split('|')
+        if len(parts) == 3 and parts[2].strip() == module:
+            return int(parts[1]) / 1e6
+    raise AssertionError('no import time found for {}:\n{}'.format(module, stderr))
+
+
+class TestImports(unittest.TestCase):
+    def assertNoHeavyModules(self, module):
+        modules = imported_modules(module)
+        heavy = [name for name in HEAVY_MODULES if name in modules]
+        self.assertEqual([], heavy, 'importing {} imports {}'.format(module, ', '.join(heavy)))
+
+    def test_simpleflow(self):
+        self.assertNoHeavyModules('simpleflow')
+
+    def test_execute(self):
+        self.assertNoHeavyModules('simpleflow.execute')
+
+    def test_worker_does_not_import_kubernetes(self):
+        modules = imported_modules('simpleflow.command')
+        for name in ('kubernetes', 'jinja2', 'yaml', 'diskcache'):
+            self.assertNotIn(name, modules)
+
+    @unittest.skipIf(sys.version_info < (3, 7), '-X importtime requires Python 3.7+')
+    def test_import_time_budget(self):
+        for module, budget in IMPORT_TIME_BUDGET.items():
+            self.assertLess(import_time(module), budget)
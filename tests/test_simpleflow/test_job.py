@@ -0,0 +1,151 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from mock import Mock, patch
+
+try:
+    from moto import mock_swf_deprecated as mock_swf
+except ImportError:
+    from moto import mock_swf
+
+from simpleflow import settings
+from simpleflow.job import JobSubmitter, KubernetesJob, k8s
+from simpleflow.swf.process.worker.base import ActivityPoller
+from swf.models import Domain
+from swf.responses import Response
+
+JOB_TEMPLATE = """
+apiVersion: batch/v1
+kind: Job
+metadata:
+  name: "{{ JOB_NAME }}"
+spec:
+  template:
+    spec:
+      containers:
+        - name: worker
+          image: "{{ IMAGE }}"
+          args: ["{{ PAYLOAD }}"]
+"""
+
+
+class StubJob(object):
+    def __init__(self, job_name, error=None):
+        self.job_name = job_name
+        self.error = error
+        self.scheduled = threading.Event()
+
+    def schedule(self):
+        self.scheduled.set()
+        if self.error:
+            raise self.error
+
+
+class KubernetesTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.template = os.path.join(self.directory, 'job.yaml')
+        with open(self.template, 'w') as f:
+            f.write(JOB_TEMPLATE)
+
+        # reset the per-process caches
+        for patcher in (
+                patch.object(k8s, '_api', None),
+                patch.object(k8s, '_environments', {})):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def make_response(self):
+        meta = {
+            'k8s_job_template': self.template,
+            'k8s_job_data': {'IMAGE': 'simpleflow:latest'},
+        }
+        return {'activityId': 'activity-1', 'input': json.dumps({'meta': meta})}
+
+
+class TestKubernetesJob(KubernetesTestCase):
+    def test_compute_job_definition(self):
+        job = KubernetesJob('job-1', 'TestDomain', self.make_response())
+        definition = job.compute_job_definition()
+        self.assertEqual('job-1', definition['metadata']['name'])
+        container = definition['spec']['template']['spec']['containers'][0]
+        self.assertEqual('simpleflow:latest', container['image'])
+
+        # the template is compiled once
+        self.assertIs(k8s.get_template(self.template), k8s.get_template(self.template))
+
+    @patch('kubernetes.config.load_incluster_config')
+    @patch('kubernetes.client.BatchV1Api')
+    def test_api_is_reused(self, mock_api, mock_load_config):
+        for job_name in ('job-1', 'job-2'):
+            KubernetesJob(job_name, 'TestDomain', self.make_response()).schedule()
+        self.assertEqual(1, mock_api.call_count)
+        self.assertEqual(1, mock_load_config.call_count)
+        self.assertEqual(2, mock_api.return_value.create_namespaced_job.call_count)
+
+
+class TestJobSubmitter(unittest.TestCase):
+    def test_submit(self):
+        submitter = JobSubmitter(concurrency=2)
+        jobs = [StubJob('job-{}'.format(i)) for i in range(10)]
+        for job in jobs:
+            submitter.submit(job)
+        submitter.join()
+        self.assertTrue(all(job.scheduled.is_set() for job in jobs))
+        self.assertEqual(2, len(submitter._threads))
+
+    def test_error(self):
+        submitter = JobSubmitter(concurrency=1)
+        on_error = Mock()
+        error = ValueError('invalid template')
+        submitter.submit(StubJob('job-1', error=error), on_error=on_error)
+        submitter.join()
+        on_error.assert_called_once_with(error)
+
+
+@mock_swf
+class TestKubernetesPoller(KubernetesTestCase):
+    def process(self, poller):
+        poller.job_name = 'job-1'
+        task = Mock(activity_id='activity-1')
+        poller.process(Response(task_token='token', activity_task=task, raw_response=self.make_response()))
+        poller.wait_for_jobs()
+
+    @patch.object(k8s, 'get_batch_api')
+    def test_process(self, mock_get_api):
+        poller = ActivityPoller(Domain('test-domain'), 'test-task-list', process_mode='kubernetes')
+        self.assertIsNotNone(poller._job_submitter)
+        self.process(poller)
+        body = mock_get_api.return_value.create_namespaced_job.call_args[1]['body']
+        self.assertEqual('job-1', body['metadata']['name'])
+
+    @patch.object(k8s, 'get_batch_api')
+    def test_process_error_in_background(self, mock_get_api):
+        mock_get_api.return_value.create_namespaced_job.side_effect = ValueError('forbidden')
+        poller = ActivityPoller(Domain('test-domain'), 'test-task-list', process_mode='kubernetes')
+        fail_threads = []
+        with patch.object(poller, 'fail_with_retry', side_effect=lambda *args: fail_threads.append(
+                threading.current_thread())) as mock_fail:
+            self.process(poller)
+        # the SWF connection is only used by the polling thread
+        self.assertEqual([threading.current_thread()], fail_threads)
+        self.assertIn('cannot spawn kubernetes job for task activity-1', mock_fail.call_args[0][2])
+
+    @patch.object(k8s, 'get_batch_api')
+    def test_process_error(self, mock_get_api):
+        mock_get_api.return_value.create_namespaced_job.side_effect = ValueError('forbidden')
+        with patch.object(settings, 'SIMPLEFLOW_K8S_SUBMIT_CONCURRENCY', 0):
+            poller = ActivityPoller(Domain('test-domain'), 'test-task-list', process_mode='kubernetes')
+        self.assertIsNone(poller._job_submitter)
+        with patch.object(poller, 'fail_with_retry') as mock_fail:
+            self.process(poller)
+        self.assertIn('cannot spawn kubernetes job for task activity-1', mock_fail.call_args[0][2])
+
+
+if __name__ == '__main__':
+    unittest.main()
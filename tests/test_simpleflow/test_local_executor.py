@@ -0,0 +1,159 @@
+import os
+import threading
+import time
+import unittest
+
+from simpleflow import activity, futures, workflow
+from simpleflow.canvas import Chain, Group
+from simpleflow.constants import HOUR, MINUTE
+from simpleflow.exceptions import TaskFailed
+from simpleflow.local import Executor
+
+
+DELAY = 0.2
+
+_lock = threading.Lock()
+_running = [0, 0]  # current, max
+
+
+@activity.with_attributes(task_list='test_task_list')
+def sleep_and_double(x):
+    with _lock:
+        _running[0] += 1
+        _running[1] = max(_running)
+    time.sleep(DELAY)
+    with _lock:
+        _running[0] -= 1
+    return x * 2
+
+
+@activity.with_attributes(task_list='test_task_list')
+def append(x, values):
+    return values + [x]
+
+
+@activity.with_attributes(task_list='test_task_list', raises_on_failure=True)
+def fail():
+    raise ValueError('boom')
+
+
+@activity.with_attributes(task_list='test_task_list')
+def get_pid():
+    return os.getpid()
+
+
+class BaseWorkflow(workflow.Workflow):
+    name = 'test_workflow'
+    version = 'test_version'
+    task_list = 'test_task_list'
+    decision_tasks_timeout = 5 * MINUTE
+    execution_timeout = 1 * HOUR
+
+
+class GroupWorkflow(BaseWorkflow):
+    def run(self, n, max_parallel=None):
+        group = Group(*[(sleep_and_double, i) for i in range(n)], max_parallel=max_parallel)
+        return self.submit(group).result
+
+
+class ChainWorkflow(BaseWorkflow):
+    def run(self):
+        chain = Chain((append, 1, []), (append, 2), (append, 3), send_result=True)
+        return self.submit(chain).result[-1]
+
+
+class WaitWorkflow(BaseWorkflow):
+    def run(self):
+        self.submit(self.record_marker('start'))
+        fs = [self.submit(sleep_and_double, i) for i in range(3)]
+        futures.wait(*fs)
+        return sum(f.result for f in fs)
+
+
+class FailingWorkflow(BaseWorkflow):
+    def run(self):
+        future = self.submit(fail)
+        futures.wait(future)
+
+
+class PidWorkflow(BaseWorkflow):
+    def run(self):
+        return futures.wait(*[self.submit(get_pid) for _ in range(2)])
+
+
+class ContinueAsNewWorkflow(BaseWorkflow):
+    max_history_events = 10
+
+    def run(self, values):
+        while len(values) < 5:
+            values = self.submit(append, len(values), values).result
+            if self.should_continue_as_new():
+                self.continue_as_new(values)
+        return values
+
+
+class CheckpointWorkflow(BaseWorkflow):
+    def run(self):
+        self.submit(self.checkpoint('phase1', {'values': [1]}))
+        return self.get_checkpoint('phase1').details, self.get_checkpoint('phase2')
+
+
+class TestParallelExecutor(unittest.TestCase):
+    def setUp(self):
+        _running[:] = [0, 0]
+
+    def test_group(self):
+        start = time.time()
+        result = Executor(GroupWorkflow, max_workers=4).run({'args': [8]})
+        self.assertEqual([i * 2 for i in range(8)], result)
+        self.assertEqual(4, _running[1])
+        self.assertLess(time.time() - start, 8 * DELAY)
+
+    def test_group_max_parallel(self):
+        result = Executor(GroupWorkflow, max_workers=4).run({'args': [4], 'kwargs': {'max_parallel': 2}})
+        self.assertEqual([0, 2, 4, 6], result)
+        self.assertEqual(2, _running[1])
+
+    def test_chain(self):
+        self.assertEqual([1, 2, 3], Executor(ChainWorkflow, max_workers=4).run())
+
+    def test_wait(self):
+        executor = Executor(WaitWorkflow, max_workers=4)
+        self.assertEqual(6, executor.run())
+        self.assertEqual(3, _running[1])
+        self.assertEqual(1, len(executor.list_markers(all=True)))
+        self.assertEqual(3, len(executor._history.activities))
+
+    def test_raises_on_failure(self):
+        with self.assertRaises(TaskFailed):
+            Executor(FailingWorkflow, max_workers=2).run()
+
+    def test_processes(self):
+        pids = Executor(PidWorkflow, max_workers=2, use_processes=True).run()
+        self.assertEqual(2, len(pids))
+        self.assertNotIn(os.getpid(), pids)
+
+    def test_synchronous_by_default(self):
+        Executor(GroupWorkflow).run({'args': [2]})
+        self.assertEqual(1, _running[1])
+
+
+class TestContinueAsNew(unittest.TestCase):
+    def test_continue_as_new(self):
+        executor = Executor(ContinueAsNewWorkflow)
+        self.assertEqual([0, 1, 2, 3, 4], executor.run({'args': [[]]}))
+        self.assertLess(len(executor._history.events), ContinueAsNewWorkflow.max_history_events)
+        self.assertEqual(2, executor.nb_activities)
+
+    def test_parallel(self):
+        executor = Executor(ContinueAsNewWorkflow, max_workers=2)
+        self.assertEqual([0, 1, 2, 3, 4], executor.run({'args': [[]]}))
+
+
+class TestCheckpoint(unittest.TestCase):
+    def test_checkpoint(self):
+        self.assertEqual(({'values': [1]}, None), Executor(CheckpointWorkflow).run())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+import unittest
+
+from simpleflow import compat
+from simpleflow.log import (
+    AsyncHandler,
+    JsonFormatter,
+    SimpleflowFormatter,
+    clear_log_context,
+    flush_async_logs,
+    set_log_context,
+    setup_logging,
+)
+
+
+def make_record(msg, *args, **kwargs):
+    return logging.LogRecord('simpleflow.test', logging.INFO, __file__, 1, msg, args, kwargs.get('exc_info'))
+
+
+class TestFormatters(unittest.TestCase):
+    def tearDown(self):
+        clear_log_context()
+
+    def test_simpleflow_formatter(self):
+        formatter = SimpleflowFormatter()
+        self.assertTrue(formatter.format(make_record('%s%% done', 50)).endswith(': 50% done'))
+        # no arguments: the message isn't formatted
+        self.assertTrue(formatter.format(make_record('50% done')).endswith(': 50% done'))
+
+    def test_json_formatter(self):
+        set_log_context(workflow_id='wf-1', run_id='run-1')
+        set_log_context(run_id=None)
+        try:
+            raise ValueError('boom')
+        except ValueError:
+            import sys
+            record = make_record('task %s failed', 'foo', exc_info=sys.exc_info())
+        data = json.loads(JsonFormatter().format(record))
+        self.assertEqual('task foo failed', data['message'])
+        self.assertEqual('INFO', data['level'])
+        self.assertEqual('wf-1', data['workflow_id'])
+        self.assertNotIn('run_id', data)
+        self.assertIn('ValueError: boom', data['exception'])
+
+
+def log_in_child(logger_name):
+    set_log_context(activity_id='activity-2')
+    logging.getLogger(logger_name).info('from child')
+
+
+@unittest.skipIf(compat.PY2, 'asynchronous logging needs Python 3')
+class TestAsyncLogging(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'log.jsonl')
+
+        self.logger_name = 'simpleflow.test_log.{}'.format(self.id())
+        self.logger = logging.getLogger(self.logger_name)
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+        handler = logging.FileHandler(self.path)
+        self.logger.addHandler(handler)
+        self.addCleanup(handler.close)
+
+        setup_logging(self.logger_name, log_format='json', async_logging=True)
+        self.handler = self.logger.handlers[0]
+        self.addCleanup(clear_log_context)
+
+    def read_logs(self):
+        self.handler.flush()
+        with open(self.path) as f:
+            return [json.loads(line) for line in f]
+
+    def test_context_is_kept(self):
+        self.assertIsInstance(self.handler, AsyncHandler)
+        set_log_context(activity_id='activity-1')
+        self.logger.info('hello %s', 'world')
+        self.logger.debug('ignored')
+        set_log_context(activity_id=None)
+
+        logs = self.read_logs()
+        self.assertEqual(1, len(logs))
+        self.assertEqual('hello world', logs[0]['message'])
+        self.assertEqual('activity-1', logs[0]['activity_id'])
+
+    def test_fork(self):
+        self.logger.info('from parent')
+        process = multiprocessing.Process(target=log_in_child, args=(self.logger_name,))
+        process.start()
+        process.join()
+
+        logs = self.read_logs()
+        self.assertEqual(['from parent', 'from child'], [log['message'] for log in logs])
+        self.assertEqual('activity-2', logs[1]['activity_id'])
+
+    def test_os_exit(self):
+        # e.g. the processes forked by the zygote
+        pid = os.fork()
+        if pid == 0:
+            try:
+                for i in range(3):
+                    self.logger.warning('from child %s', i)
+                flush_async_logs()
+            finally:
+                os._exit(0)
+        os.waitpid(pid, 0)
+
+        logs = self.read_logs()
+        self.assertEqual(['from child 0', 'from child 1', 'from child 2'], [log['message'] for log in logs])
+
+
+if __name__ == '__main__':
+    unittest.main()
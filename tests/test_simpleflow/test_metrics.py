@@ -0,0 +1,112 @@
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import unittest
+
+from mock import patch
+
+from simpleflow import metrics, settings
+
+
+def make_registry():
+    registry = metrics.Registry()
+    counter = metrics.Counter('test_tasks_total', 'Tasks.', registry=registry)
+    gauge = metrics.Gauge('test_busy', 'Busy processes.', registry=registry)
+    histogram = metrics.Histogram('test_seconds', 'Durations.', buckets=(1, 10), registry=registry)
+    return registry, counter, gauge, histogram
+
+
+def work_in_child(counter, gauge, histogram):
+    counter.inc(task_list='tl')
+    gauge.set(1)
+    histogram.observe(5)
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.registry, self.counter, self.gauge, self.histogram = make_registry()
+
+    def test_render(self):
+        self.counter.inc(task_list='tl')
+        self.counter.inc(2, task_list='tl')
+        self.counter.inc(task_list='a "quoted"\nlist')
+        self.gauge.set(3)
+        self.gauge.dec()
+        with patch.object(metrics.time, 'time', side_effect=[0, 0.5]):
+            with self.histogram.time(op='poll'):
+                pass
+        self.histogram.observe(20, op='poll')
+
+        text = metrics.render(registry=self.registry)
+        self.assertIn('# TYPE test_tasks_total counter\n', text)
+        self.assertIn('test_tasks_total{task_list="tl"} 3.0\n', text)
+        self.assertIn('test_tasks_total{task_list="a \\"quoted\\"\\nlist"} 1.0\n', text)
+        self.assertIn('test_busy 2.0\n', text)
+        self.assertIn('test_seconds_bucket{op="poll",le="1.0"} 1.0\n', text)
+        self.assertIn('test_seconds_bucket{op="poll",le="10.0"} 1.0\n', text)
+        self.assertIn('test_seconds_bucket{op="poll",le="+Inf"} 2.0\n', text)
+        self.assertIn('test_seconds_sum{op="poll"} 20.5\n', text)
+        self.assertIn('test_seconds_count{op="poll"} 2.0\n', text)
+
+    def test_duplicate_name(self):
+        with self.assertRaises(ValueError):
+            metrics.Counter('test_tasks_total', 'Again.', registry=self.registry)
+
+
+class TestMetricsDirectory(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        patcher = patch.object(settings, 'SIMPLEFLOW_METRICS_DIRECTORY', self.directory)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.registry, self.counter, self.gauge, self.histogram = make_registry()
+
+    def collect(self):
+        return {
+            (name, tuple(tuple(label) for label in labels)): value
+            for name, labels, value in metrics.collect(self.registry)
+        }
+
+    def test_aggregate_processes(self):
+        self.counter.inc(task_list='tl')
+        self.gauge.set(1)
+        self.registry.flush()
+        for _ in range(2):
+            process = multiprocessing.Process(target=work_in_child, args=(self.counter, self.gauge, self.histogram))
+            process.start()
+            process.join()
+
+        values = self.collect()
+        self.assertEqual(3, values[('test_tasks_total', (('task_list', 'tl'),))])
+        self.assertEqual([[0, 2, 0], 10], values[('test_seconds', ())])
+        # gauges of exited processes are dropped
+        self.assertEqual(1, values[('test_busy', ())])
+        self.assertEqual(
+            ['archive.json', 'process-{}.json'.format(os.getpid())],
+            sorted(name for name in os.listdir(self.directory) if not name.startswith('.')),
+        )
+
+    def test_archive_dead_processes(self):
+        # a process killed before archiving its metrics
+        path = os.path.join(self.directory, 'process-999999999.json')
+        with open(path, 'w') as f:
+            json.dump([['test_tasks_total', [], 2], ['test_busy', [], 1], ['unknown', [], 1]], f)
+
+        self.assertEqual({('test_tasks_total', ()): 2}, self.collect())
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual({('test_tasks_total', ()): 2}, self.collect())
+
+    def test_write_textfile(self):
+        self.counter.inc()
+        self.registry.flush()
+        path = os.path.join(self.directory, 'simpleflow.prom')
+        metrics.write_textfile(path, registry=self.registry)
+        with open(path) as f:
+            self.assertIn('test_tasks_total 1.0\n', f.read())
+
+
+if __name__ == '__main__':
+    unittest.main()
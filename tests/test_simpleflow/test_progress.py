@@ -0,0 +1,67 @@
+import unittest
+
+from simpleflow import execute
+from simpleflow.constants import MAX_HEARTBEAT_DETAILS_LENGTH
+from simpleflow.progress import ProgressReader, report_progress
+
+
+@execute.python()
+class ReportFromProgram(object):
+    def __init__(self, steps):
+        self.steps = steps
+
+    def execute(self):
+        for i in range(self.steps):
+            report_progress(self.context, {'step': i + 1})
+        return self.steps
+
+
+class TestProgress(unittest.TestCase):
+    def setUp(self):
+        self.reader = ProgressReader()
+        self.context = {'progress_fd': self.reader.writer_fd}
+
+    def tearDown(self):
+        self.reader.close()
+
+    def test_no_channel(self):
+        self.assertFalse(report_progress(None, {'step': 1}))
+        self.assertFalse(report_progress({'name': 'foo'}, {'step': 1}))
+
+    def test_keep_latest_details(self):
+        self.assertTrue(report_progress(self.context, {'step': 1}))
+        self.assertTrue(report_progress(self.context, {'step': 2}))
+        self.reader.wait(timeout=0.1)
+        self.assertEqual('{"step":2}', self.reader.details)
+        self.assertFalse(self.reader.closed)
+
+    def test_details_too_long(self):
+        report_progress(self.context, 'ok')
+        self.assertFalse(report_progress(self.context, 'x' * MAX_HEARTBEAT_DETAILS_LENGTH))
+        self.reader.wait(timeout=0.1)
+        self.assertEqual('"ok"', self.reader.details)
+
+    def test_full_pipe_does_not_block(self):
+        sent = 0
+        while report_progress(self.context, {'padding': 'x' * 1000}):
+            sent += 1
+        self.assertTrue(sent > 0)
+        self.reader.wait(timeout=0.1)
+        self.assertIn('padding', self.reader.details)
+
+    def test_writers_closed(self):
+        report_progress(self.context, {'step': 1})
+        self.reader.close_writer()
+        self.reader.wait()
+        self.assertTrue(self.reader.closed)
+        self.assertEqual('{"step":1}', self.reader.details)
+
+    def test_report_from_executed_program(self):
+        self.assertEqual(3, ReportFromProgram(3, context=self.context))
+        self.reader.close_writer()
+        self.reader.wait(timeout=5)
+        self.assertEqual('{"step":3}', self.reader.details)
+
+
+if __name__ == '__main__':
+    unittest.main()
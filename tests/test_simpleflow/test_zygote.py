@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import subprocess
+import time
+
+import psutil
+import pytest
+
+from simpleflow import execute, zygote
+from simpleflow.exceptions import ExecutionError, ExecutionTimeoutError
+from simpleflow.progress import ProgressReader, report_progress
+
+
+pytestmark = pytest.mark.skipif(not zygote.is_supported(), reason='zygote requires socket.sendmsg')
+
+
+@execute.python(zygote=True)
+def add(a, b=1):
+    return a + b
+
+
+@execute.python(zygote=True)
+def get_pids():
+    return [os.getpid(), os.getppid()]
+
+
+@execute.python(zygote=True)
+class RaiseError(object):
+    def execute(self):
+        raise ValueError(u'ʘ‿ʘ')
+
+
+def sleep_and_return(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+def create_sleeper_subprocess():
+    return subprocess.Popen(['sleep', '600']).pid
+
+
+def sleep_with_subprocess(pid_file):
+    with open(pid_file, 'w') as f:
+        f.write(str(subprocess.Popen(['sleep', '600']).pid))
+    time.sleep(600)
+
+
+@execute.python(zygote=True)
+class ReportProgress(object):
+    def execute(self):
+        report_progress(self.context, {'done': 1})
+
+
+@execute.python(zygote=True)
+def length(x):
+    return len(x)
+
+
+def test_run_in_zygote():
+    assert add(1) == 2
+    assert add(1, b=2) == 3
+    pid, ppid = get_pids()
+    assert ppid == zygote.get_zygote('python').pid
+    # the zygote is reused
+    assert get_pids()[1] == ppid
+    assert pid != get_pids()[0]
+
+
+def test_error():
+    with pytest.raises(ExecutionError) as excinfo:
+        RaiseError()
+    error = json.loads(excinfo.value.args[0])
+    assert error['error'] == 'ValueError'
+    assert error['message'] == u'ʘ‿ʘ'
+
+
+def test_timeout():
+    func = execute.python(timeout=1, zygote=True)(sleep_and_return)
+    assert func(0.1) == 0.1
+    t = time.time()
+    with pytest.raises(ExecutionTimeoutError):
+        func(10)
+    assert time.time() - t < 5
+
+
+def test_timeout_kills_children(tmpdir):
+    pid_file = str(tmpdir.join('pid'))
+    func = execute.python(timeout=1, zygote=True)(sleep_with_subprocess)
+    with pytest.raises(ExecutionTimeoutError):
+        func(pid_file)
+    with open(pid_file) as f:
+        pid = int(f.read())
+    try:
+        psutil.Process(pid).wait(timeout=5)
+    except psutil.NoSuchProcess:
+        pass
+
+
+def test_kill_children():
+    pid = execute.python(kill_children=True, zygote=True)(create_sleeper_subprocess)()
+    with pytest.raises(psutil.NoSuchProcess):
+        psutil.Process(pid)
+
+
+def test_large_arguments():
+    x = u"ä" * 1024 * 1024
+    assert length(x) == len(x)
+
+
+def test_progress():
+    reader = ProgressReader()
+    try:
+        ReportProgress(context={'progress_fd': reader.writer_fd})
+        reader.close_writer()
+        reader.wait(timeout=5)
+        assert reader.details == '{"done":1}'
+    finally:
+        reader.close()
@@ -50,3 +50,11 @@ class TestActor(unittest.TestCase):
         )
         self.assertEqual(response.execution.workflow_id, 'wfe-1234')
         self.assertIsNotNone(response.execution.run_id)
+
+    @mock_swf
+    def test_count_pending(self):
+        conn = self.make_swf_environment()
+        self.assertEqual(0, self.actor.count_pending())
+        conn.start_workflow_execution("TestDomain", "wfe-1234", "test-workflow", "v1.2")
+        conn.start_workflow_execution("TestDomain", "wfe-5678", "test-workflow", "v1.2")
+        self.assertEqual(2, self.actor.count_pending())
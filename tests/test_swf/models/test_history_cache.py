@@ -0,0 +1,73 @@
+# -*- coding:utf-8 -*-
+
+import shutil
+import tempfile
+import unittest
+
+from mock import Mock, patch
+
+from simpleflow import settings
+from swf.models.domain import Domain
+from swf.models.history import cache
+from swf.models.workflow import WorkflowExecution
+from swf.querysets.history import HistoryQuerySet
+
+from ..mocks.event import mock_get_workflow_execution_history
+
+
+def closed_history():
+    response = mock_get_workflow_execution_history()
+    response['events'].append({
+        'eventId': 3,
+        'eventType': 'WorkflowExecutionCompleted',
+        'workflowExecutionCompletedEventAttributes': {'decisionTaskCompletedEventId': 2},
+        'eventTimestamp': 1365177770.0,
+    })
+    return response
+
+
+class TestHistoryCache(unittest.TestCase):
+    def setUp(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        for patcher in (
+                patch.object(cache, 'CACHE_DIR', cache_dir),
+                patch.object(settings, 'SIMPLEFLOW_ENABLE_HISTORY_CACHE', True)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.domain = Domain('test-domain')
+        self.we = WorkflowExecution(self.domain, 'test-workflow', run_id='test-run')
+
+    def test_closed_history_is_cached(self):
+        with patch.object(self.we.connection, 'get_workflow_execution_history',
+                          Mock(return_value=closed_history())) as get_history:
+            first = self.we.history()
+            second = self.we.history()
+        get_history.assert_called_once()
+        self.assertEqual(3, len(second.events))
+        self.assertEqual([e.type for e in first.events], [e.type for e in second.events])
+
+    def test_open_history_is_not_cached(self):
+        with patch.object(self.we.connection, 'get_workflow_execution_history',
+                          Mock(side_effect=lambda *args, **kwargs: mock_get_workflow_execution_history())
+                          ) as get_history:
+            self.we.history()
+            self.we.history()
+        self.assertEqual(2, get_history.call_count)
+
+    def test_disabled(self):
+        with patch.object(settings, 'SIMPLEFLOW_ENABLE_HISTORY_CACHE', False):
+            self.assertFalse(cache.set('test-domain', 'test-workflow', 'test-run', closed_history()['events']))
+            self.assertIsNone(cache.get('test-domain', 'test-workflow', 'test-run'))
+
+    def test_queryset(self):
+        cache.set('test-domain', 'test-workflow', 'test-run', closed_history()['events'])
+        qs = HistoryQuerySet(self.domain)
+        with patch.object(qs.connection, 'get_workflow_execution_history') as get_history:
+            history = qs.get('test-run', 'test-workflow', max_results=2, reverse=True)
+        self.assertFalse(get_history.called)
+        self.assertEqual([3, 2], [e.id for e in history.events])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,7 +6,7 @@ from boto.exception import SWFResponseError
 from boto.swf.layer1 import Layer1
 from mock import patch, Mock
 from swf.constants import REGISTERED
-from swf.exceptions import DoesNotExistError, ResponseError
+from swf.exceptions import DoesNotExistError, InvalidKeywordArgumentError, ResponseError
 from swf.models.domain import Domain
 from swf.models.workflow import WorkflowType, WorkflowExecution
 from swf.querysets.workflow import BaseWorkflowQuerySet,\
@@ -335,3 +335,30 @@ class TestWorkflowExecutionQuerySet(unittest.TestCase):
         kwargs = self.weq._list_items.call_args[1]
         self.assertIsNone(kwargs["start_oldest_date"])
         self.assertIsInstance(kwargs["close_latest_date"], int)
+
+    def test_iter_filter_fetches_pages_lazily(self):
+        pages = [
+            mock_list_open_workflow_executions(override_data={'nextPageToken': 'page-2'}),
+            mock_list_open_workflow_executions(),
+        ]
+        with patch.object(self.weq.connection, 'list_open_workflow_executions',
+                          Mock(side_effect=pages)) as list_executions:
+            executions = self.weq.iter_filter()
+            self.assertEqual(0, list_executions.call_count)
+            self.assertIsInstance(next(executions), WorkflowExecution)
+            self.assertEqual(1, list_executions.call_count)
+            self.assertEqual(1, len(list(executions)))
+            self.assertEqual('page-2', list_executions.call_args[1]['next_page_token'])
+
+    def test_iter_filter_with_limit(self):
+        response = mock_list_open_workflow_executions(override_data={'nextPageToken': 'next'})
+        with patch.object(self.weq.connection, 'list_open_workflow_executions',
+                          Mock(return_value=response)) as list_executions:
+            executions = list(self.weq.iter_filter(limit=1))
+            self.assertEqual(1, len(executions))
+            list_executions.assert_called_once()
+            self.assertEqual(1, list_executions.call_args[1]['maximum_page_size'])
+
+    def test_filter_with_invalid_kwargs_raises_eagerly(self):
+        with self.assertRaises(InvalidKeywordArgumentError):
+            self.weq.iter_filter(close_status='COMPLETED')
@@ -0,0 +1,204 @@
+import os
+import threading
+import time
+import unittest
+
+import boto.swf.exceptions
+from mock import patch
+
+from simpleflow import activity, futures, workflow
+from simpleflow.canvas import Group
+from simpleflow.swf.executor import Executor
+from simpleflow.swf.process.decider.base import DeciderPoller, process_decision
+from simpleflow.swf.process.worker.base import ActivityPoller, process_task
+from simpleflow.utils import json_dumps
+from swf import emulator
+from swf.core import ConnectedSWFObject
+from swf.exceptions import PollTimeout
+from swf.models import Domain, WorkflowType
+from swf.querysets import DomainQuerySet, WorkflowExecutionQuerySet
+
+TASK_LIST = 'emulator'
+
+
+@activity.with_attributes(task_list=TASK_LIST, version='1.0')
+def double(x):
+    return x * 2
+
+
+@activity.with_attributes(task_list=TASK_LIST, version='1.0', raises_on_failure=True)
+def fail():
+    raise ValueError('boom')
+
+
+class EmulatorWorkflow(workflow.Workflow):
+    name = 'emulator_workflow'
+    version = '1.0'
+    task_list = TASK_LIST
+    decision_tasks_timeout = '300'
+    execution_timeout = '3600'
+
+    def run(self, n):
+        self.submit(self.record_marker('start'))
+        future = self.submit(Group(*[(double, i) for i in range(n)]))
+        return sum(future.result)
+
+
+class FailingWorkflow(EmulatorWorkflow):
+    name = 'emulator_failing_workflow'
+
+    def run(self):
+        futures.wait(self.submit(fail))
+
+
+class ContinueAsNewWorkflow(EmulatorWorkflow):
+    name = 'emulator_continue_as_new_workflow'
+    max_history_events = 10
+
+    def run(self, n):
+        while n < 3:
+            n = self.submit(double, n).result + 1
+            if self.should_continue_as_new():
+                self.continue_as_new(n)
+        return n
+
+
+class TestEmulator(unittest.TestCase):
+    def setUp(self):
+        environ = patch.dict(os.environ, {'SWF_ENDPOINT_URL': 'memory://'})
+        environ.start()
+        self.addCleanup(environ.stop)
+        emulator._service = emulator.Service(poll_timeout=0.1)
+        self.domain = Domain('test-domain')
+        self.domain.save()
+
+    def start(self, workflow_class, *args):
+        workflow_type = WorkflowType(
+            self.domain, workflow_class.name, workflow_class.version,
+            task_list=TASK_LIST,
+            execution_timeout=workflow_class.execution_timeout,
+            decision_tasks_timeout=workflow_class.decision_tasks_timeout,
+        )
+        workflow_type.save()
+        return workflow_type.start_execution(workflow_id='test-workflow', input={'args': args, 'kwargs': {}})
+
+    def run_until_closed(self, workflow_class, execution, timeout=30):
+        decider = DeciderPoller([Executor(self.domain, workflow_class)], self.domain, TASK_LIST, False)
+        worker = ActivityPoller(self.domain, TASK_LIST)
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            try:
+                process_decision(decider, decider.poll(identity=decider.identity))
+            except PollTimeout:
+                pass
+            try:
+                response = worker.poll(identity=worker.identity)
+                process_task(worker, response.task_token, response.activity_task)
+            except PollTimeout:
+                pass
+            execution = execution.upstream()
+            if execution.status == execution.STATUS_CLOSED:
+                return execution, execution.history()
+        self.fail('execution still open after {}s'.format(timeout))
+
+    def test_connection(self):
+        self.assertIsInstance(ConnectedSWFObject().connection, emulator.Layer1)
+
+    def test_domain(self):
+        self.assertEqual(['test-domain'], [d.name for d in DomainQuerySet().all()])
+        with self.assertRaises(boto.swf.exceptions.SWFDomainAlreadyExistsError):
+            self.domain.connection.register_domain('test-domain', '1')
+
+    def test_workflow(self):
+        execution = self.start(EmulatorWorkflow, 4)
+        execution, history = self.run_until_closed(EmulatorWorkflow, execution)
+        self.assertEqual('COMPLETED', execution.close_status)
+        self.assertEqual('12', history.events[-1].result)
+        states = [(e.type, e.state) for e in history.events]
+        self.assertEqual(4, states.count(('ActivityTask', 'completed')))
+        self.assertIn(('Marker', 'recorded'), states)
+
+    def test_activity_failure(self):
+        execution = self.start(FailingWorkflow)
+        execution, history = self.run_until_closed(FailingWorkflow, execution)
+        self.assertEqual('FAILED', execution.close_status)
+        self.assertIn('failed', [e.state for e in history.events if e.type == 'ActivityTask'])
+
+    def test_continue_as_new(self):
+        execution = self.start(ContinueAsNewWorkflow, 0)
+        execution, history = self.run_until_closed(ContinueAsNewWorkflow, execution)
+        self.assertEqual('CONTINUED_AS_NEW', execution.close_status)
+
+        execution = WorkflowExecutionQuerySet(self.domain).get(
+            'test-workflow', history.events[-1].new_execution_run_id)
+        self.assertEqual(execution.STATUS_OPEN, execution.status)
+        self.assertEqual({'args': [1], 'kwargs': {}}, execution.history().events[0].input)
+        while execution.close_status != 'COMPLETED':
+            execution, history = self.run_until_closed(ContinueAsNewWorkflow, execution)
+            if execution.close_status == 'CONTINUED_AS_NEW':
+                execution = WorkflowExecutionQuerySet(self.domain).get(
+                    'test-workflow', history.events[-1].new_execution_run_id)
+        self.assertEqual('3', history.events[-1].result)
+
+    def test_signal_and_timer(self):
+        service = emulator._service
+        service.handle('RegisterWorkflowType', {
+            'domain': 'test-domain', 'name': 'raw', 'version': '1',
+            'defaultTaskList': {'name': TASK_LIST}, 'defaultChildPolicy': 'TERMINATE',
+            'defaultExecutionStartToCloseTimeout': '60', 'defaultTaskStartToCloseTimeout': '60',
+        })
+        status, response = service.handle('StartWorkflowExecution', {
+            'domain': 'test-domain', 'workflowId': 'raw', 'workflowType': {'name': 'raw', 'version': '1'},
+        })
+        self.assertEqual(200, status)
+        execution = {'workflowId': 'raw', 'runId': response['runId']}
+        _, task = service.handle('PollForDecisionTask', {'domain': 'test-domain', 'taskList': {'name': TASK_LIST}})
+        self.assertEqual(['WorkflowExecutionStarted', 'DecisionTaskScheduled', 'DecisionTaskStarted'],
+                         [e['eventType'] for e in task['events']])
+
+        # a signal received while deciding prevents closing the execution
+        service.handle('SignalWorkflowExecution', {'domain': 'test-domain', 'workflowId': 'raw', 'signalName': 's'})
+        service.handle('RespondDecisionTaskCompleted', {'taskToken': task['taskToken'], 'decisions': [
+            {'decisionType': 'StartTimer', 'startTimerDecisionAttributes': {'timerId': 't', 'startToFireTimeout': '0'}},
+            {'decisionType': 'CompleteWorkflowExecution'},
+        ]})
+        _, task = service.handle('PollForDecisionTask', {'domain': 'test-domain', 'taskList': {'name': TASK_LIST}})
+        types = [e['eventType'] for e in task['events']]
+        self.assertIn('WorkflowExecutionSignaled', types)
+        self.assertIn('CompleteWorkflowExecutionFailed', types)
+        self.assertEqual(3, task['previousStartedEventId'])
+
+        service.handle('RespondDecisionTaskCompleted', {'taskToken': task['taskToken'], 'decisions': [
+            {'decisionType': 'CompleteWorkflowExecution', 'completeWorkflowExecutionDecisionAttributes': {
+                'result': json_dumps('done')}},
+        ]})
+        _, response = service.handle('DescribeWorkflowExecution', {'domain': 'test-domain', 'execution': execution})
+        self.assertEqual('CLOSED', response['executionInfo']['executionStatus'])
+        self.assertEqual('COMPLETED', response['executionInfo']['closeStatus'])
+        _, page = service.handle('GetWorkflowExecutionHistory', {
+            'domain': 'test-domain', 'execution': execution, 'maximumPageSize': 5})
+        self.assertEqual(5, len(page['events']))
+        self.assertTrue(page['nextPageToken'])
+
+    def test_long_poll(self):
+        service = emulator._service
+        service.poll_timeout = 5
+        service.handle('RegisterWorkflowType', {
+            'domain': 'test-domain', 'name': 'raw', 'version': '1',
+            'defaultTaskList': {'name': TASK_LIST}, 'defaultTaskStartToCloseTimeout': '60',
+        })
+        results = []
+        poller = threading.Thread(target=lambda: results.append(service.handle('PollForDecisionTask', {
+            'domain': 'test-domain', 'taskList': {'name': TASK_LIST}})))
+        poller.start()
+        time.sleep(0.1)
+        start = time.time()
+        service.handle('StartWorkflowExecution', {
+            'domain': 'test-domain', 'workflowId': 'raw', 'workflowType': {'name': 'raw', 'version': '1'}})
+        poller.join()
+        self.assertLess(time.time() - start, 1)
+        self.assertEqual(3, results[0][1]['startedEventId'])
+
+
+if __name__ == '__main__':
+    unittest.main()
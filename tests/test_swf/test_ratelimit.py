@@ -0,0 +1,101 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import boto.exception
+from mock import Mock, patch
+
+from simpleflow import settings
+from swf import core, ratelimit
+
+
+def throttling_error():
+    return boto.exception.SWFResponseError(400, 'Bad Request', body={
+        '__type': 'com.amazon.coral.availability#ThrottlingException',
+        'message': 'Rate exceeded',
+    })
+
+
+class TestRateLimit(unittest.TestCase):
+    def setUp(self):
+        patcher = patch.object(settings, 'SIMPLEFLOW_SWF_RATE_LIMITS', 'poll=10,history=1000')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        ratelimit._buckets_key = None
+
+    def test_get_family(self):
+        self.assertEqual('poll', ratelimit.get_family('PollForActivityTask'))
+        self.assertEqual('respond', ratelimit.get_family('RespondDecisionTaskCompleted'))
+        self.assertEqual('heartbeat', ratelimit.get_family('RecordActivityTaskHeartbeat'))
+        self.assertEqual('history', ratelimit.get_family('GetWorkflowExecutionHistory'))
+        self.assertEqual('list', ratelimit.get_family('CountPendingActivityTasks'))
+        self.assertIsNone(ratelimit.get_family('StartWorkflowExecution'))
+
+    def test_parse_limits(self):
+        self.assertEqual({'poll': 10., 'list': 0.5}, ratelimit.parse_limits(' poll=10, list=0.5,'))
+        self.assertEqual({}, ratelimit.parse_limits(''))
+        with self.assertRaises(ValueError):
+            ratelimit.parse_limits('poll')
+
+    def test_acquire(self):
+        bucket = ratelimit.TokenBucket(10)
+        with patch('time.sleep') as sleep:
+            for _ in range(10):
+                self.assertEqual(0, bucket.acquire())
+            self.assertFalse(sleep.called)
+            self.assertGreater(bucket.acquire(), 0)
+        self.assertLessEqual(sleep.call_args[0][0], 0.11)
+
+    def test_aimd(self):
+        bucket = ratelimit.TokenBucket(10)
+        bucket.throttled()
+        bucket.throttled()
+        self.assertEqual(2.5, bucket.rate)
+        for _ in range(100):
+            bucket.throttled()
+        self.assertEqual(10 * ratelimit.MIN_RATE_RATIO, bucket.rate)
+        for _ in range(100):
+            bucket.succeeded()
+        self.assertEqual(10, bucket.rate)
+
+    def test_shared_bucket(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'bucket')
+        bucket = ratelimit.TokenBucket(10, path=path)
+        other = ratelimit.TokenBucket(10, path=path)
+        bucket.throttled()
+        self.assertEqual(5, other.rate)
+        with patch('time.sleep'):
+            self.assertGreater(other.acquire(), 0)
+
+    def test_limit(self):
+        connection = Mock()
+        connection.make_request.side_effect = [{}, throttling_error(), {}]
+        ratelimit.limit(connection)
+        bucket = ratelimit.get_bucket('poll')
+
+        connection.make_request('PollForActivityTask', '{}')
+        with self.assertRaises(boto.exception.SWFResponseError):
+            connection.make_request('PollForActivityTask', '{}')
+        self.assertEqual(5, bucket.rate)
+        connection.make_request('StartWorkflowExecution', '{}')
+
+    def test_limit_mocked_connection(self):
+        # e.g. tests patching boto.swf.connect_to_region: the mocked
+        # make_request() has no __name__
+        with patch('boto.swf.connect_to_region') as connect_to_region:
+            make_request = connect_to_region.return_value.make_request
+            make_request.return_value = {'taskToken': 'token'}
+            connection = core.connect('us-east-1')
+        self.assertEqual({'taskToken': 'token'}, connection.make_request('PollForActivityTask', '{}'))
+        make_request.assert_called_once_with('PollForActivityTask', '{}')
+
+    def test_disabled(self):
+        with patch.object(settings, 'SIMPLEFLOW_SWF_RATE_LIMITS', ''):
+            self.assertIsNone(ratelimit.get_bucket('poll'))
+
+
+if __name__ == '__main__':
+    unittest.main()
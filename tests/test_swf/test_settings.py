@@ -1,6 +1,8 @@
 import os
 import unittest
 
+from mock import patch
+
 from swf.core import ConnectedSWFObject, SETTINGS
 from swf.settings import from_env, clear
 
@@ -72,3 +74,30 @@ class TestSettings(unittest.TestCase):
         self.assertEqual(obj.connection.aws_access_key_id, "foo")
         self.assertEqual(obj.connection.aws_secret_access_key, "bar")
         self.assertEqual(obj.connection.provider.security_token, "baz")
+
+
+class TestConnections(unittest.TestCase):
+    def setUp(self):
+        environ = patch.dict(os.environ, {"AWS_ACCESS_KEY_ID": "foo", "AWS_SECRET_ACCESS_KEY": "bar"})
+        environ.start()
+        self.addCleanup(environ.stop)
+        clear()
+
+    def test_connection_is_shared(self):
+        self.assertIs(ConnectedSWFObject().connection, ConnectedSWFObject().connection)
+        self.assertIsNot(ConnectedSWFObject().connection, ConnectedSWFObject(region="eu-west-1").connection)
+
+        connection = object()
+        self.assertIs(ConnectedSWFObject(connection=connection).connection, connection)
+
+    def test_connection_is_not_shared_after_fork(self):
+        obj = ConnectedSWFObject()
+        connection = obj.connection
+        with patch("os.getpid", return_value=-1):
+            self.assertIsNot(connection, obj.connection)
+            self.assertIs(obj.connection, ConnectedSWFObject().connection)
+
+    def test_connection_depends_on_credentials(self):
+        connection = ConnectedSWFObject().connection
+        os.environ["AWS_ACCESS_KEY_ID"] = "other"
+        self.assertIsNot(connection, ConnectedSWFObject().connection)